@@ -9,6 +9,10 @@ DB_CONFIG = {
     'host': 'localhost',
     'port': 5432
 }
+DB_POOL_MIN_SIZE = 1
+DB_POOL_MAX_SIZE = 10
+DB_STATEMENT_CACHE_SIZE = 100 # Prepared statements cached per pooled connection
+DB_POOL_CLOSE_TIMEOUT = 10 # Seconds to wait for connections on shutdown
 
 # Redis
 REDIS_HOST = 'localhost'
@@ -32,6 +36,17 @@ BLOCK_ENGINE_URL = "ny.mainnet.block-engine.jito.wtf"
 jitoSdk = JitoJsonRpcSDK(url="https://ny.mainnet.block-engine.jito.wtf/api/v1")
 JITO_TIP_ADDRESS = "HFqU5x63VTqvQss8hp11i4wVV8bD44PvwucfZ2bU7gRe"
 USE_JITO = True
+JITO_BLOCK_ENGINES = { # Regions the swap is sent to in parallel, the first accepted wins
+    "ny": "https://ny.mainnet.block-engine.jito.wtf",
+    "amsterdam": "https://amsterdam.mainnet.block-engine.jito.wtf",
+    "frankfurt": "https://frankfurt.mainnet.block-engine.jito.wtf",
+    "slc": "https://slc.mainnet.block-engine.jito.wtf",
+    "tokyo": "https://tokyo.mainnet.block-engine.jito.wtf",
+}
+JITO_REGION_RATE = 1 # Max sendTransaction requests per second and region
+JITO_QUEUE_SIZE = 16 # Pending submissions before new ones are dropped
+JITO_WORKERS = 4 # Submissions in flight at once
+JITO_TIMEOUT_SECONDS = 2
 
 # Keys
 VAULT_PUBLIC_KEY = "YOUR_SOLANA_VAULT_PUBKEY"
@@ -59,6 +74,15 @@ VAULT_WSOL_ATA = "YOUR_SOLANA_VAULT_WSOL_ATA"
 # Connections
 RPC_STATUS = "confirmed"
 WS_RPC_STATUS = "processed"
+BROADCAST_INTERVAL_SECONDS = 0.4 # Rebroadcast period to every RPC endpoint until the transaction lands or its blockhash expires
+CONFIRM_POLL_INTERVAL = 0.5 # Seconds between batched getSignatureStatuses rounds for sent transactions
+CONFIRM_TIMEOUT_SECONDS = 90 # A transaction without a known last valid block height is expired after this
+CONFIRM_FLUSH_SECONDS = 5 # Execution outcomes are written to the opportunities table at most this often
+BLOCKHASH_SOURCE = 'slot' # 'slot' (slotSubscribe, fetch on each new slot) | 'block' (blockSubscribe, hash pushed in the notification) | 'poll'
+BLOCKHASH_COMMITMENT = "finalized"
+BLOCKHASH_POLL_INTERVAL = 0.25 # Seconds between polls in 'poll' mode and while the subscription is down
+BLOCKHASH_STALE_SECONDS = 5 # Without an update for this long, the in-memory hash is ignored and the subscription is polled
+BLOCKHASH_RECONNECT_SECONDS = 5 # Polling time before reconnecting a failed subscription
 
 # Trade
 VAULT_BALANCE = 0.5
@@ -67,15 +91,51 @@ MIN_TRADE_SIZE = 0.01
 MAX_PRICE_DIFF_PERCENTAGE = 99
 UNIT_BUDGET =  1_000_000
 UNIT_PRICE =  1_000_000
+SWAP_TEMPLATES = True # Precompile one swap transaction per route at startup, trades only patch amounts, blockhash and signatures
 
 # Performance
 MIN_METEORA_FEE = 2
 METEORA_BINS_LEFT = 2
 METEORA_BINS_RIGHT = 2
 METEORA_BINS_TO_TRADE = 2
+OPPORTUNITY_EVALUATOR = 'serial' # 'serial' (process_route per route) | 'batch' (vectorized pass over all routes of an update)
+TRADE_SIZING = 'bins' # 'bins' (average price of the first bins, raydium_quote_smart) | 'optimal' (profit-maximizing size over the CPMM curve and the bin ladder)
+DLMM_ENGINE = 'sidecar' # 'sidecar' (DLMM API on localhost:3000) | 'native' (decode pool accounts in-process)
+DLMM_BINS_MODE = 'poll' # 'poll' (round-robin over pools) | 'subscribe' (LbPair/BinArray account subscriptions, publish on change)
+DLMM_NATIVE_CHECK = True # In 'subscribe' mode with the sidecar engine, compare each pool's native active bin with the DLMM API's at setup and leave out pools that differ
+DLMM_WARMUP_CONCURRENCY = 8 # DLMM pools set up in parallel during cache warm-up
+DLMM_WARMUP_RATE = 10 # Max DLMM requests per second during cache warm-up
+DLMM_WARMUP_RETRIES = 3 # Attempts per pool on 429/503 responses
+RATE_LIMIT_BACKOFF_SECONDS = 5 # Pause after a 429 response
 
 RESERVES_METEORA = 'redis' # 'rpc' | 'redis'
 RESERVES_RAYDIUM = 'cache' # 'cache' | 'rpc' | 'redis'
 RESERVES_MAX_SECONDS = 200 # Max ws receive delay
 
-WS_MAX_SECONDS = 200 # Max ws receive delay
\ No newline at end of file
+WS_MAX_SECONDS = 200 # Max ws receive delay
+WS_SUBSCRIBE_BATCH_SIZE = 50 # accountSubscribe requests sent per burst
+WS_SUBSCRIBE_PACING = 0.05 # Seconds to yield between subscription bursts
+WS_QUEUE_MAX_SIZE = 1000 # Pending reserve updates before the oldest are dropped
+RESERVES_COOLDOWN_SECONDS = 0.5 # Min seconds between evaluations of the same reserve account
+WS_METRICS_INTERVAL = 60 # Seconds between listener metrics summaries
+TRACE_REPORT_INTERVAL = 60 # Seconds between hot path latency summaries (log, Redis "metrics:hotpath")
+TRACE_ROUTES = True # Keep per-route latency histograms next to the per-stage ones
+TRACE_PROMETHEUS_FILE = None # Path for a Prometheus textfile collector dump, e.g. "/var/lib/node_exporter/arbitrage.prom"
+RECORD_DIR = None # Directory for record-and-replay recordings of the listeners (scripts/replay.py), None to disable
+API_TIMEOUT_SECONDS = 10 # Total timeout of a Raydium/Meteora API request
+API_METADATA_TTL_SECONDS = 3600 # Seconds pool metadata (vaults, mints, decimals, market accounts) stays cached
+RAYDIUM_IDS_BATCH_SIZE = 50 # Pool ids per Raydium /pools/key/ids request
+CYCLE_MAX_HOPS = 3 # Longest arbitrage cycle through SOL searched by modules.cycles, three-pool cycles are saved to three_arbitrage_routes
+CYCLE_MIN_RETURN = 0.001 # Min gain around a cycle at marginal prices after fees, 0.001 = 0.1%
+CYCLE_BOUNDS_SLACK = 0.01 # Log-price moves absorbed by the cycle search pruning bounds before they are lowered
+WS_RESERVES_ENCODING = "base64" # Reserve account subscriptions: "base64" (amount decoded at its offset, mint and decimals from the routes) | "jsonParsed"
+WS_RESERVES_CONNECTIONS = 1 # Websocket connections per endpoint the reserve accounts are sharded across, providers cap subscriptions per connection
+WS_RESERVES_REDUNDANT_ENDPOINT_ID = None # RPC_ENDPOINT_LIST index of a second endpoint every reserve account is also subscribed on (first arrival per account and slot wins), None for one endpoint
+WS_RECONNECT_SECONDS = 1 # Pause before a dropped reserves connection reconnects and resubscribes
+RESERVES_MAX_SLOT_AGE = 8 # Routes whose Raydium vaults lag the processed tip (slot notifications of the reserve connections) by more slots, or whose connections all stalled, are not evaluated, None to disable
+RESERVES_MAX_SILENCE_SECONDS = 2 # A reserve connection without any frame (account or processed slot notification) for this long is stalled
+DLMM_BINS_JSON = True # Also write dlmms:bins:<pool> as JSON with bin arrays and LUTs for rust-core, Python reads the binary dlmms:bins:bin:<pool> snapshot
+ROUTE_LOOKUP_RETRY_SECONDS = 60 # Wait before looking up a pool again after its Raydium/Meteora API lookup failed, doubled on every failure in a row
+ROUTE_LOOKUP_MAX_RETRY_SECONDS = 21600 # Longest wait between lookups of a pool that keeps failing
+CYCLE_PRICE_REFRESH_SECONDS = 30 # Pools the cycle search prices without a DLMM bins snapshot (Raydium vaults, untracked Meteora pairs) are re-fetched at most this often
+CYCLE_PRICE_REFRESH_BATCH = 500 # Most of those pools re-fetched per cycle search pass, oldest price first
\ No newline at end of file
@@ -23,10 +23,10 @@ logging.getLogger('requests').setLevel(logging.WARNING)
 logging.getLogger('aiohttp').setLevel(logging.WARNING)
 
 from config import SOLANA_PROGRAM
-from modules.database import add_pool, setup_database, save_new_meteora_pools, add_token, get_tokens
+from modules.database import add_pool, setup_database, save_new_meteora_pools, add_token, get_tokens, close_db_pool
 from modules.meteora.scan import fetch_coin_data, send_alert
 from modules.pools import fetch_pools_for_token, fetch_raydium_pools_for_token
-from modules.routes import find_and_save_two_arbitrage_routes
+from modules.routes import find_and_save_two_arbitrage_routes, discover_three_arbitrage_routes
 from scripts.delete_unused_luts import get_and_delete_unused_luts
 from scripts.reset.delete_outdated import reset as reset_outdated
 from scripts.reset.reset_db import reset as reset
@@ -96,6 +96,11 @@ async def scan_routes():
             await find_and_save_two_arbitrage_routes()
         except Exception as e:
             logger.error(f"Scanning routes error: {e}")
+
+        try:
+            await discover_three_arbitrage_routes()
+        except Exception as e:
+            logger.error(f"Scanning cycles error: {e}")
         
         sleep_time = 5
         # logger.info(f"Finished fetching routes, sleeping {sleep_time}s...")
@@ -129,6 +134,13 @@ async def scan_blocks():
         await listen_block()  # Modify listen_to_pools to accept dynamic pools
 
 async def main():
+    try:
+        await run()
+    finally:
+        # Release pooled database connections on exit or cancellation
+        await close_db_pool()
+
+async def run():
     await setup_database()
     tasks = []
 
@@ -0,0 +1,186 @@
+import asyncio
+import ssl
+import struct
+import time
+from urllib.parse import urlsplit
+
+import certifi
+import aiohttp
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, API_TIMEOUT_SECONDS, API_METADATA_TTL_SECONDS, RAYDIUM_IDS_BATCH_SIZE
+
+from solana.rpc.async_api import AsyncClient
+from solders.pubkey import Pubkey
+from spl.token._layouts import MINT_LAYOUT
+
+ssl_context = ssl.create_default_context()
+ssl_context.load_verify_locations(certifi.where())
+
+RAYDIUM_POOL_KEYS_URL = "https://api-v3.raydium.io/pools/key/ids"
+METEORA_PAIR_URL = "https://dlmm-api.meteora.ag/pair/"
+
+API_CONNECTIONS_PER_HOST = 8
+# Loads requested within this window go out in one batch
+BATCH_DELAY_SECONDS = 0.005
+# getMultipleAccounts accepts up to 100 accounts per request
+MINT_BATCH_SIZE = 100
+TOKEN_ACCOUNT_AMOUNT = struct.Struct("<Q")
+
+# One keep-alive session per host, reused by every request to it: host -> (event loop, session)
+sessions = {}
+# GET requests in flight, a second request for the same URL waits for the first: url -> task
+inflight = {}
+
+def get_session(url):
+    host = urlsplit(url).netloc
+    loop = asyncio.get_running_loop()
+    entry = sessions.get(host)
+    if entry is None or entry[0] is not loop or entry[1].closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(ssl=ssl_context, limit_per_host=API_CONNECTIONS_PER_HOST, keepalive_timeout=60, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=API_TIMEOUT_SECONDS),
+        )
+        entry = sessions[host] = (loop, session)
+    return entry[1]
+
+async def close_sessions():
+    for _, session in list(sessions.values()):
+        await session.close()
+    sessions.clear()
+
+async def fetch_json(url):
+    async with get_session(url).get(url) as response:
+        if response.status != 200:
+            logger.debug(f"API {url} answered {response.status}")
+            return None
+        return await response.json(content_type=None)
+
+async def get_json(url):
+    """
+    GET a JSON document through the shared session of its host, None on a non-200 answer.
+    Concurrent requests for the same URL share one request.
+    """
+    task = inflight.get(url)
+    if task is None:
+        task = inflight[url] = asyncio.ensure_future(fetch_json(url))
+        task.add_done_callback(lambda _: inflight.pop(url, None))
+    return await asyncio.shield(task)
+
+class BatchLoader:
+    """
+    Loads values by key through a function fetching many keys at once.
+
+    Keys requested within BATCH_DELAY_SECONDS go out together, up to `max_size` per call, a key already
+    queued or in flight shares its future. Loaded values are kept `ttl` seconds, missing ones are not
+    kept so they are retried on the next load.
+    """
+
+    def __init__(self, fetch_many, max_size, ttl=API_METADATA_TTL_SECONDS, delay=BATCH_DELAY_SECONDS):
+        self.fetch_many = fetch_many
+        self.max_size = max_size
+        self.ttl = ttl
+        self.delay = delay
+        self.cache = {}
+        self.futures = {}
+        self.queued = []
+        self.flush_handle = None
+        self.tasks = set()
+        self.batches = 0
+
+    def cached(self, key):
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    async def load(self, key):
+        value = self.cached(key)
+        if value is not None:
+            return value
+
+        future = self.futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.futures[key] = loop.create_future()
+            self.queued.append(key)
+            if len(self.queued) >= self.max_size:
+                self.flush()
+            elif self.flush_handle is None:
+                self.flush_handle = loop.call_later(self.delay, self.flush)
+        # A cancelled caller must not cancel the load the other callers wait for
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        return dict(zip(keys, await asyncio.gather(*(self.load(key) for key in keys))))
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        queued, self.queued = self.queued, []
+        for start in range(0, len(queued), self.max_size):
+            task = asyncio.ensure_future(self._fetch(queued[start:start + self.max_size]))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _fetch(self, keys):
+        self.batches += 1
+        try:
+            values = await self.fetch_many(keys)
+        except Exception as e:
+            for key in keys:
+                future = self.futures.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        for key in keys:
+            value = values.get(key)
+            if value is not None:
+                self.cache[key] = (expires_at, value)
+            future = self.futures.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(value)
+
+async def fetch_raydium_pool_keys(pool_ids):
+    """Pool keys of several Raydium pools, the endpoint takes comma-separated ids."""
+    data = await get_json(f"{RAYDIUM_POOL_KEYS_URL}?ids={','.join(pool_ids)}")
+    if data and data.get("success") and isinstance(data.get("data"), list):
+        # Unknown ids come back as null entries
+        return {pool['id']: pool for pool in data['data'] if pool}
+    return {}
+
+async def fetch_meteora_pairs(pair_addresses):
+    """Meteora DLMM API pairs, one request per pair, bounded by the connections per host."""
+    pairs = await asyncio.gather(*(get_json(METEORA_PAIR_URL + address) for address in pair_addresses), return_exceptions=True)
+    return {address: pair for address, pair in zip(pair_addresses, pairs) if isinstance(pair, dict) and pair}
+
+async def fetch_mint_decimals(mints):
+    """Decimals of several mints with one getMultipleAccounts."""
+    async with AsyncClient(RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID]) as client:
+        response = await client.get_multiple_accounts([Pubkey.from_string(mint) for mint in mints])
+    return {mint: MINT_LAYOUT.parse(account.data).decimals for mint, account in zip(mints, response.value) if account is not None}
+
+async def fetch_token_account_amounts(addresses):
+    """Raw amounts of SPL token accounts, MINT_BATCH_SIZE accounts per getMultipleAccounts. Not cached, amounts change."""
+    amounts = {}
+    async with AsyncClient(RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID]) as client:
+        for start in range(0, len(addresses), MINT_BATCH_SIZE):
+            batch = addresses[start:start + MINT_BATCH_SIZE]
+            response = await client.get_multiple_accounts([Pubkey.from_string(address) for address in batch])
+            for address, account in zip(batch, response.value):
+                # Token account layout: mint (32), owner (32), amount (u64 LE)
+                if account is not None and len(account.data) >= TOKEN_ACCOUNT_AMOUNT.size + 64:
+                    amounts[address] = TOKEN_ACCOUNT_AMOUNT.unpack_from(account.data, 64)[0]
+    return amounts
+
+# Immutable pool metadata: Raydium vaults, mints, decimals and market accounts, Meteora pair mints and reserves, mint decimals.
+# Meteora pairs also carry amounts and volumes, only their immutable fields are read from the cache.
+raydium_pool_keys = BatchLoader(fetch_raydium_pool_keys, RAYDIUM_IDS_BATCH_SIZE)
+meteora_pairs = BatchLoader(fetch_meteora_pairs, API_CONNECTIONS_PER_HOST)
+mint_decimals = BatchLoader(fetch_mint_decimals, MINT_BATCH_SIZE)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import struct
+import time
+import websockets
+from dataclasses import dataclass
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import redis_client, RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, BLOCKHASH_SOURCE, BLOCKHASH_COMMITMENT, BLOCKHASH_POLL_INTERVAL, BLOCKHASH_STALE_SECONDS, BLOCKHASH_RECONNECT_SECONDS
+
+from modules.recording import start_recording, record, KIND_BLOCKHASH
+
+from solana.rpc.async_api import AsyncClient
+from solders.hash import Hash
+
+RPC_ENDPOINT = RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID]
+WS_ENDPOINT = RPC_ENDPOINT.replace('https://', 'wss://').replace('http://', 'ws://')
+
+# Compact Redis form for other processes: blockhash, last valid block height, slot
+REDIS_KEY = "latest_blockhash:compact"
+REDIS_TTL = 10
+COMPACT_LAYOUT = struct.Struct("<32sQQ")
+
+# A blockhash is valid for 150 blocks, getLatestBlockhash reports the same bound
+MAX_PROCESSING_AGE = 150
+
+@dataclass(frozen=True)
+class LatestBlockhash:
+    blockhash: Hash
+    last_valid_block_height: int
+    slot: int
+    received_at: float
+
+# Latest blockhash of this process, written by the provider and read by the swap path without I/O
+latest = None
+
+def encode_blockhash(value: LatestBlockhash) -> bytes:
+    return COMPACT_LAYOUT.pack(bytes(value.blockhash), value.last_valid_block_height, value.slot)
+
+def decode_blockhash(data: bytes) -> LatestBlockhash:
+    blockhash, last_valid_block_height, slot = COMPACT_LAYOUT.unpack(data)
+    return LatestBlockhash(Hash(blockhash), last_valid_block_height, slot, time.monotonic())
+
+def get_cached_blockhash():
+    """Latest blockhash of this process if the provider keeps it fresh, None otherwise."""
+    if latest is not None and time.monotonic() - latest.received_at < BLOCKHASH_STALE_SECONDS:
+        return latest
+    return None
+
+def get_latest_blockhash():
+    """
+    Latest blockhash, from memory when this process runs the provider, from Redis otherwise.
+    """
+    cached = get_cached_blockhash()
+    if cached is not None:
+        return cached
+
+    data = redis_client.get(REDIS_KEY)
+    if data:
+        return decode_blockhash(data)
+
+    logger.warning("🚨 No blockhash found in memory or Redis.")
+    return None
+
+async def publish_blockhash(blockhash, last_valid_block_height, slot):
+    """Keep a new blockhash in memory and share it through Redis."""
+    global latest
+    if latest is not None and latest.blockhash == blockhash:
+        latest = LatestBlockhash(blockhash, last_valid_block_height, max(slot, latest.slot), time.monotonic())
+        return
+
+    latest = LatestBlockhash(blockhash, last_valid_block_height, slot, time.monotonic())
+    record(KIND_BLOCKHASH, encode_blockhash(latest))
+    try:
+        await asyncio.to_thread(redis_client.setex, REDIS_KEY, REDIS_TTL, encode_blockhash(latest))
+    except Exception as e:
+        logger.warning(f"🚨 Blockhash publish error: {e}")
+
+async def fetch_blockhash(client):
+    """Fetch the latest blockhash over HTTP and publish it."""
+    try:
+        response = await client.get_latest_blockhash()
+        await publish_blockhash(response.value.blockhash, response.value.last_valid_block_height, response.context.slot)
+    except Exception as e:
+        logger.warning(f"🚨 Blockhash fetch error: {e}")
+
+async def poll_blockhash(client, duration=None):
+    """Poll the latest blockhash, forever or for `duration` seconds."""
+    deadline = None if duration is None else time.monotonic() + duration
+    while deadline is None or time.monotonic() < deadline:
+        await fetch_blockhash(client)
+        await asyncio.sleep(BLOCKHASH_POLL_INTERVAL)
+
+async def subscribe_blockhash(client):
+    """
+    Follow the chain over the websocket: blockSubscribe notifications carry the blockhash,
+    slotSubscribe notifications trigger a fetch (at most one in flight).
+    """
+    async with websockets.connect(WS_ENDPOINT) as ws:
+        if BLOCKHASH_SOURCE == 'block':
+            params = ["all", {"commitment": BLOCKHASH_COMMITMENT, "encoding": "json", "transactionDetails": "none", "rewards": False}]
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "blockSubscribe", "params": params}))
+        else:
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "slotSubscribe"}))
+        logger.info(f"🔊 Blockhash provider subscribed ({BLOCKHASH_SOURCE}).")
+
+        await fetch_blockhash(client)
+        fetch_task = None
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=BLOCKHASH_STALE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Subscription went quiet, keep the hash fresh while waiting
+                    logger.warning("🚨 No blockhash notifications, polling once.")
+                    await fetch_blockhash(client)
+                    continue
+
+                data = json.loads(message)
+                method = data.get('method')
+                if method == 'slotNotification':
+                    if fetch_task is None or fetch_task.done():
+                        fetch_task = asyncio.create_task(fetch_blockhash(client))
+                elif method == 'blockNotification':
+                    value = data['params']['result']['value']
+                    block = value.get('block')
+                    if block and block.get('blockHeight') is not None:
+                        await publish_blockhash(Hash.from_string(block['blockhash']), block['blockHeight'] + MAX_PROCESSING_AGE, value['slot'])
+                elif 'error' in data:
+                    raise RuntimeError(data['error'])
+        finally:
+            if fetch_task is not None:
+                fetch_task.cancel()
+
+async def run_blockhash_provider():
+    """
+    Keep the latest blockhash in memory and in Redis, from a websocket subscription with polling as fallback.
+    """
+    start_recording('blockhash')
+    async with AsyncClient(RPC_ENDPOINT, commitment=BLOCKHASH_COMMITMENT) as client:
+        while True:
+            if BLOCKHASH_SOURCE == 'poll':
+                await poll_blockhash(client)
+                continue
+
+            try:
+                await subscribe_blockhash(client)
+            except Exception as e:
+                logger.warning(f"🚨 Blockhash subscription error: {e}, polling for {BLOCKHASH_RECONNECT_SECONDS}s")
+            await poll_blockhash(client, BLOCKHASH_RECONNECT_SECONDS)
@@ -0,0 +1,100 @@
+import asyncio
+from collections import Counter
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import RPC_ENDPOINT_LIST, RPC_STATUS, BROADCAST_INTERVAL_SECONDS
+from modules.blockhash import MAX_PROCESSING_AGE
+from modules.confirmations import LANDED, EXPIRED
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.types import TxOpts
+
+SLOT_SECONDS = 0.4
+SEND_OPTS = TxOpts(skip_preflight=True, max_retries=0)
+
+class Broadcaster:
+    """
+    Hedged transaction broadcast over long-lived AsyncClients, one per entry of RPC_ENDPOINT_LIST.
+
+    `send` returns the signature of the first endpoint that accepts the transaction, a background task
+    then resends it to every endpoint each BROADCAST_INTERVAL_SECONDS until the signature tracker
+    reports it landed, failed or expired. `first_accepted` and `landed` count the endpoint that answered first.
+    """
+
+    def __init__(self, tracker, endpoints=RPC_ENDPOINT_LIST, interval=BROADCAST_INTERVAL_SECONDS):
+        self.tracker = tracker
+        self.clients = {endpoint: AsyncClient(endpoint, commitment=RPC_STATUS) for endpoint in dict.fromkeys(endpoints)}
+        self.interval = interval
+        self.first_accepted = Counter()
+        self.landed = Counter()
+        self.expired = 0
+        self.tasks = set()
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await asyncio.gather(*(client.close() for client in self.clients.values()), return_exceptions=True)
+
+    async def _send_one(self, endpoint, transaction):
+        response = await self.clients[endpoint].send_raw_transaction(transaction, opts=SEND_OPTS)
+        return endpoint, response.value
+
+    async def _send_all(self, transaction):
+        """
+        Send to every endpoint at once, returns (endpoint, signature) of the first to accept it.
+        The other sends complete in the background.
+        """
+        pending = {asyncio.create_task(self._send_one(endpoint, transaction)) for endpoint in self.clients}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    self._track(pending)
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def _track(self, tasks):
+        for task in tasks:
+            self.tasks.add(task)
+            task.add_done_callback(self._discard)
+
+    def _discard(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Broadcast send failed: {task.exception()}")
+
+    async def send(self, transaction, last_valid_block_height):
+        """
+        Broadcast a serialized transaction, returns its signature.
+        """
+        endpoint, signature = await self._send_all(transaction)
+        self.first_accepted[endpoint] += 1
+        logger.info(f"📡 Broadcast accepted first by {endpoint}")
+        self._track([asyncio.create_task(self._rebroadcast(transaction, signature, endpoint, last_valid_block_height))])
+        return signature
+
+    async def _rebroadcast(self, transaction, signature, endpoint, last_valid_block_height):
+        outcome = self.tracker.track(signature, last_valid_block_height)
+        # Bounded by the blockhash lifetime even if the tracker stops
+        for _ in range(int(MAX_PROCESSING_AGE * SLOT_SECONDS / self.interval) * 2):
+            try:
+                result = await asyncio.wait_for(asyncio.shield(outcome), self.interval)
+            except asyncio.TimeoutError:
+                await asyncio.gather(*(self._send_one(other, transaction) for other in self.clients), return_exceptions=True)
+                continue
+
+            if result['outcome'] == LANDED:
+                self.landed[endpoint] += 1
+                logger.info(f"✅ Broadcast of {signature} landed, first accepted by {endpoint}")
+            elif result['outcome'] == EXPIRED:
+                self.expired += 1
+            return
+        self.expired += 1
+
+    def stats(self):
+        return {'first_accepted': dict(self.first_accepted), 'landed': dict(self.landed), 'expired': self.expired, 'in_flight': len(self.tasks)}
@@ -8,11 +8,17 @@ import os
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
 
-from config import RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, SOLANA_PROGRAM, VAULT_PRIVATE_KEY, PAYER_PRIVATE_KEY, OPERATOR_PRIVATE_KEY, OPERATOR_WSOL_ATA, VAULT_WSOL_ATA, redis_client, JITO_TIP_ADDRESS
+from config import RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, RPC_STATUS, SOLANA_PROGRAM, VAULT_PRIVATE_KEY, PAYER_PRIVATE_KEY, OPERATOR_PRIVATE_KEY, OPERATOR_WSOL_ATA, VAULT_WSOL_ATA, redis_client, JITO_TIP_ADDRESS, DLMM_ENGINE, DLMM_WARMUP_CONCURRENCY, DLMM_WARMUP_RATE, DLMM_WARMUP_RETRIES, RATE_LIMIT_BACKOFF_SECONDS, SWAP_TEMPLATES
 from modules.database import get_two_arbitrage_routes, get_lut_addresses_from_route
 from modules.raydium_py.config import client, payer_keypair, UNIT_BUDGET, UNIT_PRICE
 from modules.raydium_py.raydium.constants import ACCOUNT_LAYOUT_LEN, SOL_DECIMAL, TOKEN_PROGRAM_ID, WSOL
-from modules.dlmm.dlmm import DLMM, DLMM_CLIENT
+from modules.dlmm.dlmm import DLMM_CLIENT
+from modules.rate_limit import TokenBucket, is_rate_limited
+from modules.evaluator import RouteEvaluator
+from modules.swap import build_route_templates
+from modules.jito import JitoSubmitter
+from modules.broadcast import Broadcaster
+from modules.confirmations import SignatureTracker
 
 from solders.pubkey import Pubkey
 from solders.keypair import Keypair
@@ -34,62 +40,271 @@ from spl.token.instructions import (
     initialize_account,
 )
 
-async def setup_cache():
+# Reserve address fields of a two-pool route, used to index routes by the accounts they watch
+ROUTE_RESERVE_KEYS = (
+    'reserve_a_address_pool_a',
+    'reserve_b_address_pool_a',
+    'reserve_a_address_pool_b',
+    'reserve_b_address_pool_b',
+)
+
+# Reserve address, mint, decimals and dex fields of each reserve of a two-pool route
+ROUTE_RESERVE_METADATA_KEYS = (
+    ('reserve_a_address_pool_a', 'reserve_a_mint_pool_a', 'reserve_a_pool_a_decimals', 'pool_a_dex'),
+    ('reserve_b_address_pool_a', 'reserve_b_mint_pool_a', 'reserve_b_pool_a_decimals', 'pool_a_dex'),
+    ('reserve_a_address_pool_b', 'reserve_a_mint_pool_b', 'reserve_a_pool_b_decimals', 'pool_b_dex'),
+    ('reserve_b_address_pool_b', 'reserve_b_mint_pool_b', 'reserve_b_pool_b_decimals', 'pool_b_dex'),
+)
+
+def build_routes_by_reserve(arbitrage_routes, lut_mapping):
     """
-    Preload objects for faster access.
+    Build the reserve address -> ((route, lut), ...) index of enabled routes.
     """
-    arbitrage_routes = await get_two_arbitrage_routes()
+    routes_by_reserve = {}
+    for route in arbitrage_routes:
+        if route['status'] != 'enabled':
+            continue
+
+        entry = (route, lut_mapping.get(route['lut']))
+        for address in {route[key] for key in ROUTE_RESERVE_KEYS}:
+            routes_by_reserve.setdefault(address, []).append(entry)
+
+    return {address: tuple(entries) for address, entries in routes_by_reserve.items()}
 
-    # Extract all Meteora pool addresses
+def build_luts_by_pool(arbitrage_routes, lut_mapping):
+    """
+    Build the Meteora pool address -> {lut: addresses} index of the LUTs of the routes through each pool.
+    """
+    luts_by_pool = {}
+    for route in arbitrage_routes:
+        addresses = lut_mapping.get(route['lut'])
+        if addresses is None:
+            continue
+        for pool_key, dex_key in (('pool_a_address', 'pool_a_dex'), ('pool_b_address', 'pool_b_dex')):
+            if route[dex_key] == 'meteora':
+                luts_by_pool.setdefault(route[pool_key], {})[route['lut']] = addresses
+    return luts_by_pool
+
+def set_route_status(cache, route, status):
+    """
+    Update the status of a cached route and patch the reserve index in place.
+    """
+    route['status'] = status
+    reindex_route(cache, route)
+
+def reindex_route(cache, route, remove=False):
+    """
+    Patch the reserve index in place for one route: drop its entries, then add it back if enabled.
+    """
+    routes_by_reserve = cache['routes_by_reserve']
+
+    for address in {route[key] for key in ROUTE_RESERVE_KEYS}:
+        entries = tuple(entry for entry in routes_by_reserve.get(address, ()) if entry[0]['id'] != route['id'])
+        if route['status'] == 'enabled' and not remove:
+            entries += ((route, cache['lut_mapping'].get(route['lut'])),)
+
+        if entries:
+            routes_by_reserve[address] = entries
+        else:
+            routes_by_reserve.pop(address, None)
+
+def get_meteora_pools(arbitrage_routes):
+    """
+    Extract all Meteora pool addresses from the routes.
+    """
     meteora_pools = set()
     for route in arbitrage_routes:
         if route['pool_a_dex'] == 'meteora':
             meteora_pools.add(route['pool_a_address'])
         if route['pool_b_dex'] == 'meteora':
             meteora_pools.add(route['pool_b_address'])
+    return meteora_pools
+
+async def warm_up_dlmm(pool_address, bin_array_count, bucket, semaphore):
+    """
+    Create the DLMM object of a pool and fetch its swap bin arrays, retrying on 429/503 responses.
+    """
+    dlmm = None
+    async with semaphore:
+        for attempt in range(DLMM_WARMUP_RETRIES):
+            try:
+                if dlmm is None:
+                    await bucket.acquire()
+                    dlmm = await asyncio.to_thread(DLMM_CLIENT.create, Pubkey.from_string(pool_address), RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID], DLMM_ENGINE)
+                await bucket.acquire()
+                bin_arrays = await asyncio.to_thread(dlmm.get_bin_array_for_swap, True, bin_array_count)
+                return dlmm, bin_arrays
+            except Exception as e:
+                if is_rate_limited(e):
+                    logger.error(f"Rate limited, pausing DLMM warm-up for {RATE_LIMIT_BACKOFF_SECONDS}s...")
+                    bucket.penalize(RATE_LIMIT_BACKOFF_SECONDS)
+                elif "503" in str(e):
+                    logger.error("unavailable...")
+                elif "lbPair" in str(e):
+                    logger.warning("lbPair not found, skipping...")
+                    return None
+                else:
+                    logger.error(f"DLMM Cache error: {e}")
+                    return None
+
+    logger.error(f"DLMM warm-up gave up on {pool_address} after {DLMM_WARMUP_RETRIES} attempts")
+    return None
+
+async def warm_up_dlmms(meteora_pools, bin_array_count):
+    """
+    Create the DLMM objects and swap bin arrays of all pools with bounded concurrency and a shared rate limit.
+    """
+    bucket = TokenBucket(DLMM_WARMUP_RATE)
+    semaphore = asyncio.Semaphore(DLMM_WARMUP_CONCURRENCY)
+
+    pool_addresses = list(meteora_pools)
+    results = await asyncio.gather(*[
+        warm_up_dlmm(pool_address, bin_array_count, bucket, semaphore) for pool_address in pool_addresses
+    ])
 
-    # Create DLMM objects for each Meteora pool
     meteora_dlmm_client_objects = {}
-    meteora_dlmm_objects = {}
     meteora_dlmm_bin_arrays_objects = {}
+    for pool_address, result in zip(pool_addresses, results):
+        if result:
+            meteora_dlmm_client_objects[pool_address], meteora_dlmm_bin_arrays_objects[pool_address] = result
+
+    logger.info(f"🔥 Warmed up {len(meteora_dlmm_client_objects)}/{len(pool_addresses)} DLMM pools ({bucket.rate_limited} rate limited responses).")
+    return meteora_dlmm_client_objects, meteora_dlmm_bin_arrays_objects
 
-    for pool_address in meteora_pools:
-        try:
-            dlmm = DLMM_CLIENT.create(Pubkey.from_string(pool_address), RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID])
-            time.sleep(0.5)
-            meteora_dlmm_client_objects[pool_address] = dlmm
-            dlmm = DLMM(Pubkey.from_string(pool_address), RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID])
-            time.sleep(0.5)
-            meteora_dlmm_objects[pool_address] = dlmm
-            bin_arrays = DLMM.get_bin_array_for_swap(dlmm, True, 4)
-            meteora_dlmm_bin_arrays_objects[pool_address] = bin_arrays
-            time.sleep(0.5)
-        except Exception as e:
-            if "429" in str(e):
-                logger.error("Rate limited, sleeping for 5s...")
-                time.sleep(5)
-            elif "503" in str(e):
-                logger.error("unavailable...")
-            elif "lbPair" in str(e):
-                logger.warning("lbPair not found, skipping...")
-            else:
-                logger.error(f"DLMM Cache error: {e}")
-
-    # Fetch LUT addresses for each route and store them in a dictionary
-    lut_mapping = dict(await asyncio.gather(
+async def fetch_lut_mapping(arbitrage_routes):
+    """
+    Fetch LUT addresses for each route and store them in a dictionary.
+    """
+    return dict(await asyncio.gather(
         *[get_lut_addresses_from_route(route['lut']) for route in arbitrage_routes if route['lut'] is not None]
     ))
 
+async def timed(timings, phase, awaitable):
+    """
+    Await and record how long the phase took in seconds.
+    """
+    start_time = time.perf_counter()
+    result = await awaitable
+    timings[phase] = time.perf_counter() - start_time
+    return result
+
+def log_timings(name, timings, start_time):
+    """
+    Log the per-phase timings of a warm-up.
+    """
+    phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+    logger.info(f"⏱️ {name} took {time.perf_counter() - start_time:.2f}s ({phases})")
+
+def get_watched_reserve_addresses(arbitrage_routes):
+    """
+    All reserve addresses the routes listen to.
+    """
+    return {route[key] for route in arbitrage_routes for key in ROUTE_RESERVE_KEYS}
+
+def build_reserve_metadata(arbitrage_routes):
+    """
+    Reserve address -> (mint, decimals, dex) of the accounts the routes listen to, the fields of a vault that never change.
+    """
+    reserve_metadata = {}
+    for route in arbitrage_routes:
+        for address_key, mint_key, decimals_key, dex_key in ROUTE_RESERVE_METADATA_KEYS:
+            reserve_metadata[route[address_key]] = (route[mint_key], int(route[decimals_key]), route[dex_key])
+    return reserve_metadata
+
+async def apply_routes_diff(cache, added_ids, removed_ids, bin_array_count=4):
+    """
+    Reload routes in place instead of rebuilding the cache: upsert the added routes, evict the removed ones
+    and set up or drop DLMM objects only for pools that appear or disappear.
+
+    Returns the Meteora pool addresses that were added and removed.
+    """
+    added_ids = set(added_ids)
+    removed_ids = set(removed_ids)
+    arbitrage_routes = cache['arbitrage_routes']
+    pools_before = get_meteora_pools(arbitrage_routes)
+
+    # Reload the added routes with the same filters as a full reload, routes filtered out are evicted
+    fresh_routes = {}
+    if added_ids:
+        fresh_routes = {route['id']: route for route in await get_two_arbitrage_routes() if route['id'] in added_ids}
+    evicted_ids = removed_ids | (added_ids - fresh_routes.keys())
+
+    new_luts = [route for route in fresh_routes.values() if route['lut'] is not None and route['lut'] not in cache['lut_mapping']]
+    cache['lut_mapping'].update(await fetch_lut_mapping(new_luts))
+
+    routes = []
+    for route in arbitrage_routes:
+        if route['id'] in evicted_ids:
+            if 'routes_by_reserve' in cache:
+                reindex_route(cache, route, remove=True)
+            if 'route_evaluator' in cache:
+                cache['route_evaluator'].remove_route(route['id'])
+            if 'route_templates' in cache:
+                cache['route_templates'].pop(route['id'], None)
+        elif route['id'] not in fresh_routes:
+            routes.append(route)
+    routes.extend(fresh_routes.values())
+    arbitrage_routes[:] = routes
+
+    if 'routes_by_reserve' in cache:
+        for route in fresh_routes.values():
+            reindex_route(cache, route)
+    if 'luts_by_pool' in cache:
+        cache['luts_by_pool'] = build_luts_by_pool(arbitrage_routes, cache['lut_mapping'])
+
+    # DLMM objects only for pools that are new, and none kept for pools no route uses anymore
+    pools_after = get_meteora_pools(arbitrage_routes)
+    client_objects = cache['meteora_dlmm_client_objects']
+    bin_arrays_objects = cache['meteora_dlmm_bin_arrays_objects']
+
+    new_client_objects, new_bin_arrays_objects = await warm_up_dlmms(pools_after - client_objects.keys(), bin_array_count)
+    client_objects.update(new_client_objects)
+    bin_arrays_objects.update(new_bin_arrays_objects)
+
+    if 'route_templates' in cache:
+        for route_id in fresh_routes:
+            cache['route_templates'].pop(route_id, None)
+        cache['route_templates'].update(await asyncio.to_thread(build_route_templates, cache, list(fresh_routes.values())))
+
+    stale_pools = pools_before - pools_after
+    for pool_address in stale_pools:
+        client_objects.pop(pool_address, None)
+        bin_arrays_objects.pop(pool_address, None)
+
+    logger.info(f"🔄 Routes reloaded in place: {len(fresh_routes)} upserted, {len(evicted_ids)} evicted, {len(new_client_objects)} DLMM pools added, {len(stale_pools)} removed.")
+    return set(new_client_objects), stale_pools
+
+async def setup_cache():
+    """
+    Preload objects for faster access.
+    """
+    start_time = time.perf_counter()
+    timings = {}
+
+    arbitrage_routes = await timed(timings, 'routes', get_two_arbitrage_routes())
+    meteora_pools = get_meteora_pools(arbitrage_routes)
+
+    # DLMM objects, LUT addresses and the rent lookup are independent, warm them up concurrently.
+    # One DLMM object per pool serves both the quotes and the swap instructions.
+    (meteora_dlmm_client_objects, meteora_dlmm_bin_arrays_objects), lut_mapping, balance_needed = await asyncio.gather(
+        timed(timings, 'dlmms', warm_up_dlmms(meteora_pools, 4)),
+        timed(timings, 'luts', fetch_lut_mapping(arbitrage_routes)),
+        timed(timings, 'rent', asyncio.to_thread(Token.get_min_balance_rent_for_exempt_for_account, client)),
+    )
+    meteora_dlmm_objects = meteora_dlmm_client_objects
+
+    # Index enabled routes by reserve address for O(1) lookups on account updates
+    index_start_time = time.perf_counter()
+    routes_by_reserve = build_routes_by_reserve(arbitrage_routes, lut_mapping)
+
     vault = Keypair.from_base58_string(VAULT_PRIVATE_KEY)
     payer = Keypair.from_base58_string(PAYER_PRIVATE_KEY)
     operator = Keypair.from_base58_string(OPERATOR_PRIVATE_KEY)
 
     # solana_client = Client(RPC_ENDPOINT_LIST[0])
     solana_client = Client(RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID])
-    broadcast_clients = []
-    for endpoint in RPC_ENDPOINT_LIST:
-        broadcast_client = AsyncClient(endpoint)
-        broadcast_clients.append(broadcast_client)
+    signature_tracker = SignatureTracker(AsyncClient(RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID], commitment=RPC_STATUS))
+    broadcaster = Broadcaster(signature_tracker, RPC_ENDPOINT_LIST)
 
     # print("Generating seed for WSOL account...")
     seed = base64.urlsafe_b64encode(os.urandom(24)).decode("utf-8")
@@ -99,8 +314,6 @@ async def setup_cache():
     operator_wsol_token_account = Pubkey.from_string(OPERATOR_WSOL_ATA)
     vault_wsol_token_account = Pubkey.from_string(VAULT_WSOL_ATA)
 
-    balance_needed = Token.get_min_balance_rent_for_exempt_for_account(client)
-
     compute_unit_limit = set_compute_unit_limit(UNIT_BUDGET)
     compute_unit_price = set_compute_unit_price(UNIT_PRICE)
     
@@ -131,17 +344,18 @@ async def setup_cache():
     )
 
     jito_tip_address = Pubkey.from_string(JITO_TIP_ADDRESS)
+    timings['instructions'] = time.perf_counter() - index_start_time
 
-    logger.info("🧠 Cache setup complete.")
-    
-    return {
+    cache = {
         "arbitrage_routes": arbitrage_routes,
+        "routes_by_reserve": routes_by_reserve,
         "meteora_dlmm_client_objects": meteora_dlmm_client_objects,
         "meteora_dlmm_objects": meteora_dlmm_objects,
         "meteora_dlmm_bin_arrays_objects": meteora_dlmm_bin_arrays_objects,
         "lut_mapping": lut_mapping,
         "solana_client": solana_client,
-        "broadcast_clients": broadcast_clients,
+        "broadcaster": broadcaster,
+        "signature_tracker": signature_tracker,
         "vault": vault,
         "payer": payer,
         "operator": operator,
@@ -155,55 +369,42 @@ async def setup_cache():
         "close_wsol_account_instruction": close_wsol_account_instruction,
         "init_wsol_account_instruction": init_wsol_account_instruction,
         "jito_tip_address": jito_tip_address,
+        "jito_submitter": JitoSubmitter(),
+        "route_evaluator": RouteEvaluator(max(len(arbitrage_routes), 1)),
     }
 
+    # One precompiled transaction per route, trades then only patch amounts, blockhash and signatures
+    if SWAP_TEMPLATES:
+        cache['route_templates'] = await timed(timings, 'templates', asyncio.to_thread(build_route_templates, cache, arbitrage_routes))
+        logger.info(f"🧩 {len(cache['route_templates'])} route templates compiled.")
+
+    logger.info("🧠 Cache setup complete.")
+    log_timings("Cache setup", timings, start_time)
+
+    return cache
+
 async def setup_dlmm_cache():
     """
     Preload objects for faster access.
     """
-    arbitrage_routes = await get_two_arbitrage_routes()
-
-    # Extract all Meteora pool addresses
-    meteora_pools = set()
-    for route in arbitrage_routes:
-        if route['pool_a_dex'] == 'meteora':
-            meteora_pools.add(route['pool_a_address'])
-        if route['pool_b_dex'] == 'meteora':
-            meteora_pools.add(route['pool_b_address'])
+    start_time = time.perf_counter()
+    timings = {}
 
-    # Create DLMM objects for each Meteora pool
-    meteora_dlmm_client_objects = {}
-    meteora_dlmm_bin_arrays_objects = {}
+    arbitrage_routes = await timed(timings, 'routes', get_two_arbitrage_routes())
+    meteora_pools = get_meteora_pools(arbitrage_routes)
 
-    for pool_address in meteora_pools:
-        try:
-            dlmm = DLMM_CLIENT.create(Pubkey.from_string(pool_address), RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID])
-            time.sleep(0.5)
-            meteora_dlmm_client_objects[pool_address] = dlmm
-            bin_arrays = DLMM.get_bin_array_for_swap(dlmm, True, 3)
-            meteora_dlmm_bin_arrays_objects[pool_address] = bin_arrays
-            time.sleep(0.5)
-        except Exception as e:
-            if "429" in str(e):
-                logger.error("Rate limited, sleeping for 5s...")
-                time.sleep(5)
-            elif "503" in str(e):
-                logger.error("unavailable...")
-            elif "lbPair" in str(e):
-                logger.warning("lbPair not found, skipping...")
-            else:
-                logger.error(f"DLMM Cache error: {e}")
-
-
-    # Fetch LUT addresses for each route and store them in a dictionary
-    lut_mapping = dict(await asyncio.gather(
-        *[get_lut_addresses_from_route(route['lut']) for route in arbitrage_routes if route['lut'] is not None]
-    ))
+    (meteora_dlmm_client_objects, meteora_dlmm_bin_arrays_objects), lut_mapping = await asyncio.gather(
+        timed(timings, 'dlmms', warm_up_dlmms(meteora_pools, 3)),
+        timed(timings, 'luts', fetch_lut_mapping(arbitrage_routes)),
+    )
 
     logger.info("🧠 Cache setup complete.")
+    log_timings("DLMM cache setup", timings, start_time)
     
     return {
+        "arbitrage_routes": arbitrage_routes,
         "meteora_dlmm_client_objects": meteora_dlmm_client_objects,
         "meteora_dlmm_bin_arrays_objects": meteora_dlmm_bin_arrays_objects,
         "lut_mapping": lut_mapping,
+        "luts_by_pool": build_luts_by_pool(arbitrage_routes, lut_mapping),
     }
@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import CONFIRM_POLL_INTERVAL, CONFIRM_TIMEOUT_SECONDS, CONFIRM_FLUSH_SECONDS
+from modules.blockhash import get_cached_blockhash, MAX_PROCESSING_AGE
+from modules.database import save_opportunities
+
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+
+# getSignatureStatuses accepts up to 256 signatures per request
+STATUS_BATCH_SIZE = 256
+
+LANDED = 'landed'
+FAILED = 'failed'
+EXPIRED = 'expired'
+
+# Outcome -> opportunities.execution_status
+EXECUTION_STATUS = {LANDED: 'executed', FAILED: 'failed', EXPIRED: 'expired'}
+LANDED_STATUSES = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+
+class SignatureTracker:
+    """
+    Background confirmation of sent transactions.
+
+    `track` registers a signature without waiting and returns a future. One task polls every pending
+    signature with batched getSignatureStatuses calls, resolves the futures with landed/failed/expired
+    and writes the outcomes of tracked opportunities to the `opportunities` table in batches.
+    """
+
+    def __init__(self, client, interval=CONFIRM_POLL_INTERVAL, timeout=CONFIRM_TIMEOUT_SECONDS, flush_seconds=CONFIRM_FLUSH_SECONDS):
+        self.client = client
+        self.interval = interval
+        self.timeout = timeout
+        self.flush_seconds = flush_seconds
+        self.pending = {}
+        self.outcomes = []
+        self.flushed_at = time.monotonic()
+        self.counts = {LANDED: 0, FAILED: 0, EXPIRED: 0}
+
+    def track(self, signature, last_valid_block_height=None, opportunity=None, callback=None):
+        """
+        Follow a signature until it lands, fails or expires, returns a future of its outcome.
+
+        Tracking an already pending signature returns the same future and attaches `opportunity` or `callback`.
+        """
+        signature = signature if isinstance(signature, Signature) else Signature.from_string(str(signature))
+        entry = self.pending.get(signature)
+        if entry is None:
+            if last_valid_block_height is None:
+                # Sent with (about) the latest blockhash, its expiry is the provider's
+                latest = get_cached_blockhash()
+                last_valid_block_height = latest.last_valid_block_height if latest is not None else None
+            entry = {
+                'future': asyncio.get_running_loop().create_future(),
+                'callbacks': [],
+                'opportunity': None,
+                'last_valid_block_height': last_valid_block_height,
+                'submitted_at': time.monotonic(),
+            }
+            self.pending[signature] = entry
+
+        if opportunity is not None:
+            entry['opportunity'] = opportunity
+        if callback is not None:
+            entry['callbacks'].append(callback)
+        return entry['future']
+
+    def _resolve(self, signature, outcome, slot=None, error=None):
+        entry = self.pending.pop(signature)
+        result = {'signature': str(signature), 'outcome': outcome, 'slot': slot, 'error': error}
+        self.counts[outcome] += 1
+
+        if not entry['future'].done():
+            entry['future'].set_result(result)
+        for callback in entry['callbacks']:
+            try:
+                callback(result)
+            except Exception as e:
+                logger.warning(f"🚨 Confirmation callback error: {e}")
+
+        if entry['opportunity'] is not None:
+            self.outcomes.append({
+                **entry['opportunity'],
+                'execution_status': EXECUTION_STATUS[outcome],
+                'signature': str(signature),
+                'slot': slot,
+                'error': error,
+            })
+
+        icon = {LANDED: '✅', FAILED: '❌', EXPIRED: '⌛'}[outcome]
+        logger.info(f"{icon} Transaction {signature} {outcome}" + (f": {error}" if error else ""))
+
+    async def poll(self):
+        """One round of status checks for all pending signatures."""
+        signatures = list(self.pending)
+        for start in range(0, len(signatures), STATUS_BATCH_SIZE):
+            batch = signatures[start:start + STATUS_BATCH_SIZE]
+            try:
+                statuses = (await self.client.get_signature_statuses(batch)).value
+            except Exception as e:
+                logger.warning(f"🚨 Signature status error: {e}")
+                continue
+
+            for signature, status in zip(batch, statuses):
+                if status is None or signature not in self.pending:
+                    continue
+                if status.err is not None:
+                    self._resolve(signature, FAILED, status.slot, str(status.err))
+                elif status.confirmation_status in LANDED_STATUSES:
+                    self._resolve(signature, LANDED, status.slot)
+
+        # Past the last valid block height (or the timeout without one) the transaction can no longer land
+        latest = get_cached_blockhash()
+        block_height = latest.last_valid_block_height - MAX_PROCESSING_AGE if latest is not None else None
+        now = time.monotonic()
+        for signature, entry in list(self.pending.items()):
+            last_valid = entry['last_valid_block_height']
+            if (block_height is not None and last_valid is not None and block_height > last_valid) or now - entry['submitted_at'] > self.timeout:
+                self._resolve(signature, EXPIRED)
+
+    async def flush(self):
+        """Write the collected opportunity outcomes in one batch."""
+        outcomes, self.outcomes = self.outcomes, []
+        self.flushed_at = time.monotonic()
+        try:
+            await save_opportunities(outcomes)
+        except Exception as e:
+            logger.error(f"Failed to save {len(outcomes)} opportunities: {e}")
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                if self.pending:
+                    try:
+                        await self.poll()
+                    except Exception as e:
+                        logger.warning(f"🚨 Confirmation poll error: {e}")
+                if self.outcomes and time.monotonic() - self.flushed_at >= self.flush_seconds:
+                    await self.flush()
+        finally:
+            if self.outcomes:
+                await self.flush()
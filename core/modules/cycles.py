@@ -0,0 +1,322 @@
+import math
+import numpy as np
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import SOLANA_PROGRAM, CYCLE_MAX_HOPS, CYCLE_MIN_RETURN, CYCLE_BOUNDS_SLACK
+
+INF = math.inf
+
+def edge_weights(price, fee_rate):
+    """
+    -log of the marginal rates a -> b and b -> a of a pool quoting `price` units of b per unit of a.
+    A cycle whose weights sum below zero returns more than it started with after fees.
+    """
+    if not price or price <= 0:
+        return INF, INF
+    keep = math.log1p(-fee_rate)
+    log_price = math.log(price)
+    return -(log_price + keep), log_price - keep
+
+class CycleEngine:
+    """
+    Arbitrage cycles through an anchor token (SOL) on a graph of tokens and pools.
+
+    Every pool is two directed edges weighted by the -log of its marginal rate after fees, a profitable
+    cycle has a negative total weight. `search` runs a depth-first search bounded to `max_hops` from the
+    anchor, pruned with the best weight any remaining path back to the anchor can have. `update_pool`
+    re-scores the known cycles of one pool and searches only the cycles through it.
+
+    The pruning bounds are computed in one vectorized pass with every edge weight lowered by `slack`, so
+    small price moves leave them valid. An edge dropping below its floor lowers them hop by hop from
+    that edge only.
+    """
+
+    def __init__(self, anchor=SOLANA_PROGRAM, max_hops=CYCLE_MAX_HOPS, min_hops=3, min_return=CYCLE_MIN_RETURN, slack=CYCLE_BOUNDS_SLACK):
+        self.max_hops = max_hops
+        self.min_hops = min_hops
+        self.threshold = -math.log1p(min_return)
+        self.slack = slack
+
+        self.nodes = {}
+        self.mints = []
+        self.out_edges = []
+        self.in_edges = []
+
+        self.edge_from = []
+        self.edge_to = []
+        self.edge_pool = []
+        self.weight = []
+        self.floor = []
+
+        # pool id -> (fee rate, edge a -> b, edge b -> a)
+        self.pools = {}
+        self.prices = {}
+
+        # Profitable cycles: edges from the anchor -> weight, and the cycles each pool is part of
+        self.cycles = {}
+        self.pool_cycles = {}
+
+        # Best weights to and from the anchor in at most k hops, one list per k
+        self.bounds_stale = True
+        self.to_anchor = []
+        self.from_anchor = []
+        self.bound_rebuilds = 0
+        self.bound_repairs = 0
+
+        self.anchor = self.node(anchor)
+
+    def node(self, mint):
+        index = self.nodes.get(mint)
+        if index is None:
+            index = self.nodes[mint] = len(self.mints)
+            self.mints.append(mint)
+            self.out_edges.append([])
+            self.in_edges.append([])
+            for level in self.to_anchor + self.from_anchor:
+                level.append(INF)
+        return index
+
+    def add_edge(self, pool_id, a, b):
+        edge = len(self.edge_from)
+        self.edge_from.append(a)
+        self.edge_to.append(b)
+        self.edge_pool.append(pool_id)
+        self.weight.append(INF)
+        self.floor.append(INF)
+        self.out_edges[a].append(edge)
+        self.in_edges[b].append(edge)
+        return edge
+
+    def add_pool(self, pool_id, mint_a, mint_b, fee_rate, price=None):
+        """
+        Add a pool quoting `price` units of mint_b per unit of mint_a, an existing pool only gets the new price.
+        """
+        if pool_id in self.pools:
+            self.set_price(pool_id, price)
+            return
+        a, b = self.node(mint_a), self.node(mint_b)
+        self.pools[pool_id] = (fee_rate, self.add_edge(pool_id, a, b), self.add_edge(pool_id, b, a))
+        self.set_price(pool_id, price)
+
+    def set_price(self, pool_id, price):
+        """
+        Update the edge weights of a pool, None disables it. Lowers the bounds if an edge drops below its floor.
+        """
+        fee_rate, edge_ab, edge_ba = self.pools[pool_id]
+        self.prices[pool_id] = price
+        for edge, weight in zip((edge_ab, edge_ba), edge_weights(price, fee_rate)):
+            self.weight[edge] = weight
+            if weight < self.floor[edge] and not self.bounds_stale:
+                self.lower_floor(edge, weight - self.slack)
+
+    def lower_floor(self, edge, floor):
+        self.floor[edge] = floor
+        self.relax(self.to_anchor, self.edge_from[edge], self.edge_to[edge], floor, self.in_edges, self.edge_from)
+        self.relax(self.from_anchor, self.edge_to[edge], self.edge_from[edge], floor, self.out_edges, self.edge_to)
+        self.bound_repairs += 1
+
+    def relax(self, levels, node, next_node, floor, towards, neighbour):
+        """
+        Lower the bound levels after the floor of the edge node -> next_node (reversed for the bounds from the anchor)
+        dropped to `floor`. Each level only revisits the nodes whose previous level went down and their neighbours.
+        """
+        changed = ()
+        for k in range(1, len(levels)):
+            level, previous = levels[k], levels[k - 1]
+            updates = {}
+            if floor + previous[next_node] < level[node]:
+                updates[node] = floor + previous[next_node]
+            for changed_node in changed:
+                best = min(previous[changed_node], updates.get(changed_node, INF))
+                if best < level[changed_node]:
+                    updates[changed_node] = best
+                for edge in towards[changed_node]:
+                    other = neighbour[edge]
+                    value = self.floor[edge] + previous[changed_node]
+                    if value < level[other] and value < updates.get(other, INF):
+                        updates[other] = value
+            for changed_node, value in updates.items():
+                level[changed_node] = value
+            changed = updates
+
+    def rebuild_bounds(self):
+        """
+        Best weights to the anchor and from the anchor in at most k hops, for k below max_hops.
+        """
+        weight = np.array(self.weight) - self.slack
+        edge_from = np.array(self.edge_from, dtype=np.int64)
+        edge_to = np.array(self.edge_to, dtype=np.int64)
+
+        def levels(source, target):
+            level = np.full(len(self.mints), INF)
+            level[self.anchor] = 0.0
+            result = [level]
+            for _ in range(1, self.max_hops):
+                level = level.copy()
+                np.minimum.at(level, source, weight + result[-1][target])
+                result.append(level)
+            # Python lists, the searches index them one node at a time
+            return [level.tolist() for level in result]
+
+        self.to_anchor = levels(edge_from, edge_to)
+        self.from_anchor = levels(edge_to, edge_from)
+        self.floor = weight.tolist()
+        self.bounds_stale = False
+        self.bound_rebuilds += 1
+
+    def cycle_weight(self, edges):
+        return sum(self.weight[edge] for edge in edges)
+
+    def add_cycle(self, edges, weight):
+        self.cycles[edges] = weight
+        for edge in edges:
+            self.pool_cycles.setdefault(self.edge_pool[edge], set()).add(edges)
+
+    def drop_cycle(self, edges):
+        self.cycles.pop(edges, None)
+        for edge in edges:
+            cycles = self.pool_cycles.get(self.edge_pool[edge])
+            if cycles is not None:
+                cycles.discard(edges)
+
+    def search(self):
+        """
+        Full search of the profitable cycles from the anchor, replaces the known cycles. Returns {edges: weight}.
+        """
+        if self.bounds_stale:
+            self.rebuild_bounds()
+        self.cycles.clear()
+        self.pool_cycles.clear()
+
+        for edges, weight in self.paths_to_anchor(self.anchor, 0.0, self.threshold, self.max_hops, self.min_hops):
+            self.add_cycle(edges, weight)
+        return dict(self.cycles)
+
+    def update_pool(self, pool_id, price):
+        """
+        Apply a price change of one pool and return the profitable cycles through it, {edges: weight}.
+
+        Only the cycles of this pool can change: the known ones are re-scored, new ones are searched
+        as a path from the anchor to one side of the pool joined with a path from the other side back.
+        """
+        self.set_price(pool_id, price)
+        if self.bounds_stale:
+            self.rebuild_bounds()
+
+        for edges in list(self.pool_cycles.get(pool_id, ())):
+            weight = self.cycle_weight(edges)
+            if weight < self.threshold:
+                self.cycles[edges] = weight
+            else:
+                self.drop_cycle(edges)
+
+        _, edge_ab, edge_ba = self.pools[pool_id]
+        for edge in (edge_ab, edge_ba):
+            for edges, weight in self.cycles_through(edge):
+                self.add_cycle(edges, weight)
+
+        return {edges: self.cycles[edges] for edges in self.pool_cycles.get(pool_id, ())}
+
+    def cycles_through(self, edge):
+        weight = self.weight[edge]
+        if weight == INF:
+            return []
+        u, v = self.edge_from[edge], self.edge_to[edge]
+        last = self.max_hops - 1
+
+        # Cheapest the two sides can be, most updates stop here
+        prefix_bound = 0.0 if u == self.anchor else self.from_anchor[last][u]
+        suffix_bound = 0.0 if v == self.anchor else self.to_anchor[last][v]
+        if weight + prefix_bound + suffix_bound >= self.threshold:
+            return []
+
+        if u == self.anchor:
+            prefixes = [((), 0.0)]
+        else:
+            prefixes = self.paths_from_anchor(u, weight, self.threshold - suffix_bound, last - (v != self.anchor))
+        if v == self.anchor:
+            suffixes = [((), 0.0)]
+        else:
+            suffixes = self.paths_to_anchor(v, weight, self.threshold - prefix_bound, last - (u != self.anchor))
+
+        cycles = []
+        for prefix, prefix_weight in prefixes:
+            # Tokens the prefix reaches up to u, the suffix leaves v and the tokens after it, none may repeat
+            prefix_nodes = {self.edge_to[e] for e in prefix}
+            for suffix, suffix_weight in suffixes:
+                hops = len(prefix) + 1 + len(suffix)
+                total = prefix_weight + weight + suffix_weight
+                if not self.min_hops <= hops <= self.max_hops or total >= self.threshold:
+                    continue
+                if any(self.edge_from[e] in prefix_nodes for e in suffix):
+                    continue
+                cycles.append((prefix + (edge,) + suffix, total))
+        return cycles
+
+    def paths_to_anchor(self, start, base, budget, max_hops, min_hops=1):
+        """
+        Paths from `start` back to the anchor with at most `max_hops` edges and `base` + weight below `budget`.
+        """
+        paths = []
+        out_edges, edge_to, weight, to_anchor, anchor = self.out_edges, self.edge_to, self.weight, self.to_anchor, self.anchor
+        visited = {start}
+        path = []
+
+        def extend(node, total, hops):
+            for edge in out_edges[node]:
+                target = edge_to[edge]
+                reached = total + weight[edge]
+                if target == anchor:
+                    if reached < budget and hops + 1 >= min_hops:
+                        paths.append((tuple(path) + (edge,), reached - base))
+                elif hops + 1 < max_hops and target not in visited and reached + to_anchor[max_hops - hops - 1][target] < budget:
+                    visited.add(target)
+                    path.append(edge)
+                    extend(target, reached, hops + 1)
+                    path.pop()
+                    visited.discard(target)
+
+        if max_hops > 0:
+            extend(start, base, 0)
+        return paths
+
+    def paths_from_anchor(self, end, base, budget, max_hops):
+        """
+        Paths from the anchor to `end` with at most `max_hops` edges and `base` + weight below `budget`, walked backwards.
+        """
+        paths = []
+        in_edges, edge_from, weight, from_anchor, anchor = self.in_edges, self.edge_from, self.weight, self.from_anchor, self.anchor
+        visited = {end}
+        path = []
+
+        def extend(node, total, hops):
+            for edge in in_edges[node]:
+                source = edge_from[edge]
+                reached = total + weight[edge]
+                if source == anchor:
+                    if reached < budget:
+                        paths.append(((edge,) + tuple(reversed(path)), reached - base))
+                elif hops + 1 < max_hops and source not in visited and reached + from_anchor[max_hops - hops - 1][source] < budget:
+                    visited.add(source)
+                    path.append(edge)
+                    extend(source, reached, hops + 1)
+                    path.pop()
+                    visited.discard(source)
+
+        if max_hops > 0:
+            extend(end, base, 0)
+        return paths
+
+    def legs(self, edges):
+        """
+        (pool id, mint in, mint out) of each hop of a cycle.
+        """
+        return [(self.edge_pool[edge], self.mints[self.edge_from[edge]], self.mints[self.edge_to[edge]]) for edge in edges]
+
+def cycle_return(weight):
+    """
+    Fraction gained around a cycle at marginal prices, after fees.
+    """
+    return math.exp(-weight) - 1
@@ -9,19 +9,73 @@ import json
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
 
-from config import DB_CONFIG, MIN_METEORA_FEE
+from config import DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_STATEMENT_CACHE_SIZE, DB_POOL_CLOSE_TIMEOUT, MIN_METEORA_FEE
+
+# Process-wide connection pool, created lazily on first use
+db_pool = None
+db_pool_loop = None
+db_pool_lock = None
+
+async def get_db_pool():
+    """
+    Return the shared asyncpg pool, creating it for the running event loop if needed.
+    """
+    global db_pool, db_pool_loop, db_pool_lock
+
+    loop = asyncio.get_running_loop()
+    if db_pool is not None and db_pool_loop is loop:
+        return db_pool
+
+    # A pool is bound to the loop that created it (scripts may call asyncio.run more than once)
+    if db_pool_lock is None or db_pool_loop is not loop:
+        db_pool_lock = asyncio.Lock()
+        db_pool = None
+        db_pool_loop = loop
+
+    async with db_pool_lock:
+        if db_pool is None:
+            db_pool = await asyncpg.create_pool(
+                **DB_CONFIG,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                statement_cache_size=DB_STATEMENT_CACHE_SIZE,  # Prepared statements survive across calls
+            )
+            logger.info(f"🗄️ Database pool ready ({DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE} connections).")
+
+    return db_pool
+
+async def close_db_pool():
+    """
+    Gracefully close the shared pool, terminating it if connections do not release in time.
+    """
+    global db_pool
+
+    if db_pool is None:
+        return
+
+    pool, db_pool = db_pool, None
+    try:
+        await asyncio.wait_for(pool.close(), timeout=DB_POOL_CLOSE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Database pool did not close gracefully, terminating: {e}")
+        pool.terminate()
+    logger.info("🗄️ Database pool closed.")
+
+async def run_with_db_pool(coro):
+    """
+    Run a coroutine and close the shared pool once it finishes (for standalone scripts).
+    """
+    try:
+        return await coro
+    finally:
+        await close_db_pool()
 
 # Asynchronous context manager for handling database connections
 @asynccontextmanager
 async def get_db_connection():
-    conn = None
-    try:
-        # Attempt to connect to the database
-        conn = await asyncpg.connect(**DB_CONFIG)
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
         yield conn
-    finally:
-        if conn:
-            await conn.close()
 
 async def setup_database():
     """
@@ -195,11 +249,21 @@ async def setup_database():
                 pool_a_trade_direction TEXT NOT NULL, -- 'buy' or 'sell' for pool A
                 pool_b_trade_direction TEXT NOT NULL, -- 'buy' or 'sell' for pool B
                 pool_c_trade_direction TEXT DEFAULT NULL, -- 'buy' or 'sell' for pool C (if three-pool route)
-                execution_status TEXT DEFAULT 'pending', -- 'pending', 'executed', 'failed'
+                execution_status TEXT DEFAULT 'pending', -- 'pending', 'executed', 'failed', 'expired'
+                signature TEXT DEFAULT NULL, -- Transaction signature of the execution
+                slot BIGINT DEFAULT NULL, -- Slot the transaction landed in
+                error TEXT DEFAULT NULL, -- On-chain error of a failed transaction
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         ''')
+        # Execution outcome columns, for tables created before they existed
+        await conn.execute('''
+            ALTER TABLE opportunities
+                ADD COLUMN IF NOT EXISTS signature TEXT DEFAULT NULL,
+                ADD COLUMN IF NOT EXISTS slot BIGINT DEFAULT NULL,
+                ADD COLUMN IF NOT EXISTS error TEXT DEFAULT NULL;
+        ''')
 
         # Create the LUT table
         await conn.execute('''
@@ -396,6 +460,212 @@ async def get_tradable_tokens():
         rows = await conn.fetch('SELECT * FROM tokens WHERE tradable = TRUE')
         return [dict(row) for row in rows]
 
+async def get_tradable_sol_pools():
+    """
+    Fetch the enabled Raydium and Meteora pools pairing a tradable token with SOL, for all tokens in one query.
+    `token_address` is the non-SOL side of the pool.
+    """
+    sol_address = 'So11111111111111111111111111111111111111112'
+
+    async with get_db_connection() as conn:
+        rows = await conn.fetch('''
+            SELECT
+                p.id, p.address, p.dex, p.fee,
+                t_base.address AS base_token_address, t_quote.address AS quote_token_address,
+                CASE WHEN t_base.address = $1 THEN t_quote.address ELSE t_base.address END AS token_address
+            FROM pools p
+            JOIN tokens t_base ON p.base_token_id = t_base.id
+            JOIN tokens t_quote ON p.quote_token_id = t_quote.id
+            WHERE (
+                (t_base.tradable = TRUE AND t_quote.address = $1)
+                OR
+                (t_quote.tradable = TRUE AND t_base.address = $1)
+            )
+            AND p.dex IN ('raydium', 'meteora')
+            AND p.status = 'enabled'
+        ''', sol_address)
+        return [dict(row) for row in rows]
+
+async def get_two_arbitrage_route_keys():
+    """
+    Fetch the (pool_a_id, pool_b_id) -> (reserve_a_address_pool_a, status) map of all saved two-pool routes.
+    """
+    async with get_db_connection() as conn:
+        rows = await conn.fetch('''
+            SELECT pool_a_id, pool_b_id, reserve_a_address_pool_a, status FROM two_arbitrage_routes
+        ''')
+        return {(row['pool_a_id'], row['pool_b_id']): (row['reserve_a_address_pool_a'], row['status']) for row in rows}
+
+async def upsert_two_arbitrage_routes(routes):
+    """
+    Insert or refresh two-pool routes in one batch.
+
+    Args:
+        routes (list[tuple]): pool_a_id, pool_b_id, pool_a_address, pool_b_address, pool_a_dex, pool_b_dex,
+            the four reserves, the four reserve decimals, the four reserve addresses, pool_a_fee, pool_b_fee,
+            the four reserve mints and the status of each route.
+    """
+    if not routes:
+        return
+    async with get_db_connection() as conn:
+        await conn.executemany('''
+            INSERT INTO two_arbitrage_routes (
+                pool_a_id, pool_b_id, pool_a_address, pool_b_address, pool_a_dex, pool_b_dex,
+                reserve_a_pool_a, reserve_b_pool_a, reserve_a_pool_b, reserve_b_pool_b,
+                reserve_a_pool_a_decimals, reserve_b_pool_a_decimals,
+                reserve_a_pool_b_decimals, reserve_b_pool_b_decimals,
+                reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_address_pool_b, reserve_b_address_pool_b,
+                pool_a_fee, pool_b_fee,
+                reserve_a_mint_pool_a, reserve_b_mint_pool_a, reserve_a_mint_pool_b, reserve_b_mint_pool_b,
+                status
+            ) VALUES (
+                $1, $2, $3, $4,
+                $5, $6, $7, $8, $9, $10,
+                $11, $12, $13, $14,
+                $15, $16, $17, $18,
+                $19, $20,
+                $21, $22, $23, $24,
+                $25
+            )
+            ON CONFLICT (pool_a_id, pool_b_id)
+            DO UPDATE SET
+                pool_a_address = EXCLUDED.pool_a_address,
+                pool_b_address = EXCLUDED.pool_b_address,
+                pool_a_dex = EXCLUDED.pool_a_dex,
+                pool_b_dex = EXCLUDED.pool_b_dex,
+                pool_a_fee = EXCLUDED.pool_a_fee,
+                pool_b_fee = EXCLUDED.pool_b_fee,
+                reserve_a_pool_a = EXCLUDED.reserve_a_pool_a,
+                reserve_b_pool_a = EXCLUDED.reserve_b_pool_a,
+                reserve_a_pool_b = EXCLUDED.reserve_a_pool_b,
+                reserve_b_pool_b = EXCLUDED.reserve_b_pool_b,
+                reserve_a_pool_a_decimals = EXCLUDED.reserve_a_pool_a_decimals,
+                reserve_b_pool_a_decimals = EXCLUDED.reserve_b_pool_a_decimals,
+                reserve_a_pool_b_decimals = EXCLUDED.reserve_a_pool_b_decimals,
+                reserve_b_pool_b_decimals = EXCLUDED.reserve_b_pool_b_decimals,
+                reserve_a_address_pool_a = EXCLUDED.reserve_a_address_pool_a,
+                reserve_b_address_pool_a = EXCLUDED.reserve_b_address_pool_a,
+                reserve_a_address_pool_b = EXCLUDED.reserve_a_address_pool_b,
+                reserve_b_address_pool_b = EXCLUDED.reserve_b_address_pool_b,
+                reserve_a_mint_pool_a = EXCLUDED.reserve_a_mint_pool_a,
+                reserve_b_mint_pool_a = EXCLUDED.reserve_b_mint_pool_a,
+                reserve_a_mint_pool_b = EXCLUDED.reserve_a_mint_pool_b,
+                reserve_b_mint_pool_b = EXCLUDED.reserve_b_mint_pool_b,
+                lut = EXCLUDED.lut,
+                status = EXCLUDED.status,
+                updated_at = CURRENT_TIMESTAMP;
+        ''', routes)
+
+async def set_tokens_not_tradable(token_addresses):
+    """
+    Mark tokens as non-tradable in one statement.
+    """
+    if not token_addresses:
+        return
+    async with get_db_connection() as conn:
+        await conn.execute('''
+            UPDATE tokens
+            SET tradable = FALSE
+            WHERE address = ANY($1::text[])
+        ''', list(token_addresses))
+
+async def get_tradable_pools():
+    """
+    Fetch the enabled Raydium and Meteora pools whose two tokens are tradable or SOL, the graph of the cycle search.
+    """
+    sol_address = 'So11111111111111111111111111111111111111112'
+
+    async with get_db_connection() as conn:
+        rows = await conn.fetch('''
+            SELECT
+                p.id, p.address, p.dex, p.fee,
+                t_base.address AS base_token_address, t_quote.address AS quote_token_address
+            FROM pools p
+            JOIN tokens t_base ON p.base_token_id = t_base.id
+            JOIN tokens t_quote ON p.quote_token_id = t_quote.id
+            WHERE (t_base.tradable = TRUE OR t_base.address = $1)
+            AND (t_quote.tradable = TRUE OR t_quote.address = $1)
+            AND p.dex IN ('raydium', 'meteora')
+            AND p.status = 'enabled'
+        ''', sol_address)
+        return [dict(row) for row in rows]
+
+async def get_three_arbitrage_route_keys():
+    """
+    Fetch the (pool_a_id, pool_b_id, pool_c_id) keys of all saved three-pool routes.
+    """
+    async with get_db_connection() as conn:
+        rows = await conn.fetch('''
+            SELECT pool_a_id, pool_b_id, pool_c_id FROM three_arbitrage_routes
+        ''')
+        return {(row['pool_a_id'], row['pool_b_id'], row['pool_c_id']) for row in rows}
+
+async def upsert_three_arbitrage_routes(routes):
+    """
+    Insert or refresh three-pool routes in one batch.
+
+    Args:
+        routes (list[tuple]): the three pool ids, addresses, dexes and fees, the six reserve addresses,
+            the six reserve mints, the six reserves and the six reserve decimals (pool a, b, c order,
+            reserve a before reserve b) and the status of each route.
+    """
+    if not routes:
+        return
+    async with get_db_connection() as conn:
+        await conn.executemany('''
+            INSERT INTO three_arbitrage_routes (
+                pool_a_id, pool_b_id, pool_c_id,
+                pool_a_address, pool_b_address, pool_c_address,
+                pool_a_dex, pool_b_dex, pool_c_dex,
+                pool_a_fee, pool_b_fee, pool_c_fee,
+                reserve_a_address_pool_a, reserve_b_address_pool_a,
+                reserve_a_address_pool_b, reserve_b_address_pool_b,
+                reserve_a_address_pool_c, reserve_b_address_pool_c,
+                reserve_a_mint_pool_a, reserve_b_mint_pool_a,
+                reserve_a_mint_pool_b, reserve_b_mint_pool_b,
+                reserve_a_mint_pool_c, reserve_b_mint_pool_c,
+                reserve_a_pool_a, reserve_b_pool_a,
+                reserve_a_pool_b, reserve_b_pool_b,
+                reserve_a_pool_c, reserve_b_pool_c,
+                reserve_a_pool_a_decimals, reserve_b_pool_a_decimals,
+                reserve_a_pool_b_decimals, reserve_b_pool_b_decimals,
+                reserve_a_pool_c_decimals, reserve_b_pool_c_decimals,
+                status
+            ) VALUES (
+                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12,
+                $13, $14, $15, $16, $17, $18,
+                $19, $20, $21, $22, $23, $24,
+                $25, $26, $27, $28, $29, $30,
+                $31, $32, $33, $34, $35, $36,
+                $37
+            )
+            ON CONFLICT (pool_a_id, pool_b_id, pool_c_id)
+            DO UPDATE SET
+                pool_a_fee = EXCLUDED.pool_a_fee,
+                pool_b_fee = EXCLUDED.pool_b_fee,
+                pool_c_fee = EXCLUDED.pool_c_fee,
+                reserve_a_address_pool_a = EXCLUDED.reserve_a_address_pool_a,
+                reserve_b_address_pool_a = EXCLUDED.reserve_b_address_pool_a,
+                reserve_a_address_pool_b = EXCLUDED.reserve_a_address_pool_b,
+                reserve_b_address_pool_b = EXCLUDED.reserve_b_address_pool_b,
+                reserve_a_address_pool_c = EXCLUDED.reserve_a_address_pool_c,
+                reserve_b_address_pool_c = EXCLUDED.reserve_b_address_pool_c,
+                reserve_a_mint_pool_a = EXCLUDED.reserve_a_mint_pool_a,
+                reserve_b_mint_pool_a = EXCLUDED.reserve_b_mint_pool_a,
+                reserve_a_mint_pool_b = EXCLUDED.reserve_a_mint_pool_b,
+                reserve_b_mint_pool_b = EXCLUDED.reserve_b_mint_pool_b,
+                reserve_a_mint_pool_c = EXCLUDED.reserve_a_mint_pool_c,
+                reserve_b_mint_pool_c = EXCLUDED.reserve_b_mint_pool_c,
+                reserve_a_pool_a = EXCLUDED.reserve_a_pool_a,
+                reserve_b_pool_a = EXCLUDED.reserve_b_pool_a,
+                reserve_a_pool_b = EXCLUDED.reserve_a_pool_b,
+                reserve_b_pool_b = EXCLUDED.reserve_b_pool_b,
+                reserve_a_pool_c = EXCLUDED.reserve_a_pool_c,
+                reserve_b_pool_c = EXCLUDED.reserve_b_pool_c,
+                status = EXCLUDED.status,
+                updated_at = CURRENT_TIMESTAMP;
+        ''', routes)
+
 async def get_two_arbitrage_routes():
     """
     Fetch all arbitrage routes from the database where at least one tradable token is involved.
@@ -641,6 +911,31 @@ async def update_two_arbitrage_route_status(route_id, status):
             # print(f"Failed to update status for route ID {route_id}: {e}")
             return False
           
+async def save_opportunities(opportunities):
+    """
+    Insert executed opportunities with their outcome in one round trip.
+
+    Args:
+        opportunities (list[dict]): route_type, route_id, trade_size, estimated_profit_native,
+            execution_status, signature, slot and error of each execution.
+    """
+    if not opportunities:
+        return
+    async with get_db_connection() as conn:
+        await conn.executemany('''
+            INSERT INTO opportunities (
+                route_type, route_id, trade_size, estimated_profit_native, estimated_profit_usd,
+                pool_a_trade_direction, pool_b_trade_direction, execution_status, signature, slot, error
+            )
+            VALUES ($1, $2, $3, $4, 0, 'buy', 'sell', $5, $6, $7, $8)
+        ''', [
+            (
+                opportunity['route_type'], opportunity['route_id'], opportunity['trade_size'], opportunity['estimated_profit_native'],
+                opportunity['execution_status'], opportunity['signature'], opportunity['slot'], opportunity['error'],
+            )
+            for opportunity in opportunities
+        ])
+
 async def get_lut_addresses_from_route(lut):
     """
     Fetch the LUT addresses for a specific LUT address from the database.
@@ -673,4 +968,4 @@ async def get_ata_for_token(token_address):
         return ata_address
     
 if __name__ == "__main__":
-    asyncio.run(setup_database())
+    asyncio.run(run_with_db_pool(setup_database()))
@@ -1,3 +1,4 @@
 __version__ = "0.1.0"
 
-from .dlmm import DLMM, DLMM_CLIENT
\ No newline at end of file
+from .dlmm import DLMM, DLMM_CLIENT
+from .native import NativeDLMM
\ No newline at end of file
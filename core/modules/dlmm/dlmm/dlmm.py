@@ -28,14 +28,7 @@ class DLMM:
         
         self.pool_address = public_key
         self.rpc = rpc
-        session = requests.Session()
-        session.headers.update({
-            'Content-type': 'application/json', 
-            'Accept': 'text/plain',
-            'pool': str(public_key),
-            'rpc': rpc
-        })
-        self.__session = session
+        session = self._init_session(public_key, rpc)
 
         try:
             result = session.get(f"{API_URL}/dlmm/create").json()
@@ -47,6 +40,20 @@ class DLMM:
         except requests.exceptions.ConnectionError as e:
             raise HTTPError(f"Error connecting to DLMM: {e}")
     
+    def _init_session(self, public_key: Pubkey, rpc: str) -> requests.Session:
+        '''
+        Create the HTTP session used to talk to the DLMM API for this pool.
+        '''
+        session = requests.Session()
+        session.headers.update({
+            'Content-type': 'application/json', 
+            'Accept': 'text/plain',
+            'pool': str(public_key),
+            'rpc': rpc
+        })
+        self.__session = session
+        return session
+
     def get_active_bin(self) -> ActiveBin:
         '''
         The function retrieves the active bin ID and its corresponding price.
@@ -775,18 +782,26 @@ class DLMM_CLIENT:
     '''
 
     @staticmethod
-    def create(public_key: Pubkey, rpc: str) -> DLMM:
+    def create(public_key: Pubkey, rpc: str, engine: str = "sidecar") -> DLMM:
         '''
         Create a DLMM object using the public key of the pool and the RPC URL.
 
         Args:
             public_key (Pubkey): The public key of the pool.
             rpc (str): The RPC URL.
+            engine (str): "sidecar" to use the DLMM API, "native" to decode the pool accounts in-process.
         
         '''
         if isinstance(public_key, Pubkey) == False:
             raise TypeError("public_key must be of type `solders.pubkey.Pubkey`")
         
+        if engine == "native":
+            from .native import NativeDLMM
+            return NativeDLMM(public_key, rpc)
+
+        if engine != "sidecar":
+            raise ValueError("engine must be either `sidecar` or `native`")
+
         return DLMM(public_key, rpc)
     
     @staticmethod
@@ -0,0 +1,517 @@
+import hashlib
+import math
+import struct
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from solana.rpc.api import Client
+from solders.pubkey import Pubkey
+from .dlmm import DLMM
+from .types import ActiveBin, GetBins, LBPair, TokenReserve, DlmmHttpError as HTTPError
+
+LB_CLMM_PROGRAM_ID = Pubkey.from_string("LBUZKhRxPF3XUpBCjp4YzTKgLccjZhTSDM9YuVaPwxo")
+
+MAX_BIN_PER_ARRAY = 70
+BIN_ARRAY_BITMAP_SIZE = 512
+BASIS_POINT_MAX = 10000
+
+# Anchor discriminators: sha256("<namespace>:<name>")[:8]
+LB_PAIR_DISCRIMINATOR = hashlib.sha256(b"account:LbPair").digest()[:8]
+BIN_ARRAY_DISCRIMINATOR = hashlib.sha256(b"account:BinArray").digest()[:8]
+SWAP_DISCRIMINATOR = hashlib.sha256(b"global:swap").digest()[:8]
+
+# LbPair layout (after the 8 byte discriminator): StaticParameters (32), VariableParameters (32), pair fields (16), pubkeys...
+LB_PAIR_STATIC_PARAMETERS = struct.Struct("<HHHHIIiiH6x")
+LB_PAIR_VARIABLE_PARAMETERS = struct.Struct("<IIi4xq8x")
+LB_PAIR_FIELDS = struct.Struct("<B2sBiHBB2sBx")
+LB_PAIR_MIN_SIZE = 720
+
+# BinArray layout: index (i64), version (u8), padding (7), lb_pair, then 70 bins of 144 bytes
+BIN_ARRAY_HEADER = struct.Struct("<qB7x32s")
+BIN = struct.Struct("<QQQQQQ96x")  # amount_x, amount_y, price (u128 lo/hi), liquidity_supply (u128 lo/hi)
+BIN_ARRAY_SIZE = 8 + BIN_ARRAY_HEADER.size + MAX_BIN_PER_ARRAY * BIN.size
+
+MINT_DECIMALS_OFFSET = 44
+TOKEN_ACCOUNT_AMOUNT_OFFSET = 64
+
+AccountFetcher = Callable[[List[Pubkey]], List[Optional[Tuple[Pubkey, bytes]]]]
+
+@dataclass
+class LbPairState():
+    base_factor: int
+    filter_period: int
+    decay_period: int
+    reduction_factor: int
+    variable_fee_control: int
+    max_volatility_accumulator: int
+    min_bin_id: int
+    max_bin_id: int
+    protocol_share: int
+    volatility_accumulator: int
+    volatility_reference: int
+    index_reference: int
+    last_update_timestamp: int
+    bump_seed: int
+    bin_step_seed: bytes
+    pair_type: int
+    active_id: int
+    bin_step: int
+    status: int
+    require_base_factor_seed: int
+    base_factor_seed: bytes
+    activation_type: int
+    token_x_mint: Pubkey
+    token_y_mint: Pubkey
+    reserve_x: Pubkey
+    reserve_y: Pubkey
+    protocol_fee_x: int
+    protocol_fee_y: int
+    padding1: bytes
+    oracle: Pubkey
+    bin_array_bitmap: int
+    last_updated_at: int
+    padding2: bytes
+    base_key: Optional[Pubkey]
+
+    def to_json(self) -> dict:
+        '''
+        The lb pair in the shape returned by the DLMM API, so it can be wrapped in `LBPair`.
+        '''
+        return {
+            "bumpSeed": [self.bump_seed],
+            "binStepSeed": list(self.bin_step_seed),
+            "pairType": self.pair_type,
+            "activeId": self.active_id,
+            "binStep": self.bin_step,
+            "status": self.status,
+            "requireBaseFactorSeed": self.require_base_factor_seed,
+            "baseFactorSeed": list(self.base_factor_seed),
+            "tokenXMint": str(self.token_x_mint),
+            "tokenYMint": str(self.token_y_mint),
+            "padding1": list(self.padding1),
+            "padding2": list(self.padding2),
+            "baseKey": str(self.base_key) if self.base_key else None,
+        }
+
+@dataclass
+class BinArrayState():
+    public_key: Pubkey
+    index: int
+    version: int
+    lb_pair: Pubkey
+    bins: List[Tuple[int, int, int, int]]  # (amount_x, amount_y, price_q64, liquidity_supply)
+
+def decode_lb_pair(data: bytes) -> LbPairState:
+    '''
+    Decode the raw bytes of an LbPair account.
+    '''
+    if len(data) < LB_PAIR_MIN_SIZE or data[:8] != LB_PAIR_DISCRIMINATOR:
+        raise ValueError("data is not an LbPair account")
+
+    static = LB_PAIR_STATIC_PARAMETERS.unpack_from(data, 8)
+    variable = LB_PAIR_VARIABLE_PARAMETERS.unpack_from(data, 40)
+    bump_seed, bin_step_seed, pair_type, active_id, bin_step, status, require_base_factor_seed, base_factor_seed, activation_type = LB_PAIR_FIELDS.unpack_from(data, 72)
+    protocol_fee_x, protocol_fee_y = struct.unpack_from("<QQ", data, 216)
+    bitmap_words = struct.unpack_from("<16Q", data, 584)
+    last_updated_at, = struct.unpack_from("<q", data, 712)
+
+    return LbPairState(
+        *static,
+        *variable,
+        bump_seed=bump_seed,
+        bin_step_seed=bin_step_seed,
+        pair_type=pair_type,
+        active_id=active_id,
+        bin_step=bin_step,
+        status=status,
+        require_base_factor_seed=require_base_factor_seed,
+        base_factor_seed=base_factor_seed,
+        activation_type=activation_type,
+        token_x_mint=Pubkey.from_bytes(data[88:120]),
+        token_y_mint=Pubkey.from_bytes(data[120:152]),
+        reserve_x=Pubkey.from_bytes(data[152:184]),
+        reserve_y=Pubkey.from_bytes(data[184:216]),
+        protocol_fee_x=protocol_fee_x,
+        protocol_fee_y=protocol_fee_y,
+        padding1=data[232:264],
+        oracle=Pubkey.from_bytes(data[552:584]),
+        bin_array_bitmap=sum(word << (64 * i) for i, word in enumerate(bitmap_words)),
+        last_updated_at=last_updated_at,
+        padding2=data[720:752] if len(data) >= 752 else bytes(32),
+        base_key=Pubkey.from_bytes(data[784:816]) if len(data) >= 816 else None,
+    )
+
+def decode_bin_array(public_key: Pubkey, data: bytes) -> BinArrayState:
+    '''
+    Decode the raw bytes of a BinArray account.
+    '''
+    if len(data) < BIN_ARRAY_SIZE or data[:8] != BIN_ARRAY_DISCRIMINATOR:
+        raise ValueError("data is not a BinArray account")
+
+    index, version, lb_pair = BIN_ARRAY_HEADER.unpack_from(data, 8)
+    bins = [
+        (amount_x, amount_y, price_lo | (price_hi << 64), supply_lo | (supply_hi << 64))
+        for amount_x, amount_y, price_lo, price_hi, supply_lo, supply_hi
+        in BIN.iter_unpack(data[8 + BIN_ARRAY_HEADER.size:BIN_ARRAY_SIZE])
+    ]
+    return BinArrayState(public_key, index, version, Pubkey.from_bytes(lb_pair), bins)
+
+def bin_id_to_bin_array_index(bin_id: int) -> int:
+    '''
+    Index of the bin array holding `bin_id` (rounds towards negative infinity like the program).
+    '''
+    return bin_id // MAX_BIN_PER_ARRAY
+
+def get_price_of_bin_by_bin_id(bin_id: int, bin_step: int) -> float:
+    '''
+    Price per lamport of a bin: (1 + bin_step / 10000) ^ bin_id.
+    '''
+    return (1 + bin_step / BASIS_POINT_MAX) ** bin_id
+
+def derive_bin_array(lb_pair: Pubkey, index: int) -> Pubkey:
+    return Pubkey.find_program_address([b"bin_array", bytes(lb_pair), struct.pack("<q", index)], LB_CLMM_PROGRAM_ID)[0]
+
+def derive_bin_array_bitmap_extension(lb_pair: Pubkey) -> Pubkey:
+    return Pubkey.find_program_address([b"bitmap", bytes(lb_pair)], LB_CLMM_PROGRAM_ID)[0]
+
+def derive_event_authority() -> Pubkey:
+    return Pubkey.find_program_address([b"__event_authority"], LB_CLMM_PROGRAM_ID)[0]
+
+EVENT_AUTHORITY = derive_event_authority()
+
+def to_bn_json(value: int) -> str:
+    '''
+    Format an integer the way BN.js serializes it to JSON (even-length hex), so callers parsing the API output keep working.
+    '''
+    hex_value = format(value, "x")
+    return hex_value if len(hex_value) % 2 == 0 else f"0{hex_value}"
+
+def rpc_account_fetcher(rpc: str) -> AccountFetcher:
+    '''
+    Fetch (owner, data) for a list of accounts with getMultipleAccounts, 100 accounts per request.
+    '''
+    client = Client(rpc)
+
+    def fetch(public_keys: List[Pubkey]) -> List[Optional[Tuple[Pubkey, bytes]]]:
+        accounts = []
+        for i in range(0, len(public_keys), 100):
+            try:
+                result = client.get_multiple_accounts(public_keys[i:i + 100]).value
+            except Exception as e:
+                raise HTTPError(f"Error fetching DLMM accounts: {e}")
+            accounts.extend((account.owner, bytes(account.data)) if account else None for account in result)
+        return accounts
+
+    return fetch
+
+class NativeDLMM(DLMM):
+    '''
+    DLMM engine that decodes the pool accounts in-process instead of calling the DLMM API.
+
+    Bin math, bin array selection and the swap instruction are computed locally. Methods that are
+    not implemented natively (positions, liquidity, quotes) still go through the DLMM API.
+    '''
+    fetch_accounts: AccountFetcher
+    lb_pair_state: LbPairState
+    bin_arrays: Dict[int, BinArrayState]
+    auto_refresh: bool
+
+    def __init__(self, public_key: Pubkey, rpc: str, fetch_accounts: Optional[AccountFetcher] = None) -> None:
+        if type(public_key) != Pubkey:
+            raise TypeError("public_key must be of type `solders.pubkey.Pubkey`")
+
+        if type(rpc) != str:
+            raise TypeError("rpc must be of type `str`")
+
+        self.pool_address = public_key
+        self.rpc = rpc
+        self._init_session(public_key, rpc)
+        self.fetch_accounts = fetch_accounts or rpc_account_fetcher(rpc)
+        self.bin_arrays = {}
+        self.auto_refresh = True
+        self._bin_array_keys = {}
+        self.bitmap_extension = derive_bin_array_bitmap_extension(public_key)
+        self.refetch_states()
+
+    def refetch_states(self) -> None:
+        '''
+        Fetch the lb pair, its mints, reserves and bitmap extension in two round trips.
+        '''
+        lb_pair_account, = self.fetch_accounts([self.pool_address])
+        if lb_pair_account is None:
+            raise HTTPError(f"lbPair {self.pool_address} not found")
+        self.update_account(self.pool_address, lb_pair_account[1])
+
+        state = self.lb_pair_state
+        mint_x, mint_y, reserve_x, reserve_y, extension = self.fetch_accounts(
+            [state.token_x_mint, state.token_y_mint, state.reserve_x, state.reserve_y, self.bitmap_extension]
+        )
+        if mint_x is None or mint_y is None:
+            raise HTTPError(f"lbPair {self.pool_address} mints not found")
+
+        self.token_x_program, self.token_y_program = mint_x[0], mint_y[0]
+        self.has_bitmap_extension = extension is not None
+        self.token_X = TokenReserve({
+            "publicKey": str(state.token_x_mint),
+            "reserve": str(state.reserve_x),
+            "amount": str(self._token_amount(reserve_x)),
+            "decimal": mint_x[1][MINT_DECIMALS_OFFSET],
+        })
+        self.token_Y = TokenReserve({
+            "publicKey": str(state.token_y_mint),
+            "reserve": str(state.reserve_y),
+            "amount": str(self._token_amount(reserve_y)),
+            "decimal": mint_y[1][MINT_DECIMALS_OFFSET],
+        })
+
+    def update_account(self, public_key: Pubkey, data: bytes) -> None:
+        '''
+        Apply raw LbPair or BinArray account bytes, e.g. from an account subscription.
+        '''
+        if data[:8] == LB_PAIR_DISCRIMINATOR:
+            self.lb_pair_state = decode_lb_pair(data)
+            self.lb_pair = LBPair(self.lb_pair_state.to_json())
+        elif data[:8] == BIN_ARRAY_DISCRIMINATOR:
+            bin_array = decode_bin_array(public_key, data)
+            self.bin_arrays[bin_array.index] = bin_array
+        else:
+            raise ValueError(f"Unknown DLMM account {public_key}")
+
+    def get_bin_array_key(self, index: int) -> Pubkey:
+        '''
+        Bin array address for an index, cached since deriving a PDA is relatively slow.
+        '''
+        key = self._bin_array_keys.get(index)
+        if key is None:
+            key = self._bin_array_keys[index] = derive_bin_array(self.pool_address, index)
+        return key
+
+    def load_bin_arrays(self, indexes: List[int], refresh_lb_pair: bool = False) -> None:
+        '''
+        Fetch the bin arrays for `indexes` (and optionally the lb pair) in a single round trip.
+        '''
+        keys = [self.get_bin_array_key(index) for index in indexes]
+        accounts = self.fetch_accounts([self.pool_address, *keys] if refresh_lb_pair else keys)
+
+        if refresh_lb_pair:
+            lb_pair_account = accounts.pop(0)
+            if lb_pair_account is None:
+                raise HTTPError(f"lbPair {self.pool_address} not found")
+            self.update_account(self.pool_address, lb_pair_account[1])
+
+        for index, key, account in zip(indexes, keys, accounts):
+            if account is None:
+                self.bin_arrays.pop(index, None)
+            else:
+                self.update_account(key, account[1])
+
+    def get_active_bin(self) -> ActiveBin:
+        '''
+        The function retrieves the active bin ID and its corresponding price.
+        '''
+        active_id = self.lb_pair_state.active_id
+        if self.auto_refresh:
+            self.load_bin_arrays([bin_id_to_bin_array_index(active_id)], refresh_lb_pair=True)
+            active_id = self.lb_pair_state.active_id
+        return ActiveBin(self._bin_json(active_id))
+
+    def from_price_per_lamport(self, price: float) -> float:
+        '''
+        The function converts a price per lamport value to a real price of bin.
+
+        Args:
+            price (float): The price per lamport.
+
+        '''
+        if type(price) != float:
+            raise TypeError("price must be of type `float`")
+
+        return price * 10 ** (self.token_X.decimal - self.token_Y.decimal)
+
+    def to_price_per_lamport(self, price: float) -> float:
+        '''
+        The function converts a real price of bin to a lamport value.
+
+        Args:
+            price (float): The price per lamport.
+
+        '''
+        if type(price) != float:
+            raise TypeError("price must be of type `float`")
+
+        return price / 10 ** (self.token_X.decimal - self.token_Y.decimal)
+
+    def get_bin_id_from_price(self, price: float, min: bool) -> int | None:
+        '''
+        The function calculates the bin ID for a price per lamport, rounding down when `min` is true and up otherwise.
+        '''
+        bin_id = math.log(price) / math.log(1 + self.lb_pair_state.bin_step / BASIS_POINT_MAX)
+        return math.floor(bin_id) if min else math.ceil(bin_id)
+
+    def get_bins_around_active_bin(self, number_of_bins_to_left: int, number_of_bins_to_right: int) -> GetBins:
+        '''
+        The function retrieves the bins around the active bin, refreshing the lb pair and the bin arrays in range first.
+        '''
+        if self.auto_refresh:
+            indexes = self.get_bin_array_indexes_around_active_bin(number_of_bins_to_left, number_of_bins_to_right)
+            self.load_bin_arrays(indexes, refresh_lb_pair=True)
+
+            # The active bin may have moved out of the bin arrays we just fetched
+            missing = [index for index in self.get_bin_array_indexes_around_active_bin(number_of_bins_to_left, number_of_bins_to_right) if index not in indexes]
+            if missing:
+                self.load_bin_arrays(missing)
+
+        active_id = self.lb_pair_state.active_id
+        return self._get_bins(active_id - number_of_bins_to_left - 1, active_id + number_of_bins_to_right + 1)
+
+    def get_bin_array_indexes_around_active_bin(self, number_of_bins_to_left: int, number_of_bins_to_right: int) -> List[int]:
+        '''
+        Indexes of the bin arrays `get_bins_around_active_bin` reads for the current active bin.
+        '''
+        active_id = self.lb_pair_state.active_id
+        return self._bin_array_indexes(active_id - number_of_bins_to_left - 1, active_id + number_of_bins_to_right + 1)
+
+    def get_bins_between_lower_and_upper_bound(self, lower_bound: int, upper_bound: int) -> GetBins:
+        '''
+        The function retrieves the bins between the lower and upper bin IDs.
+        '''
+        if type(lower_bound) != int:
+            raise TypeError("lower_bound must be of type `int`")
+
+        if type(upper_bound) != int:
+            raise TypeError("upper_bound must be of type `int`")
+
+        if self.auto_refresh:
+            self.load_bin_arrays(self._bin_array_indexes(lower_bound, upper_bound), refresh_lb_pair=True)
+
+        return self._get_bins(lower_bound, upper_bound)
+
+    def get_bin_array_for_swap(self, swap_Y_to_X: bool, count: Optional[int]=4) -> List[dict]:
+        '''
+        This function retrieves the bin arrays a swap walks through, starting from the active bin array.
+
+        The flag is passed through like the DLMM API does: callers use True for token X -> Y swaps
+        (the SDK's `swapForY`), which walks towards lower bin IDs.
+
+        Args:
+            swap_Y_to_X (bool): A boolean value that indicates the swap direction.
+            count (Optional[int]): The number of `BinArrayAccount` objects to retrieve.
+
+        '''
+        if isinstance(swap_Y_to_X, bool) == False:
+            raise TypeError("swap_Y_to_X must be of type `bool`")
+
+        if count is not None and type(count) != int:
+            raise TypeError("count must be of type `int`")
+
+        count = count or 4
+        step = -1 if swap_Y_to_X else 1
+        active_index = bin_id_to_bin_array_index(self.lb_pair_state.active_id)
+
+        if -BIN_ARRAY_BITMAP_SIZE <= active_index < BIN_ARRAY_BITMAP_SIZE:
+            # Walk the internal bitmap: bit (index + 512) is set when the bin array exists
+            bitmap = self.lb_pair_state.bin_array_bitmap
+            end = -BIN_ARRAY_BITMAP_SIZE - 1 if step < 0 else BIN_ARRAY_BITMAP_SIZE
+            indexes = [index for index in range(active_index, end, step) if bitmap >> (index + BIN_ARRAY_BITMAP_SIZE) & 1][:count]
+        else:
+            # Outside the internal bitmap, probe consecutive bin arrays instead of decoding the extension
+            indexes = list(range(active_index, active_index + step * count * 2, step))
+
+        self.load_bin_arrays(indexes)
+        indexes = [index for index in indexes if index in self.bin_arrays][:count]
+
+        return [
+            {
+                "publicKey": str(self.bin_arrays[index].public_key),
+                "account": {
+                    "index": index,
+                    "version": self.bin_arrays[index].version,
+                    "lbPair": str(self.bin_arrays[index].lb_pair),
+                },
+            }
+            for index in indexes
+        ]
+
+    def swap_ixs(self, in_token: Pubkey, out_token: Pubkey, in_amount: int, min_out_amount: int, lb_pair: Pubkey,  user: Pubkey,  userTokenIn: Pubkey,  userTokenOut: Pubkey, binArrays: List[Pubkey]):
+        '''
+        Build the swap instruction locally, in the same JSON shape as the DLMM API.
+
+        Args:
+            in_token (Pubkey): The public key of the token to swap in.
+            out_token (Pubkey): The public key of the token to swap out.
+            in_amount (int): The amount of token to swap in.
+            min_out_amount (int): The minimum amount of token to swap out.
+            lb_pair (Pubkey): The public key of the liquidity pool pair.
+            user (Pubkey): The public key of the user.
+            binArrays (List[Pubkey]): The bin arrays to use for the swap (public keys or `get_bin_array_for_swap` entries).
+
+        '''
+        state = self.lb_pair_state
+        program_id = str(LB_CLMM_PROGRAM_ID)
+
+        def meta(pubkey, is_writable=False, is_signer=False):
+            return {"pubkey": str(pubkey), "isSigner": is_signer, "isWritable": is_writable}
+
+        keys = [
+            meta(lb_pair, True),
+            meta(self.bitmap_extension if self.has_bitmap_extension else program_id),
+            meta(state.reserve_x, True),
+            meta(state.reserve_y, True),
+            meta(userTokenIn, True),
+            meta(userTokenOut, True),
+            meta(state.token_x_mint),
+            meta(state.token_y_mint),
+            meta(state.oracle, True),
+            meta(program_id),  # host_fee_in is optional
+            meta(user, is_signer=True),
+            meta(self.token_x_program),
+            meta(self.token_y_program),
+            meta(EVENT_AUTHORITY),
+            meta(program_id),
+        ]
+        keys += [
+            meta(bin_array["publicKey"] if isinstance(bin_array, dict) else bin_array, True)
+            for bin_array in binArrays
+        ]
+
+        return [{
+            "programId": program_id,
+            "keys": keys,
+            "data": list(SWAP_DISCRIMINATOR + struct.pack("<QQ", in_amount, min_out_amount)),
+        }]
+
+    def _token_amount(self, account: Optional[Tuple[Pubkey, bytes]]) -> int:
+        if account is None:
+            return 0
+        return struct.unpack_from("<Q", account[1], TOKEN_ACCOUNT_AMOUNT_OFFSET)[0]
+
+    def _bin_array_indexes(self, lower_bin_id: int, upper_bin_id: int) -> List[int]:
+        return list(range(bin_id_to_bin_array_index(lower_bin_id), bin_id_to_bin_array_index(upper_bin_id) + 1))
+
+    def _bin_json(self, bin_id: int) -> dict:
+        '''
+        A bin in the JSON shape of the DLMM API, amounts are BN hex strings.
+        '''
+        index = bin_id_to_bin_array_index(bin_id)
+        bin_array = self.bin_arrays.get(index)
+        if bin_array:
+            amount_x, amount_y, _, supply = bin_array.bins[bin_id - index * MAX_BIN_PER_ARRAY]
+            version = bin_array.version
+        else:
+            amount_x = amount_y = supply = version = 0
+
+        price = get_price_of_bin_by_bin_id(bin_id, self.lb_pair_state.bin_step)
+        return {
+            "binId": bin_id,
+            "xAmount": to_bn_json(amount_x),
+            "yAmount": to_bn_json(amount_y),
+            "supply": to_bn_json(supply),
+            "version": version,
+            "price": repr(price),
+            "pricePerToken": repr(self.from_price_per_lamport(price)),
+        }
+
+    def _get_bins(self, lower_bin_id: int, upper_bin_id: int) -> GetBins:
+        return GetBins({
+            "activeBin": self.lb_pair_state.active_id,
+            "bins": [self._bin_json(bin_id) for bin_id in range(lower_bin_id, upper_bin_id + 1)],
+        })
@@ -0,0 +1,95 @@
+'''
+Record DLMM API responses together with the raw pool accounts they were computed from, for the native engine parity tests.
+
+Needs the DLMM API running on localhost:3000 and a mainnet RPC, commit the JSON files written to tests/fixtures.
+Record a few pools with different bin steps and token decimals.
+Once committed, run the tests with DLMM_PARITY_REQUIRED=1 in CI so a missing fixture fails instead of skipping.
+
+Usage:
+    python tests/record_fixtures.py <pool address> [pool address ...] <rpc url>
+'''
+import base64
+import json
+import os
+import sys
+import requests
+from solana.rpc.api import Client
+from solders.pubkey import Pubkey
+from dlmm.dlmm import API_URL
+from dlmm.native import bin_id_to_bin_array_index, decode_lb_pair, derive_bin_array, derive_bin_array_bitmap_extension
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+BINS_LEFT = 10
+BINS_RIGHT = 10
+SWAP_BIN_ARRAYS = 4
+
+# Any keys work here, the instruction is only built and never sent
+SWAP_USER = "8HYaEYe6ZRRXvPUNw6oqWsSoNmpV5D4vjLMiwhfbxZNy"
+SWAP_USER_TOKEN_IN = "3JuWjvoSWuxJWp3SsLT3qtMDaw3RiPTDoc8ZFWJB6Gn5"
+SWAP_USER_TOKEN_OUT = "DhGYdfE8zYqPbbaGkkNZWAX5JhLQmqVZt2ZbDgNxtwuQ"
+
+def fetch_accounts(client, public_keys):
+    result = client.get_multiple_accounts(public_keys).value
+    return {
+        str(key): {"owner": str(account.owner), "data": base64.b64encode(bytes(account.data)).decode()}
+        for key, account in zip(public_keys, result) if account
+    }
+
+def record(pool_address: str, rpc: str) -> str:
+    client = Client(rpc)
+    pool = Pubkey.from_string(pool_address)
+    session = requests.Session()
+    session.headers.update({'Content-type': 'application/json', 'Accept': 'text/plain', 'pool': pool_address, 'rpc': rpc})
+
+    # Snapshot the accounts first, then ask the API, then check the pool did not move in between
+    lb_pair_data = bytes(client.get_account_info(pool).value.data)
+    lb_pair = decode_lb_pair(lb_pair_data)
+    active_index = bin_id_to_bin_array_index(lb_pair.active_id)
+    lower_index = bin_id_to_bin_array_index(lb_pair.active_id - BINS_LEFT - 1)
+    upper_index = bin_id_to_bin_array_index(lb_pair.active_id + BINS_RIGHT + 1)
+    bin_array_indexes = sorted(set(range(lower_index, upper_index + 1)) | set(range(active_index - SWAP_BIN_ARRAYS * 2, active_index + 1)))
+
+    accounts = fetch_accounts(client, [
+        pool, lb_pair.token_x_mint, lb_pair.token_y_mint, lb_pair.reserve_x, lb_pair.reserve_y,
+        derive_bin_array_bitmap_extension(pool), *[derive_bin_array(pool, index) for index in bin_array_indexes],
+    ])
+
+    bin_arrays = session.post(f"{API_URL}/dlmm/get-bin-array-for-swap", data=json.dumps({"swapYToX": True, "count": SWAP_BIN_ARRAYS})).json()
+    swap_args = {
+        "inToken": str(lb_pair.token_x_mint),
+        "outToken": str(lb_pair.token_y_mint),
+        "inAmount": 1_000_000,
+        "minOutAmount": 1,
+        "lbPair": pool_address,
+        "userPublicKey": SWAP_USER,
+        "userTokenIn": SWAP_USER_TOKEN_IN,
+        "userTokenOut": SWAP_USER_TOKEN_OUT,
+        "binArrays": [bin_array["publicKey"] for bin_array in bin_arrays],
+    }
+    calls = {
+        "create": session.get(f"{API_URL}/dlmm/create").json(),
+        "get_active_bin": session.get(f"{API_URL}/dlmm/get-active-bin").json(),
+        "get_bins_around_active_bin": {
+            "args": [BINS_LEFT, BINS_RIGHT],
+            "result": session.post(f"{API_URL}/dlmm/get-bins-around-active-bin", data=json.dumps({"numberOfBinsToTheLeft": BINS_LEFT, "numberOfBinsToTheRight": BINS_RIGHT})).json(),
+        },
+        "get_bin_array_for_swap": {"args": [True, SWAP_BIN_ARRAYS], "result": bin_arrays},
+        "swap_ixs": {"args": swap_args, "result": session.post(f"{API_URL}/dlmm/swap_ixs", data=json.dumps(swap_args)).json()},
+    }
+
+    if bytes(client.get_account_info(pool).value.data) != lb_pair_data:
+        raise RuntimeError("Pool changed while recording, try again")
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f"{pool_address}.json")
+    with open(path, "w") as f:
+        json.dump({"pool": pool_address, "rpc": rpc, "accounts": accounts, "calls": calls}, f, indent=2)
+    return path
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    for pool_address in sys.argv[1:-1]:
+        print(f"Recorded {record(pool_address, sys.argv[-1])}")
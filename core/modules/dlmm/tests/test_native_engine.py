@@ -0,0 +1,187 @@
+import struct
+from dlmm import DLMM_CLIENT, NativeDLMM
+from dlmm.dlmm import DLMM
+from dlmm.native import BIN_ARRAY_DISCRIMINATOR, LB_CLMM_PROGRAM_ID, LB_PAIR_DISCRIMINATOR, SWAP_DISCRIMINATOR, bin_id_to_bin_array_index, decode_bin_array, decode_lb_pair, derive_bin_array, get_price_of_bin_by_bin_id, to_bn_json
+from dlmm.types import ActiveBin, GetBins
+from solders.pubkey import Pubkey
+
+TOKEN_PROGRAM = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+POOL = Pubkey.new_unique()
+MINT_X = Pubkey.new_unique()
+MINT_Y = Pubkey.new_unique()
+RESERVE_X = Pubkey.new_unique()
+RESERVE_Y = Pubkey.new_unique()
+ORACLE = Pubkey.new_unique()
+
+def lb_pair_bytes(active_id: int, bin_step: int, bin_array_indexes) -> bytes:
+    data = bytearray(904)
+    data[:8] = LB_PAIR_DISCRIMINATOR
+    struct.pack_into("<HHHHIIiiH", data, 8, 10000, 30, 600, 5000, 7500, 150000, -443636, 443636, 500)
+    struct.pack_into("<B2sBiHBB2sB", data, 72, 255, struct.pack("<H", bin_step), 0, active_id, bin_step, 0, 0, bytes(2), 0)
+    for offset, key in ((88, MINT_X), (120, MINT_Y), (152, RESERVE_X), (184, RESERVE_Y), (552, ORACLE)):
+        data[offset:offset + 32] = bytes(key)
+    bitmap = sum(1 << (index + 512) for index in bin_array_indexes)
+    struct.pack_into("<16Q", data, 584, *[(bitmap >> (64 * i)) & (2 ** 64 - 1) for i in range(16)])
+    return bytes(data)
+
+def bin_array_bytes(index: int, amounts) -> bytes:
+    data = bytearray(8 + 48 + 70 * 144)
+    data[:8] = BIN_ARRAY_DISCRIMINATOR
+    struct.pack_into("<qB", data, 8, index, 1)
+    data[24:56] = bytes(POOL)
+    for i, (amount_x, amount_y) in enumerate(amounts):
+        struct.pack_into("<QQ", data, 56 + i * 144, amount_x, amount_y)
+        struct.pack_into("<Q", data, 56 + i * 144 + 32, amount_x + amount_y)  # liquidity_supply (low word)
+    return bytes(data)
+
+def mint_bytes(decimals: int) -> bytes:
+    data = bytearray(82)
+    data[44] = decimals
+    return bytes(data)
+
+def token_account_bytes(amount: int) -> bytes:
+    data = bytearray(165)
+    struct.pack_into("<Q", data, 64, amount)
+    return bytes(data)
+
+def make_accounts(active_id=-30, bin_step=25, bin_array_indexes=(-2, -1, 0, 1)):
+    accounts = {
+        POOL: (LB_CLMM_PROGRAM_ID, lb_pair_bytes(active_id, bin_step, bin_array_indexes)),
+        MINT_X: (TOKEN_PROGRAM, mint_bytes(6)),
+        MINT_Y: (TOKEN_PROGRAM, mint_bytes(9)),
+        RESERVE_X: (TOKEN_PROGRAM, token_account_bytes(1_000_000)),
+        RESERVE_Y: (TOKEN_PROGRAM, token_account_bytes(2_000_000_000)),
+    }
+    for index in bin_array_indexes:
+        amounts = [(1000 + bin_id, 2000 + bin_id) for bin_id in range(index * 70, index * 70 + 70)]
+        accounts[derive_bin_array(POOL, index)] = (LB_CLMM_PROGRAM_ID, bin_array_bytes(index, amounts))
+    return accounts
+
+def make_dlmm(accounts) -> NativeDLMM:
+    return NativeDLMM(POOL, "http://localhost:8899", fetch_accounts=lambda keys: [accounts.get(key) for key in keys])
+
+def test_decode_lb_pair():
+    state = decode_lb_pair(lb_pair_bytes(-30, 25, [0]))
+    assert state.active_id == -30
+    assert state.bin_step == 25
+    assert state.base_factor == 10000
+    assert state.protocol_share == 500
+    assert state.token_x_mint == MINT_X
+    assert state.reserve_y == RESERVE_Y
+    assert state.oracle == ORACLE
+    assert state.bin_array_bitmap == 1 << 512
+
+def test_decode_bin_array():
+    key = derive_bin_array(POOL, -1)
+    bin_array = decode_bin_array(key, bin_array_bytes(-1, [(5, 7)]))
+    assert bin_array.index == -1
+    assert bin_array.lb_pair == POOL
+    assert len(bin_array.bins) == 70
+    assert bin_array.bins[0] == (5, 7, 0, 12)
+    assert bin_array.bins[1] == (0, 0, 0, 0)
+
+def test_bin_math():
+    assert bin_id_to_bin_array_index(0) == 0
+    assert bin_id_to_bin_array_index(69) == 0
+    assert bin_id_to_bin_array_index(70) == 1
+    assert bin_id_to_bin_array_index(-1) == -1
+    assert bin_id_to_bin_array_index(-70) == -1
+    assert bin_id_to_bin_array_index(-71) == -2
+    assert get_price_of_bin_by_bin_id(0, 25) == 1.0
+    assert abs(get_price_of_bin_by_bin_id(100, 25) - 1.0025 ** 100) < 1e-12
+    assert to_bn_json(0) == "00"
+    assert to_bn_json(1000) == "03e8"
+
+def test_create_native_engine():
+    dlmm = make_dlmm(make_accounts())
+    assert isinstance(dlmm, DLMM)
+    assert dlmm.lb_pair.active_id == -30
+    assert dlmm.lb_pair.bin_step == 25
+    assert dlmm.token_X.public_key == MINT_X
+    assert dlmm.token_X.reserve == RESERVE_X
+    assert dlmm.token_X.decimal == 6
+    assert dlmm.token_Y.decimal == 9
+    assert dlmm.token_Y.amount == "2000000000"
+    assert dlmm.has_bitmap_extension == False
+
+def test_create_rejects_unknown_engine():
+    try:
+        DLMM_CLIENT.create(POOL, "http://localhost:8899", "unknown")
+        assert False
+    except ValueError:
+        pass
+
+def test_bins_around_active_bin():
+    dlmm = make_dlmm(make_accounts())
+    bins = DLMM_CLIENT.get_all_bins(dlmm, 2, 3)
+    assert isinstance(bins, GetBins)
+    assert bins.active_bin == -30
+    assert [b.bin_id for b in bins.bin_liquidty] == list(range(-33, -25))
+
+    active = next(b for b in bins.bin_liquidty if b.bin_id == -30)
+    assert int(active.x_amount, 16) == 1000 - 30
+    assert int(active.y_amount, 16) == 2000 - 30
+    assert abs(float(active.price) - 1.0025 ** -30) < 1e-15
+    assert abs(float(active.price_per_token) - 1.0025 ** -30 * 10 ** -3) < 1e-15
+
+def test_bins_follow_account_updates():
+    accounts = make_accounts()
+    dlmm = make_dlmm(accounts)
+    dlmm.auto_refresh = False
+    dlmm.get_bin_array_for_swap(True, 2)
+
+    dlmm.update_account(POOL, lb_pair_bytes(-75, 25, (-2, -1, 0, 1)))
+    bins = dlmm.get_bins_around_active_bin(0, 0)
+    assert bins.active_bin == -75
+    assert [int(b.x_amount, 16) for b in bins.bin_liquidty] == [1000 - 76, 1000 - 75, 1000 - 74]
+
+def test_active_bin():
+    dlmm = make_dlmm(make_accounts())
+    active = dlmm.get_active_bin()
+    assert isinstance(active, ActiveBin)
+    assert active.bin_id == -30
+    assert int(active.x_amount, 16) == 970
+
+def test_price_conversions():
+    dlmm = make_dlmm(make_accounts())
+    assert abs(dlmm.from_price_per_lamport(2.0) - 0.002) < 1e-15
+    assert abs(dlmm.to_price_per_lamport(0.002) - 2.0) < 1e-12
+    price = get_price_of_bin_by_bin_id(-30, 25)
+    assert dlmm.get_bin_id_from_price(price * 1.0001, True) == -30
+    assert dlmm.get_bin_id_from_price(price * 1.0001, False) == -29
+
+def test_bin_array_for_swap():
+    dlmm = make_dlmm(make_accounts(bin_array_indexes=(-3, -1, 0, 1)))
+
+    down = dlmm.get_bin_array_for_swap(True, 4)
+    assert [b["account"]["index"] for b in down] == [-1, -3]
+    assert down[0]["publicKey"] == str(derive_bin_array(POOL, -1))
+
+    up = DLMM_CLIENT.get_swap_bin_array(dlmm, False, 2)
+    assert [b["account"]["index"] for b in up] == [-1, 0]
+
+def test_swap_ixs():
+    dlmm = make_dlmm(make_accounts())
+    user = Pubkey.new_unique()
+    token_in = Pubkey.new_unique()
+    token_out = Pubkey.new_unique()
+    bin_arrays = dlmm.get_bin_array_for_swap(True, 2)
+
+    ixs = dlmm.swap_ixs(MINT_X, MINT_Y, 1_000, 900, POOL, user, token_in, token_out, bin_arrays)
+    assert len(ixs) == 1
+    ix = ixs[0]
+    assert ix["programId"] == str(LB_CLMM_PROGRAM_ID)
+    assert bytes(ix["data"]) == SWAP_DISCRIMINATOR + struct.pack("<QQ", 1_000, 900)
+
+    keys = [key["pubkey"] for key in ix["keys"]]
+    assert keys[0] == str(POOL)
+    assert keys[1] == str(LB_CLMM_PROGRAM_ID)
+    assert keys[2:6] == [str(RESERVE_X), str(RESERVE_Y), str(token_in), str(token_out)]
+    assert keys[8] == str(ORACLE)
+    assert keys[10] == str(user)
+    assert ix["keys"][10]["isSigner"] == True
+    assert keys[15:] == [b["publicKey"] for b in bin_arrays]
+    assert all(key["isWritable"] for key in ix["keys"][15:])
+
+    # Plain public keys are accepted as well
+    assert dlmm.swap_ixs(MINT_X, MINT_Y, 1_000, 900, POOL, user, token_in, token_out, [Pubkey.from_string(b["publicKey"]) for b in bin_arrays]) == ixs
@@ -0,0 +1,67 @@
+import struct
+import numpy as np
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+# Binary DLMM bins snapshot stored under dlmms:bins:bin:<pool address>, dlmms:bins:<pool address> keeps the JSON form
+# rust-core reads
+#
+# header: magic, version, active bin id, token X decimals, token Y decimals, slot, bin count
+# body:   one fixed-width record per bin, sorted by price descending
+SNAPSHOT_MAGIC = b"DLMB"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sBiBBQI")
+
+# Field names match the bin dicts the route evaluation used to read, so records index the same way
+BIN_DTYPE = np.dtype([
+    ("bin_id", "<i4"),
+    ("price_per_token", "<f8"),
+    ("amountX", "<f8"),
+    ("amountY", "<f8"),
+])
+
+def bins_to_array(bins):
+    """
+    Build a bins array from bin dicts or (bin_id, price_per_token, amountX, amountY) tuples.
+    """
+    if isinstance(bins, np.ndarray):
+        return bins.astype(BIN_DTYPE, copy=False)
+    return np.array([
+        (bin["bin_id"], bin["price_per_token"], bin["amountX"], bin["amountY"]) if isinstance(bin, dict) else tuple(bin)
+        for bin in bins
+    ], dtype=BIN_DTYPE)
+
+def snapshot_key(pool_address):
+    return f"dlmms:bins:bin:{pool_address}"
+
+def bins_to_dicts(bins):
+    """
+    Bin dicts of the JSON form in dlmms:bins:<pool address>, the fields rust-core reads.
+    """
+    return [
+        {"bin_id": bin_id, "price_per_token": price_per_token, "amountX": amount_X, "amountY": amount_Y}
+        for bin_id, price_per_token, amount_X, amount_Y in bins_to_array(bins).tolist()
+    ]
+
+def encode_bins_snapshot(bins, active_bin, token_X_decimals, token_Y_decimals, slot=0):
+    """
+    Serialize the bins of a pool to the binary snapshot format.
+    """
+    bins = bins_to_array(bins)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, active_bin, token_X_decimals, token_Y_decimals, slot, len(bins))
+    return header + bins.tobytes()
+
+def decode_bins_snapshot(data):
+    """
+    Decode a binary snapshot without copying the bins.
+
+    Returns (bins, token_X_decimals, token_Y_decimals, active_bin, slot). `bins` is a read-only NumPy view
+    over `data`, columns are views as well (`bins['price_per_token']`).
+    """
+    magic, version, active_bin, token_X_decimals, token_Y_decimals, slot, count = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported DLMM bins snapshot: {magic!r} v{version}")
+
+    bins = np.frombuffer(data, dtype=BIN_DTYPE, count=count, offset=SNAPSHOT_HEADER.size)
+    return bins, token_X_decimals, token_Y_decimals, active_bin, slot
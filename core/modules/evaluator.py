@@ -0,0 +1,224 @@
+import numpy as np
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import VAULT_BALANCE, MIN_TRADE_SIZE, MAX_PRICE_DIFF_PERCENTAGE, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, METEORA_BINS_TO_TRADE, TRADE_SIZING
+from modules.sizing import optimal_trade_size
+
+# raydium_quote_smart defaults, the serial path calls it without overrides
+RAYDIUM_SWAP_FEE = 0.25
+RAYDIUM_BASE_SLIPPAGE = 0.01
+RAYDIUM_HIGH_SLIPPAGE_THRESHOLD = 0.01
+RAYDIUM_MAX_SLIPPAGE = 7.0
+RAYDIUM_MAX_ITERATIONS = 10
+RAYDIUM_MIN_TRADE_FRACTION = 0.1
+
+ROW_COLUMNS = ('reserve_x', 'reserve_y', 'meteora_fee', 'active_price')
+BIN_COLUMNS = ('bin_price', 'bin_x', 'bin_y')
+
+def grow(array, shape):
+    """
+    Copy an array into a larger NaN-filled one.
+    """
+    grown = np.full(shape, np.nan)
+    grown[tuple(slice(0, size) for size in array.shape)] = array
+    return grown
+
+class RouteEvaluator:
+    """
+    Raydium -> Meteora route state kept in preallocated NumPy arrays, one row per route.
+
+    Reserves and bin ladders are written per row as updates arrive, `evaluate` then prices all the
+    requested rows in one vectorized pass, sized like `process_route` or with modules.sizing.
+    """
+
+    def __init__(self, capacity=1024, bins_width=METEORA_BINS_LEFT + METEORA_BINS_RIGHT + 3):
+        self.rows = {}
+        self.routes = [None] * capacity
+        self.free_rows = list(range(capacity - 1, -1, -1))
+
+        for column in ROW_COLUMNS:
+            setattr(self, column, np.full(capacity, np.nan))
+        for column in BIN_COLUMNS:
+            setattr(self, column, np.full((capacity, bins_width), np.nan))
+
+    def _resize(self, capacity, bins_width):
+        for column in ROW_COLUMNS:
+            setattr(self, column, grow(getattr(self, column), capacity))
+        for column in BIN_COLUMNS:
+            setattr(self, column, grow(getattr(self, column), (capacity, bins_width)))
+
+        self.free_rows = list(range(capacity - 1, len(self.routes) - 1, -1)) + self.free_rows
+        self.routes += [None] * (capacity - len(self.routes))
+
+    def row(self, route):
+        """
+        Row of a route, allocated on first use.
+        """
+        row = self.rows.get(route['id'])
+        if row is None:
+            if not self.free_rows:
+                self._resize(len(self.routes) * 2, self.bin_price.shape[1])
+            row = self.free_rows.pop()
+            self.rows[route['id']] = row
+        self.routes[row] = route
+        self.meteora_fee[row] = float(route['pool_b_fee'])
+        return row
+
+    def remove_route(self, route_id):
+        row = self.rows.pop(route_id, None)
+        if row is None:
+            return
+        self.routes[row] = None
+        for column in ROW_COLUMNS:
+            getattr(self, column)[row] = np.nan
+        for column in BIN_COLUMNS:
+            getattr(self, column)[row] = np.nan
+        self.free_rows.append(row)
+
+    def update_raydium(self, row, reserve_x, reserve_y):
+        self.reserve_x[row] = reserve_x
+        self.reserve_y[row] = reserve_y
+
+    def update_meteora(self, row, bins, active_bin_id):
+        """
+        Store the bin ladder of a row sorted by ascending price, `bins` is a bins record array (modules.dlmm_bins).
+        """
+        if len(bins) > self.bin_price.shape[1]:
+            self._resize(len(self.routes), len(bins))
+
+        active = np.flatnonzero(bins['bin_id'] == active_bin_id)
+        self.active_price[row] = bins['price_per_token'][active[0]] if len(active) else np.nan
+
+        order = np.argsort(bins['price_per_token'], kind='stable')
+        count = len(bins)
+        self.bin_price[row, :count] = bins['price_per_token'][order]
+        self.bin_x[row, :count] = bins['amountX'][order]
+        self.bin_y[row, :count] = bins['amountY'][order]
+        self.bin_price[row, count:] = np.nan
+        self.bin_x[row, count:] = np.nan
+        self.bin_y[row, count:] = np.nan
+
+    def evaluate(self, rows, sizing=TRADE_SIZING):
+        """
+        Price gaps, trade sizes and expected profits for `rows` at once.
+        `sizing` is 'bins' (same sizing as process_route) or 'optimal' (modules.sizing).
+
+        Returns the profitable routes as candidate dicts, best profit first.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) == 0:
+            return []
+
+        reserve_x = self.reserve_x[rows]
+        reserve_y = self.reserve_y[rows]
+        active_price = self.active_price[rows]
+        meteora_fee = self.meteora_fee[rows]
+        bin_price = self.bin_price[rows]
+        bin_y = self.bin_y[rows]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raydium_price = np.where(reserve_y == 0, 0.0, reserve_x / reserve_y)
+            price_diff_percentage = (raydium_price - active_price) / active_price * 100
+
+            # Only a_to_b (buy on Raydium, sell on Meteora) is traded, like the serial path
+            abs_diff = np.abs(price_diff_percentage)
+            candidate = (meteora_fee < abs_diff) & (abs_diff < MAX_PRICE_DIFF_PERCENTAGE) & (price_diff_percentage <= 0)
+
+            # Liquidity between the Raydium price and the Meteora active price
+            within_range = (bin_price >= raydium_price[:, None]) & (bin_price <= active_price[:, None])
+            available_liquidity_y = np.where(within_range, bin_y, 0.0).sum(axis=1)
+            candidate &= available_liquidity_y >= MIN_TRADE_SIZE
+
+            if sizing == 'optimal':
+                # Sell walks down from the active bin, only bins at or below it hold Y
+                bin_price = bin_price[:, ::-1]
+                bin_y = np.where(bin_price <= active_price[:, None], bin_y[:, ::-1], 0.0)
+                tokens, cost, revenue = optimal_trade_size(reserve_x, reserve_y, bin_price, bin_y, meteora_fee, RAYDIUM_SWAP_FEE, VAULT_BALANCE)
+                profit = revenue - cost
+                candidate &= (cost >= MIN_TRADE_SIZE) & (profit > 0)
+                return self._ranked(rows, candidate, profit, {
+                    'cost': cost,
+                    'trade_size': revenue,
+                    'total_x_needed': tokens,
+                    'exact_trade_size': revenue,
+                    'total_y_available': np.where(bin_y > 0, bin_y, 0.0).sum(axis=1),
+                    'total_x_bins': tokens,
+                    'price_diff_percentage': price_diff_percentage,
+                })
+
+            # The cheapest METEORA_BINS_TO_TRADE bins that hold Y
+            has_y = bin_y > 0
+            to_trade = has_y & (np.cumsum(has_y, axis=1) <= METEORA_BINS_TO_TRADE)
+            total_price = np.where(to_trade, bin_price, 0.0).sum(axis=1)
+            total_y_available = np.where(to_trade, bin_y, 0.0).sum(axis=1)
+            meteora_fee_decimal = meteora_fee / 100
+            total_x_bins = np.where(to_trade, bin_y / bin_price, 0.0).sum(axis=1) / (1 - meteora_fee_decimal)
+            candidate &= total_y_available >= MIN_TRADE_SIZE
+
+            trade_size = np.minimum(total_y_available, VAULT_BALANCE)
+            total_x_needed = trade_size / total_price / (1 - meteora_fee_decimal)
+
+            quote = raydium_quote_smart_batch(total_x_needed, reserve_x, reserve_y)
+            candidate &= quote['valid']
+            cost = quote['exact_x_needed']
+            exact_x_needed = quote['best_y_amount']
+            exact_trade_size = trade_size * exact_x_needed / total_x_needed
+            profit = exact_trade_size - cost
+
+            candidate &= (cost >= MIN_TRADE_SIZE) & (cost < trade_size)
+
+        return self._ranked(rows, candidate, profit, {
+            'cost': cost,
+            'trade_size': trade_size,
+            'total_x_needed': exact_x_needed,
+            'exact_trade_size': exact_trade_size,
+            'total_y_available': total_y_available,
+            'total_x_bins': total_x_bins,
+            'price_diff_percentage': price_diff_percentage,
+        })
+
+    def _ranked(self, rows, candidate, profit, columns):
+        ranked = np.flatnonzero(candidate)
+        ranked = ranked[np.argsort(-profit[ranked], kind='stable')]
+        return [
+            {
+                'route': self.routes[rows[i]],
+                'profit': float(profit[i]),
+                **{name: float(values[i]) for name, values in columns.items()},
+            }
+            for i in ranked
+        ]
+
+def raydium_quote_smart_batch(y_amount, reserve_x, reserve_y):
+    """
+    Vectorized `raydium_quote_smart` with its default parameters, rows that would raise are marked invalid.
+    """
+    valid = y_amount > 0
+    low = RAYDIUM_MIN_TRADE_FRACTION * y_amount
+    high = y_amount.copy()
+    y_amount = y_amount.copy()
+    x_needed = np.full_like(y_amount, np.nan)
+    active = valid.copy()
+
+    for _ in range(RAYDIUM_MAX_ITERATIONS):
+        trade_impact = y_amount / reserve_y
+        too_high = active & (trade_impact >= RAYDIUM_HIGH_SLIPPAGE_THRESHOLD)
+        y_amount = np.where(too_high, (low + high) / 2, y_amount)
+        high = np.where(too_high, y_amount, high)
+        low = np.where(active & ~too_high, y_amount, low)
+
+        denominator = (reserve_y - y_amount) * (1 - RAYDIUM_SWAP_FEE / 100)
+        valid &= ~active | (denominator > 0)
+        x_needed = np.where(active, reserve_x * y_amount / denominator, x_needed)
+
+        active &= too_high & valid
+        if not active.any():
+            break
+
+    return {
+        'best_y_amount': np.round(y_amount, 6),
+        'exact_x_needed': np.round(x_needed, 9),
+        'valid': valid,
+    }
@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import time
+from collections import deque
+
+import aiohttp
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import JITO_BLOCK_ENGINES, JITO_REGION_RATE, JITO_QUEUE_SIZE, JITO_WORKERS, JITO_TIMEOUT_SECONDS, RATE_LIMIT_BACKOFF_SECONDS
+from modules.rate_limit import TokenBucket
+
+TRANSACTIONS_PATH = "/api/v1/transactions"
+
+class RegionStats:
+    """
+    Latency and acceptance counters of one block engine region.
+    """
+
+    def __init__(self, window=256):
+        self.sent = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.won = 0
+        self.latencies_ms = deque(maxlen=window)
+
+    def summary(self):
+        latencies = sorted(self.latencies_ms)
+        percentile = lambda p: round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 3) if latencies else None
+        return {
+            'sent': self.sent,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'rate_limited': self.rate_limited,
+            'errors': self.errors,
+            'won': self.won,
+            'acceptance': round(self.accepted / self.sent, 3) if self.sent else None,
+            'latency_ms_p50': percentile(0.5),
+            'latency_ms_p90': percentile(0.9),
+        }
+
+class JitoSubmitter:
+    """
+    Sends transactions to several Jito block engine regions in parallel and keeps the first success.
+
+    One keep-alive aiohttp session is shared by all regions, each region has its own token bucket:
+    a region without a token is skipped instead of waited for, a 429 pauses it for RATE_LIMIT_BACKOFF_SECONDS.
+    Submissions go through a bounded queue served by JITO_WORKERS tasks, a full queue rejects right away.
+    """
+
+    def __init__(self, regions=JITO_BLOCK_ENGINES, rate=JITO_REGION_RATE, queue_size=JITO_QUEUE_SIZE, workers=JITO_WORKERS, timeout=JITO_TIMEOUT_SECONDS):
+        self.regions = dict(regions)
+        self.buckets = {region: TokenBucket(rate) for region in self.regions}
+        self.stats = {region: RegionStats() for region in self.regions}
+        self.disabled = set()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.worker_count = workers
+        self.timeout = timeout
+        self.session = None
+        self.workers = []
+        self.pending = set()
+
+    async def start(self):
+        if self.session is not None:
+            return
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=self.worker_count, keepalive_timeout=60, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        logger.info(f"🚀 Jito submitter started: {', '.join(self.regions)}")
+
+    async def close(self):
+        for task in self.workers + list(self.pending):
+            task.cancel()
+        await asyncio.gather(*self.workers, *self.pending, return_exceptions=True)
+        self.workers = []
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def disable_region(self, region):
+        """Stop sending to a region, e.g. one the stats show as slow."""
+        self.disabled.add(region)
+
+    def enable_region(self, region):
+        self.disabled.discard(region)
+
+    def region_stats(self):
+        return {region: stats.summary() for region, stats in self.stats.items()}
+
+    async def submit(self, transaction):
+        """
+        Send a serialized transaction, returns {'success', 'signature', 'region', 'error'} of the first
+        region that accepts it, or of the last failure.
+        """
+        if self.session is None:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((base64.b64encode(transaction).decode('ascii'), future))
+        except asyncio.QueueFull:
+            logger.warning("🚨 Jito queue full, transaction dropped.")
+            return {'success': False, 'signature': None, 'region': None, 'error': 'Jito queue full'}
+        return await future
+
+    async def _worker(self):
+        while True:
+            encoded, future = await self.queue.get()
+            try:
+                result = await self._fan_out(encoded)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def _fan_out(self, encoded):
+        regions = [region for region in self.regions if region not in self.disabled and self.buckets[region].try_acquire()]
+        if not regions:
+            return {'success': False, 'signature': None, 'region': None, 'error': 'All Jito regions rate limited'}
+
+        tasks = {asyncio.create_task(self._send(region, encoded)) for region in regions}
+        result = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result['success']:
+                    self.stats[result['region']].won += 1
+                    # The slower regions keep going in the background, they only feed the stats
+                    self.pending.update(tasks)
+                    for task in tasks:
+                        task.add_done_callback(self.pending.discard)
+                    return result
+        return result
+
+    async def _send(self, region, encoded):
+        stats = self.stats[region]
+        stats.sent += 1
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "sendTransaction", "params": [encoded, {"encoding": "base64"}]}
+        start = time.perf_counter()
+        try:
+            async with self.session.post(self.regions[region] + TRANSACTIONS_PATH, json=payload) as response:
+                if response.status == 429:
+                    stats.rate_limited += 1
+                    self.buckets[region].penalize(RATE_LIMIT_BACKOFF_SECONDS)
+                    return {'success': False, 'signature': None, 'region': region, 'error': f"{region}: 429 Too Many Requests"}
+                data = await response.json(content_type=None)
+        except Exception as e:
+            stats.errors += 1
+            return {'success': False, 'signature': None, 'region': region, 'error': f"{region}: {e!r}"}
+        finally:
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        if 'result' in data:
+            stats.accepted += 1
+            return {'success': True, 'signature': data['result'], 'region': region, 'error': None}
+        stats.rejected += 1
+        return {'success': False, 'signature': None, 'region': region, 'error': f"{region}: {data.get('error')}"}
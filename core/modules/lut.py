@@ -1,21 +1,14 @@
-import ssl
-import certifi
-# Manually configure SSL to use Certifi
-ssl_context = ssl.create_default_context()
-ssl_context.load_verify_locations(certifi.where())
 import uvloop
 import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-import aiohttp
-import asyncpg
-from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
 executor = ThreadPoolExecutor(max_workers=10)
 
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
 
-from config import DB_CONFIG, PAYER_PRIVATE_KEY, OPERATOR_PRIVATE_KEY, RPC_ENDPOINT
+from config import PAYER_PRIVATE_KEY, OPERATOR_PRIVATE_KEY, RPC_ENDPOINT
+from modules.api import raydium_pool_keys, meteora_pairs
 
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.api import Client
@@ -141,54 +134,37 @@ async def close_alt(alt):
 # ]
 # asyncio.run(extend_alt(alt, addresses))
 
-@asynccontextmanager
-async def get_db_connection():
-    conn = await asyncpg.connect(**DB_CONFIG)
-    try:
-        yield conn
-    finally:
-        await conn.close()
-
 async def fetch_raydium_lut_addresses_api(pool_address):
-    """Fetch Raydium pool reserves via API."""
-    url = f"https://api-v3.raydium.io/pools/key/ids?ids={pool_address}"
-    
-    print(url)
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
-        async with session.get(url) as response:
-            data = await response.json()
-            if data.get("success") and isinstance(data.get("data"), list) and data["data"]:
-                pool_data = data["data"][0]
-                # print(pool_data)
-                return pool_data.get("programId", {}), [pool_data.get("id", {}), 
-                     pool_data.get("openOrders", {}),
-                     pool_data.get("targetOrders", {}),
-                     pool_data.get("vault", {}).get("A", ""),
-                     pool_data.get("vault", {}).get("B", ""),
-                     pool_data.get("marketId", {}),
-                     pool_data.get("marketBids", {}),
-                     pool_data.get("marketAsks", {}),
-                     pool_data.get("marketEventQueue", {}),
-                     pool_data.get("marketBaseVault", {}),
-                     pool_data.get("marketQuoteVault", {}),
-                     pool_data.get("marketAuthority", {})]
-                    
+    """Fetch the Raydium pool accounts a LUT needs, from the shared pool keys cache."""
+    pool_data = await raydium_pool_keys.load(pool_address)
+    if pool_data:
+        # print(pool_data)
+        return pool_data.get("programId", {}), [pool_data.get("id", {}), 
+             pool_data.get("openOrders", {}),
+             pool_data.get("targetOrders", {}),
+             pool_data.get("vault", {}).get("A", ""),
+             pool_data.get("vault", {}).get("B", ""),
+             pool_data.get("marketId", {}),
+             pool_data.get("marketBids", {}),
+             pool_data.get("marketAsks", {}),
+             pool_data.get("marketEventQueue", {}),
+             pool_data.get("marketBaseVault", {}),
+             pool_data.get("marketQuoteVault", {}),
+             pool_data.get("marketAuthority", {})]
+            
     return None, None  # Default fallback values
 
 async def fetch_meteora_lut_addresses_api(pool_address):
-    url = f'https://dlmm-api.meteora.ag/pair/{pool_address}'
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                data = await response.json()
-                if 'reserve_x' in data:
-                    # Fix flipped reserves for Meteora
-                    return [
-                        data['mint_x'],  # Mint A
-                        data['mint_y'],  # Mint B
-                        data['reserve_x'],  # Token B
-                        data['reserve_y'],  # Token A
-                    ]
-                return None
+        data = await meteora_pairs.load(pool_address)
+        if data and 'reserve_x' in data:
+            # Fix flipped reserves for Meteora
+            return [
+                data['mint_x'],  # Mint A
+                data['mint_y'],  # Mint B
+                data['reserve_x'],  # Token B
+                data['reserve_y'],  # Token A
+            ]
+        return None
     except Exception as e:
         return None
\ No newline at end of file
@@ -1,16 +1,23 @@
+import math
 import time
 import numpy as np
 
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
 
-from config import MIN_PROFIT, RPC_ENDPOINT_LIST, RESERVES_MAX_SECONDS, VAULT_BALANCE, MIN_TRADE_SIZE, MAX_PRICE_DIFF_PERCENTAGE, RESERVES_METEORA, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, METEORA_BINS_TO_TRADE
+from config import MIN_PROFIT, RPC_ENDPOINT_LIST, RESERVES_MAX_SECONDS, RESERVES_MAX_SLOT_AGE, VAULT_BALANCE, MIN_TRADE_SIZE, MAX_PRICE_DIFF_PERCENTAGE, RESERVES_METEORA, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, METEORA_BINS_TO_TRADE, OPPORTUNITY_EVALUATOR
 from modules.database import update_two_arbitrage_route_status
+from modules.cache import set_route_status
 from modules.reserves import fetch_reserves_raydium, fetch_reserves_meteora
 from modules.swap import swap_raydium_to_meteora
+from modules import tracing
+from modules.cache import ROUTE_RESERVE_METADATA_KEYS
+from modules.wss.subscriptions import arrivals
 
 from solana.rpc.async_api import AsyncClient
 
+WSOL_MINT = 'So11111111111111111111111111111111111111112'
+
 async def raydium_quote_x_for_y(x_amount, reserve_x, reserve_y, swap_fee=0.25):
     # Calculate effective x used after swap fee
     effective_x_used = np.multiply(x_amount, (1 - np.divide(swap_fee, 100)))
@@ -99,16 +106,43 @@ async def raydium_quote_smart(
         "iterations": _
     }
 
+def reserves_age_in_slots(route):
+    """
+    Slots the oldest Raydium vault of a route lags the processed tip, None if none of them was updated yet.
+    Only the Raydium vaults are priced from the reserve streams, Meteora pools from the DLMM bins.
+    """
+    now = time.perf_counter()
+    ages = [age for age in (arrivals.age_in_slots(route[address_key], now) for address_key, _, _, dex_key in ROUTE_RESERVE_METADATA_KEYS if route[dex_key] == 'raydium') if age is not None]
+    return max(ages) if ages else None
+
+def is_stale_route(route):
+    """
+    True if the reserves of a route are older than RESERVES_MAX_SLOT_AGE slots, its evaluation would price a stale view.
+    """
+    if RESERVES_MAX_SLOT_AGE is None:
+        return False
+    age = reserves_age_in_slots(route)
+    if age is not None and age > RESERVES_MAX_SLOT_AGE:
+        if age == math.inf:
+            logger.warning(f"🚨 Route {route['id']} reserve connections stalled, skipped.")
+        else:
+            logger.warning(f"🚨 Route {route['id']} reserves are {age} slots old, skipped.")
+        return True
+    return False
+
 async def process_route(route, cache, lut, reserve_amounts):
     start_time = time.time()    
+    start_ns = tracing.now()
 
-    ata = lut[21]
-
-    if route['reserve_b_mint_pool_b'] != 'So11111111111111111111111111111111111111112':
-        logger.warning(f"🚨 route['reserve_b_mint_pool_b'] != 'So11111111111111111111111111111111111111112'")
+    if route['reserve_b_mint_pool_b'] != WSOL_MINT:
+        logger.warning(f"🚨 route['reserve_b_mint_pool_b'] != '{WSOL_MINT}'")
+        set_route_status(cache, route, 'skip')
         await update_two_arbitrage_route_status(route['id'], 'skip')
         return None
 
+    if is_stale_route(route):
+        return None
+
     reserve_addresses_pool_a = [route['reserve_a_address_pool_a'], route['reserve_b_address_pool_a']]
     reserve_addresses_pool_b = [route['reserve_a_address_pool_b'], route['reserve_b_address_pool_b']]
 
@@ -116,8 +150,6 @@ async def process_route(route, cache, lut, reserve_amounts):
 
     # dlmm = DLMM_CLIENT.create(Pubkey.from_string(dlmm_pool_address), RPC_ENDPOINT)
     dlmm = cache['meteora_dlmm_client_objects'].get(dlmm_pool_address)
-    dlmm_object = cache['meteora_dlmm_objects'].get(dlmm_pool_address)
-    bin_arrays = cache['meteora_dlmm_bin_arrays_objects'].get(dlmm_pool_address)
     dlmm_time = time.time()
     # print(f"Execution time after dlmm: {(dlmm_time - start_time) * 1000:.3f} ms")
 
@@ -125,6 +157,7 @@ async def process_route(route, cache, lut, reserve_amounts):
     pool_a_time = time.time()
     pool_b = fetch_reserves_raydium(cache['solana_client'], reserve_addresses_pool_b, [int(route['reserve_a_pool_b_decimals']), int(route['reserve_b_pool_b_decimals'])], reserve_amounts) if route['pool_b_dex'] == 'raydium' else await fetch_reserves_meteora(dlmm, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, RESERVES_METEORA)
     pool_b_time = time.time()
+    pools_ns = tracing.mark('route_lookup', start_ns, route['id'])
     
     # print(f"Execution time after pool A: {(pool_a_time - start_time) * 1000:.3f} ms, (+{(pool_a_time - dlmm_time) * 1000:.3f} ms since last)")
     # print(f"Execution time after pool B: {(pool_b_time - start_time) * 1000:.3f} ms, (+{(pool_b_time - pool_a_time) * 1000:.3f} ms since last)")
@@ -179,12 +212,12 @@ async def process_route(route, cache, lut, reserve_amounts):
     if meteora_pool:
         meteora_bins, _, _, all_bins, active_bin_id = meteora_pool
         
-        # Convert to dictionary for O(1) lookups
-        bins_dict = {bin['bin_id']: bin for bin in meteora_bins}
-        active_bin = bins_dict.get(active_bin_id)
+        # Bins come as a NumPy record array, find the active bin without building a dict
+        active_index = np.flatnonzero(meteora_bins['bin_id'] == active_bin_id)
+        active_bin = meteora_bins[active_index[0]] if len(active_index) else None
         
         # If no active bin, exit early
-        if not active_bin:
+        if active_bin is None:
             # logger.warning("❌ No active bin found for Meteora pool.")
             return None
         
@@ -225,10 +258,10 @@ async def process_route(route, cache, lut, reserve_amounts):
         # Calculate price range once and reuse
         low_price, high_price = (raydium_price, meteora_active_price) if direction == 'a_to_b' else (meteora_active_price, raydium_price)
         
-        # Convert bin data to NumPy arrays for faster calculations
-        bin_prices = np.array([bin['price_per_token'] for bin in meteora_bins])
-        bin_amount_x = np.array([bin['amountX'] for bin in meteora_bins])
-        bin_amount_y = np.array([bin['amountY'] for bin in meteora_bins])
+        # Column views of the bins, no copy
+        bin_prices = meteora_bins['price_per_token']
+        bin_amount_x = meteora_bins['amountX']
+        bin_amount_y = meteora_bins['amountY']
 
         # Use NumPy filtering for price range and liquidity calculations
         within_range = (bin_prices >= low_price) & (bin_prices <= high_price)
@@ -339,10 +372,7 @@ async def process_route(route, cache, lut, reserve_amounts):
             print(f"🔥 Arbitrage opportunity: {route['pool_a_address']} -> {route['pool_b_address']}")
             logger.info(f"🔥 Arbitrage opportunity: {route['pool_a_address']} -> {route['pool_b_address']}")
 
-            # Performance logging
-            opportunity_time = time.time()
-            print(f"🕒 Execution time for opportunity block: {(opportunity_time - start_time) * 1000:.3f} ms, (+{(opportunity_time - pools_time) * 1000:.3f} ms since last)")
-            logger.info(f"🕒 Execution time for opportunity block: {(opportunity_time - start_time) * 1000:.3f} ms, (+{(opportunity_time - pools_time) * 1000:.3f} ms since last)")
+            tracing.mark('pricing', pools_ns, route['id'])
 
             # if trade_size == vault_balance:
             #     proportion = vault_balance / cost
@@ -379,21 +409,7 @@ async def process_route(route, cache, lut, reserve_amounts):
             #     return None
 
             # Execute swap
-            result = await swap_raydium_to_meteora(
-                profit, cost, total_x_needed, 9, 0, 1, route['pool_a_address'], 
-                route['pool_b_address'], route['reserve_b_mint_pool_b'], 
-                route['reserve_a_mint_pool_b'], route['lut'], lut, 
-                dlmm_object, bin_arrays, cache['solana_client'], cache['broadcast_clients'], 
-                cache['vault'], cache['payer'], cache['operator'], cache['seed'], ata, cache['vault_wsol_token_account'], cache['operator_wsol_token_account'], 
-                cache['balance_needed'], cache['compute_unit_limit'], cache['compute_unit_price'], 
-                cache['create_wsol_account_instruction'], cache['init_wsol_account_instruction'], cache['close_wsol_account_instruction'],
-                cache['jito_tip_address']
-            )
-
-            if result == 'Error sending transaction':
-                # print(f"Jito too many requests")
-                # logger.warning(f"Jito too many requests")
-                time.sleep(1)
+            await execute_swap(route, cache, lut, profit, cost, total_x_needed)
                 
     # else:
     #     # Set token to non tradable
@@ -401,29 +417,127 @@ async def process_route(route, cache, lut, reserve_amounts):
     
     return route
 
+async def execute_swap(route, cache, lut, profit, cost, total_x_needed):
+    """
+    Send the Raydium -> Meteora swap of an opportunity.
+    """
+    dlmm_pool_address = route['pool_b_address'] if route['pool_a_dex'] == 'raydium' else route['pool_a_address']
+    result = await swap_raydium_to_meteora(
+        profit, cost, total_x_needed, 9, 0, 1, route['pool_a_address'], 
+        route['pool_b_address'], route['reserve_b_mint_pool_b'], 
+        route['reserve_a_mint_pool_b'], route['lut'], lut, 
+        cache['meteora_dlmm_objects'].get(dlmm_pool_address), cache['meteora_dlmm_bin_arrays_objects'].get(dlmm_pool_address),
+        cache['solana_client'], cache['broadcaster'], 
+        cache['vault'], cache['payer'], cache['operator'], cache['seed'], lut[21], cache['vault_wsol_token_account'], cache['operator_wsol_token_account'], 
+        cache['balance_needed'], cache['compute_unit_limit'], cache['compute_unit_price'], 
+        cache['create_wsol_account_instruction'], cache['init_wsol_account_instruction'], cache['close_wsol_account_instruction'],
+        cache['jito_tip_address'], template=cache.get('route_templates', {}).get(route['id']),
+        jito_submitter=cache.get('jito_submitter'), route_id=route['id']
+    )
+    # Jito rate limits are handled per region by the submitter, no pause here
+
+    if result and result != 'Error sending transaction' and 'signature_tracker' in cache:
+        # Confirmed in the background, the outcome is saved to the opportunities table
+        cache['signature_tracker'].track(result, opportunity={
+            'route_type': 'two-pool',
+            'route_id': route['id'],
+            'trade_size': cost,
+            'estimated_profit_native': profit,
+        })
+
+    return result
+
+def is_batch_route(route):
+    """
+    Routes the batch evaluator handles, the others go through `process_route`.
+    """
+    return route['pool_a_dex'] == 'raydium' and route['pool_b_dex'] == 'meteora' and route['reserve_b_mint_pool_b'] == WSOL_MINT
+
+async def evaluate_routes_batch(cache, entries, reserve_amounts):
+    """
+    Load the reserves of all routes watching an account, then price them in one vectorized pass.
+    Returns the ranked candidates.
+    """
+    start_time = time.time()
+    start_ns = tracing.now()
+    evaluator = cache['route_evaluator']
+
+    rows = []
+    luts = {}
+    meteora_bins = {}
+    for route, lut in entries:
+        dlmm_pool_address = route['pool_b_address']
+        if dlmm_pool_address not in meteora_bins:
+            # Several routes usually share the DLMM pool, read its bins once
+            meteora_bins[dlmm_pool_address] = await fetch_reserves_meteora(cache['meteora_dlmm_client_objects'].get(dlmm_pool_address), METEORA_BINS_LEFT, METEORA_BINS_RIGHT, RESERVES_METEORA)
+        meteora_pool = meteora_bins[dlmm_pool_address]
+        if meteora_pool is None:
+            continue
+
+        pool_a = fetch_reserves_raydium(cache['solana_client'], [route['reserve_a_address_pool_a'], route['reserve_b_address_pool_a']], [int(route['reserve_a_pool_a_decimals']), int(route['reserve_b_pool_a_decimals'])], reserve_amounts)
+
+        row = evaluator.row(route)
+        evaluator.update_raydium(row, pool_a['reserve_a'], pool_a['reserve_b'])
+        evaluator.update_meteora(row, meteora_pool[0], meteora_pool[4])
+        rows.append(row)
+        luts[route['id']] = lut
+
+    pools_time = time.time()
+    if (pools_time - start_time) * 1000 > RESERVES_MAX_SECONDS:
+        print(f"🚨 Execution time is too high: {(pools_time - start_time) * 1000}ms")
+        logger.warning(f"🚨 Execution time is too high: {(pools_time - start_time) * 1000}ms")
+        return []
+    pools_ns = tracing.mark('route_lookup', start_ns)
+
+    candidates = evaluator.evaluate(rows)
+    tracing.mark('pricing', pools_ns)
+    for candidate in candidates:
+        candidate['lut'] = luts[candidate['route']['id']]
+
+    if candidates:
+        logger.info(f"🔥 {len(candidates)} opportunities in {len(rows)} routes")
+
+    return candidates
+
 # Main async function that processes arbitrage opportunities
-async def find_arbitrage_opportunities(cache, account_data, reserve_amounts):
+async def find_arbitrage_opportunities(cache, subscription_address, reserve_amounts):
     """
     Fetch and process arbitrage opportunities concurrently for each route.
-    Listen for Redis updates and process them as new account data comes in.
+    Called with the reserve account whose amount just changed in reserve_amounts.
     """
-    # Process the update as required for the arbitrage logic
-    subscription_address = account_data.get('subscription_address')
-    # mint = account_data.get('account_data').get('mint')
-    # print(f"Mint: {mint}\nPool: {subscription_address}")
 
     global routes
-    # Find all possible routes based on the subscription address
-    routes = [route for route in cache['arbitrage_routes'] 
-              if (route['reserve_a_address_pool_a'] == subscription_address and route['status'] == 'enabled')
-              or (route['reserve_b_address_pool_a'] == subscription_address and route['status'] == 'enabled')
-              or (route['reserve_a_address_pool_b'] == subscription_address and route['status'] == 'enabled')
-              or (route['reserve_b_address_pool_b'] == subscription_address and route['status'] == 'enabled')]
-    # print(f"Routes: {routes}")
+    # Look up all enabled routes (with their LUT) watching the subscription address
+    entries = cache['routes_by_reserve'].get(subscription_address, ())
+
+    if OPPORTUNITY_EVALUATOR == 'batch' and 'route_evaluator' in cache:
+        for route, _ in entries:
+            if route['reserve_b_mint_pool_b'] != WSOL_MINT:
+                logger.warning(f"🚨 route['reserve_b_mint_pool_b'] != '{WSOL_MINT}'")
+                set_route_status(cache, route, 'skip')
+                await update_two_arbitrage_route_status(route['id'], 'skip')
+
+        batch_entries = [(route, lut) for route, lut in entries if is_batch_route(route) and not is_stale_route(route)]
+        entries = [(route, lut) for route, lut in entries if route['reserve_b_mint_pool_b'] == WSOL_MINT and not is_batch_route(route)]
+        try:
+            candidates = await evaluate_routes_batch(cache, batch_entries, reserve_amounts)
+        except Exception as e:
+            logger.error(f"Error evaluating routes for {subscription_address}: {str(e)}")
+            candidates = []
+
+        # Best expected profit first
+        for candidate in candidates:
+            route = candidate['route']
+            print(f"🔥 Arbitrage opportunity: {route['pool_a_address']} -> {route['pool_b_address']}")
+            logger.info(f"🔥 Arbitrage opportunity: {route['pool_a_address']} -> {route['pool_b_address']} | Trade size: {candidate['trade_size']} | Cost: {candidate['cost']:.9f} SOL | Profit: {candidate['profit']:.9f} SOL")
+            try:
+                await execute_swap(route, cache, candidate['lut'], candidate['profit'], candidate['cost'], candidate['total_x_needed'])
+            except Exception as e:
+                logger.error(f"Error processing route {route['id']}: {str(e)}")
 
-    luts = []
-    for route in routes:
-        luts.append(cache['lut_mapping'].get(route['lut']))
+    routes = [route for route, _ in entries]
+    luts = [lut for _, lut in entries]
+    # print(f"Routes: {routes}")
     # print(f"LUTs: {luts}")
 
     async with AsyncClient(RPC_ENDPOINT_LIST[0]) as client:
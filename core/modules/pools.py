@@ -1,4 +1,3 @@
-import aiohttp
 import requests
 from concurrent.futures import ThreadPoolExecutor
 executor = ThreadPoolExecutor(max_workers=10)
@@ -8,19 +7,12 @@ logger = logging.getLogger(__name__)
 
 from config import SOLANA_PROGRAM
 from modules.database import *
+from modules.api import meteora_pairs
 # from modules.raydium_py.utils.api import get_pool_info_by_id
 
-API_URL = "https://dlmm-api.meteora.ag/pair/"
-
 async def fetch_coin_data(pair_address):
-    """Fetch coin data from Meteora API."""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(API_URL + pair_address) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                # logger.error(f"Error fetching Meteora pool {pair_address} data: {response.status}, {await response.text()}")
-                return {}
+    """Fetch coin data from Meteora API, through the shared pair cache."""
+    return await meteora_pairs.load(pair_address) or {}
             
 async def fetch_pools_for_token(token, tokens):
     """
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second with bursts of up to `capacity`.
+    A 429 response pauses the whole bucket with `penalize` instead of sleeping in every caller.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.rate_limited = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def try_acquire(self):
+        """Take a token if one is available right now, without waiting."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def penalize(self, seconds):
+        """Stop handing out tokens for `seconds`, e.g. after a 429 response."""
+        self.rate_limited += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.updated_at = self.paused_until
+
+def is_rate_limited(error):
+    """True when an exception comes from a 429 response."""
+    return "429" in str(error)
@@ -0,0 +1,112 @@
+import json
+import os
+import struct
+import time
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import RECORD_DIR
+
+# Append-only recording: a magic line, then frames of (kind, wall clock receive time, payload length) + payload
+RECORDING_MAGIC = b"ARBREC1\n"
+FRAME_HEADER = struct.Struct("<BdI")
+FLUSH_FRAMES = 1024
+
+KIND_FRAME = 1      # Raw reserves websocket frame (subscription confirmations and accountNotifications)
+KIND_BINS = 2       # DLMM bins snapshot: pool address length, pool address, modules.dlmm_bins snapshot
+KIND_BLOCKHASH = 3  # modules.blockhash compact form
+KIND_ROUTES = 4     # JSON routes and LUT mapping the recording was made with
+KIND_SHARD_FRAME = 5  # Raw reserves websocket frame of one of several connections: connection index (u16 LE) + frame
+
+SHARD_HEADER = struct.Struct("<H")
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab", buffering=1 << 16)
+        if self.file.tell() == 0:
+            self.file.write(RECORDING_MAGIC)
+        self.frames = 0
+
+    def write(self, kind, payload, received_at=None):
+        self.file.write(FRAME_HEADER.pack(kind, received_at or time.time(), len(payload)))
+        self.file.write(payload)
+        self.frames += 1
+        if self.frames % FLUSH_FRAMES == 0:
+            self.file.flush()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+# One recorder per process, shared by every listener running in it
+recorder = None
+
+def start_recording(name):
+    """
+    Open the recording of this process in RECORD_DIR, a no-op when recording is off or already started.
+    """
+    global recorder
+    if recorder is not None or not RECORD_DIR:
+        return recorder
+
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    path = os.path.join(RECORD_DIR, f"{name}-{int(time.time())}-{os.getpid()}.rec")
+    recorder = Recorder(path)
+    logger.info(f"⏺️ Recording to {path}")
+    return recorder
+
+def stop_recording():
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        recorder = None
+
+def record(kind, payload, received_at=None):
+    if recorder is not None:
+        recorder.write(kind, payload, received_at)
+
+def record_frame(frame, received_at=None, connection=None):
+    if recorder is not None:
+        frame = frame.encode() if isinstance(frame, str) else frame
+        if connection is None:
+            recorder.write(KIND_FRAME, frame, received_at)
+        else:
+            recorder.write(KIND_SHARD_FRAME, SHARD_HEADER.pack(connection) + frame, received_at)
+
+def record_bins(pool_address, snapshot):
+    if recorder is not None:
+        address = str(pool_address).encode()
+        recorder.write(KIND_BINS, bytes([len(address)]) + address + snapshot)
+
+def record_routes(arbitrage_routes, lut_mapping):
+    if recorder is not None:
+        recorder.write(KIND_ROUTES, json.dumps({'routes': arbitrage_routes, 'lut_mapping': lut_mapping}, default=str).encode())
+        recorder.flush()
+
+def decode_bins_frame(payload):
+    """Returns (pool address, snapshot) of a KIND_BINS payload."""
+    length = payload[0]
+    return payload[1:1 + length].decode(), payload[1 + length:]
+
+def decode_shard_frame(payload):
+    """Returns (connection index, frame) of a KIND_SHARD_FRAME payload."""
+    return SHARD_HEADER.unpack_from(payload)[0], payload[SHARD_HEADER.size:]
+
+def read_recording(path):
+    """Yield (kind, received_at, payload) frames of a recording, a truncated last frame is ignored."""
+    with open(path, "rb") as f:
+        if f.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a recording")
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            kind, received_at, length = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield kind, received_at, payload
@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import json
+import time
+from types import SimpleNamespace
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import RESERVES_COOLDOWN_SECONDS, WS_QUEUE_MAX_SIZE
+from modules import blockhash, opportunities, reserves, tracing
+from modules.cache import build_routes_by_reserve
+from modules.dlmm_bins import snapshot_key
+from modules.evaluator import RouteEvaluator
+from modules.recording import read_recording, decode_bins_frame, decode_shard_frame, KIND_FRAME, KIND_SHARD_FRAME, KIND_BINS, KIND_BLOCKHASH, KIND_ROUTES
+from modules.wss import listen_reserves
+
+# Cache entries only read to build the swap arguments, the swap itself is stubbed during a replay
+SWAP_CACHE_KEYS = (
+    'solana_client', 'broadcaster', 'vault', 'payer', 'operator', 'seed',
+    'vault_wsol_token_account', 'operator_wsol_token_account', 'balance_needed', 'compute_unit_limit', 'compute_unit_price',
+    'create_wsol_account_instruction', 'init_wsol_account_instruction', 'close_wsol_account_instruction', 'jito_tip_address',
+)
+
+class ReplayStore:
+    """
+    In-memory stand-in for the Redis keys the hot path reads, fed with the recorded bins snapshots.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, *keys):
+        keys = keys[0] if len(keys) == 1 and isinstance(keys[0], (list, tuple)) else keys
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+def merge_recordings(paths):
+    """Frames of several recordings (reserves, dlmms, blockhash processes) in receive order."""
+    return heapq.merge(*(read_recording(path) for path in paths), key=lambda frame: frame[1])
+
+def load_routes(cache, payload):
+    """Point the replay cache at the recorded routes, in place so the evaluator task keeps its reference."""
+    data = json.loads(payload)
+    routes, lut_mapping = data['routes'], data['lut_mapping']
+
+    dlmms = {}
+    for route in routes:
+        dlmm_pool_address = route['pool_b_address'] if route['pool_a_dex'] == 'raydium' else route['pool_a_address']
+        if route['pool_a_dex'] == 'raydium':
+            decimals = int(route['reserve_a_pool_b_decimals']), int(route['reserve_b_pool_b_decimals'])
+        else:
+            decimals = int(route['reserve_a_pool_a_decimals']), int(route['reserve_b_pool_a_decimals'])
+        # Only the pool address and the decimals are read before the bins come from the store
+        dlmms[dlmm_pool_address] = SimpleNamespace(
+            pool_address=dlmm_pool_address,
+            token_X=SimpleNamespace(decimal=decimals[0]),
+            token_Y=SimpleNamespace(decimal=decimals[1]),
+        )
+
+    cache.update({
+        'arbitrage_routes': routes,
+        'lut_mapping': lut_mapping,
+        'routes_by_reserve': build_routes_by_reserve(routes, lut_mapping),
+        'meteora_dlmm_client_objects': dlmms,
+        'meteora_dlmm_objects': dlmms,
+        'meteora_dlmm_bin_arrays_objects': {},
+        'route_evaluator': RouteEvaluator(max(len(routes), 1)),
+        **{key: None for key in SWAP_CACHE_KEYS},
+    })
+    listen_reserves.refresh_reserve_metadata(routes)
+    logger.info(f"🔄 Replay routes loaded: {len(routes)} routes, {len(dlmms)} DLMM pools")
+
+async def replay(paths, speed=None):
+    """
+    Feed recordings back through handle_frame -> evaluate_updates -> find_arbitrage_opportunities.
+
+    `speed` None replays at max speed, one update fully evaluated before the next is fed, so runs are
+    deterministic. Otherwise frames keep their recorded spacing divided by `speed`, with the live cooldown.
+    swap_raydium_to_meteora is replaced by a stub collecting the opportunities, nothing is sent.
+    Bins are read like RESERVES_METEORA = 'redis' and Raydium reserves like RESERVES_RAYDIUM = 'cache'.
+    """
+    found = []
+    recorded_at = None
+
+    async def swap_stub(profit, borrow_amount, expected_amount, *args, route_id=None, **kwargs):
+        found.append({
+            'offset': round(recorded_at - first_at, 6),
+            'route_id': route_id,
+            'pool_a_address': args[3],
+            'pool_b_address': args[4],
+            'profit': float(profit),
+            'borrow_amount': float(borrow_amount),
+            'expected_amount': float(expected_amount),
+        })
+        return None
+
+    async def route_status_stub(route_id, status):
+        return None
+
+    patches = (
+        (opportunities, 'swap_raydium_to_meteora', swap_stub),
+        (opportunities, 'update_two_arbitrage_route_status', route_status_stub),
+        (reserves, 'redis_client', ReplayStore()),
+    )
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+
+    tracing.stage_histograms.clear()
+    tracing.route_histograms.clear()
+    listen_reserves.reserve_amounts.clear()
+    listen_reserves.arrivals.clear()
+    evaluated_before = listen_reserves.listener_metrics['evaluated']
+
+    cache = {}
+    queue = asyncio.Queue(maxsize=WS_QUEUE_MAX_SIZE)
+    pending = set()
+    # Subscription ids of each recorded connection, sharded recordings repeat them across connections
+    subscription_maps = {}
+    cooldown = 0 if speed is None else RESERVES_COOLDOWN_SECONDS
+    evaluator = asyncio.create_task(listen_reserves.evaluate_updates(cache, queue, pending, cooldown))
+
+    frames = notifications = 0
+    first_at = None
+    start_time = time.perf_counter()
+    try:
+        for kind, recorded_at, payload in merge_recordings(paths):
+            if first_at is None:
+                first_at = recorded_at
+            frames += 1
+
+            if speed is not None:
+                delay = start_time + (recorded_at - first_at) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if kind == KIND_ROUTES:
+                load_routes(cache, payload)
+            elif kind == KIND_BINS:
+                pool_address, snapshot = decode_bins_frame(payload)
+                reserves.redis_client.set(snapshot_key(pool_address), snapshot)
+            elif kind == KIND_BLOCKHASH:
+                blockhash.latest = blockhash.decode_blockhash(payload)
+            elif kind in (KIND_FRAME, KIND_SHARD_FRAME) and cache:
+                connection, frame = decode_shard_frame(payload) if kind == KIND_SHARD_FRAME else (None, payload)
+                subscription_map = subscription_maps.setdefault(connection, {})
+                notification, _ = listen_reserves.handle_frame(frame, subscription_map, queue, pending, time.perf_counter(), source=connection)
+                if notification:
+                    notifications += 1
+                    if speed is None:
+                        await queue.join()
+                    else:
+                        # Let the evaluator run between frames like it does between ws.recv calls
+                        await asyncio.sleep(0)
+
+        await queue.join()
+        if speed is not None:
+            # Updates deferred by the cooldown come back after it
+            await asyncio.sleep(cooldown)
+            await queue.join()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        evaluator.cancel()
+        await asyncio.gather(evaluator, return_exceptions=True)
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+    tick_to_decision = tracing.stage_histograms.get('tick_to_decision')
+    return {
+        'recordings': list(paths),
+        'speed': speed or 'max',
+        'frames': frames,
+        'notifications': notifications,
+        'evaluated': listen_reserves.listener_metrics['evaluated'] - evaluated_before,
+        'seconds': round(elapsed, 3),
+        'notifications_per_second': round(notifications / elapsed, 1) if elapsed else 0.0,
+        'tick_to_decision': tracing.stage_summary(tick_to_decision) if tick_to_decision else None,
+        'stages': tracing.summary(),
+        'opportunities': sorted(found, key=lambda opportunity: (opportunity['offset'], str(opportunity['route_id']))),
+    }
@@ -1,14 +1,6 @@
 import asyncio
 import json
-import ssl
 import time
-import certifi
-# Manually configure SSL to use Certifi
-ssl_context = ssl.create_default_context()
-ssl_context.load_verify_locations(certifi.where())
-import aiohttp
-import asyncpg
-from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 executor = ThreadPoolExecutor(max_workers=10)
 
@@ -24,8 +16,10 @@ logger = logging.getLogger(__name__)
 
 import sys
 sys.path.append('./')
-from config import DB_CONFIG, RPC_ENDPOINT, RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, redis_client, RESERVES_RAYDIUM, RESERVES_METEORA
+from config import RPC_ENDPOINT, RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, redis_client, RESERVES_RAYDIUM, RESERVES_METEORA, CYCLE_PRICE_REFRESH_SECONDS, CYCLE_PRICE_REFRESH_BATCH
 from modules.dlmm.dlmm import DLMM, DLMM_CLIENT
+from modules.dlmm_bins import bins_to_array, decode_bins_snapshot, snapshot_key
+from modules.api import raydium_pool_keys, meteora_pairs, mint_decimals, fetch_token_account_amounts, get_json, METEORA_PAIR_URL
 
 from spl.token._layouts import MINT_LAYOUT
 from solders.pubkey import Pubkey
@@ -33,14 +27,6 @@ from solana.rpc.api import Client
 
 client = Client(RPC_ENDPOINT)
 
-@asynccontextmanager
-async def get_db_connection():
-    conn = await asyncpg.connect(**DB_CONFIG)
-    try:
-        yield conn
-    finally:
-        await conn.close()
-
 async def fetch_token_decimals(mint_address):
     mint_public_key = Pubkey.from_string(mint_address)
     info = client.get_account_info(mint_public_key)
@@ -48,25 +34,18 @@ async def fetch_token_decimals(mint_address):
 
 async def fetch_raydium_reserves_api(pool_address):
     """Fetch Raydium pool reserves via API."""
-    url = f"https://api-v3.raydium.io/pools/key/ids?ids={pool_address}"
-    
-    # print(url)
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
-        async with session.get(url) as response:
-            data = await response.json()
-            # print(data)
-            if data.get("success") and isinstance(data.get("data"), list) and data["data"]:
-                pool_data = data["data"][0]
-                return (
-                    pool_data.get("vault", {}).get("A", ""),
-                    pool_data.get("vault", {}).get("B", ""),
-                    pool_data.get("mintA", {}).get("decimals", 9),
-                    pool_data.get("mintB", {}).get("decimals", 9),
-                    pool_data.get("mintA", {}).get("address", ""),
-                    pool_data.get("mintB", {}).get("address", ""),
-                    0.0025,  # Raydium fee
-                )
-    
+    pool_data = await raydium_pool_keys.load(pool_address)
+    if pool_data:
+        return (
+            pool_data.get("vault", {}).get("A", ""),
+            pool_data.get("vault", {}).get("B", ""),
+            pool_data.get("mintA", {}).get("decimals", 9),
+            pool_data.get("mintB", {}).get("decimals", 9),
+            pool_data.get("mintA", {}).get("address", ""),
+            pool_data.get("mintB", {}).get("address", ""),
+            0.0025,  # Raydium fee
+        )
+
     return "", "", 9, 9, "", "", 0.0025  # Default fallback values
 
 # async def fetch_meteora_reserves_api(pool_address):
@@ -88,24 +67,85 @@ async def fetch_raydium_reserves_api(pool_address):
 #             return '', '', 9, 9, '', '', 0.1
         
 async def fetch_meteora_reserves_api(pool_address):
+    """Fetch Meteora pool reserve accounts, decimals and mints from the pair API and the mint accounts."""
     try:
-        dlmm = DLMM(Pubkey.from_string(pool_address), RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID])
-        # dlmm = dlmm_objects.get(pool_address, None)
-        # print(f"DLMM: {dlmm}")
-        return (
-            str(dlmm.token_X.reserve),  # Token B
-            str(dlmm.token_Y.reserve),  # Token A
-            str(dlmm.token_X.decimal),  # Token B
-            str(dlmm.token_Y.decimal),  # Token A
-            str(dlmm.token_X.public_key),  # Token B
-            str(dlmm.token_Y.public_key),  # Token A
-        )
+        pair = await meteora_pairs.load(pool_address)
+        if pair and 'reserve_x' in pair:
+            decimals = await mint_decimals.load_many([pair['mint_x'], pair['mint_y']])
+            if None not in decimals.values():
+                return (
+                    pair['reserve_x'],  # Token B
+                    pair['reserve_y'],  # Token A
+                    str(decimals[pair['mint_x']]),  # Token B
+                    str(decimals[pair['mint_y']]),  # Token A
+                    pair['mint_x'],  # Token B
+                    pair['mint_y'],  # Token A
+                )
     except Exception as e:
-        if f"Fetch Meterora reserves error: {e}" == "Fetch Meterora reserves error: 'lbPair'":
-            pass
-        else:
-            logger.error(f"Fetch Meterora reserves error: {e}")
-        return "", "", 9, 9, "", ""
+        logger.error(f"Fetch Meterora reserves error: {e}")
+    return "", "", 9, 9, "", ""
+
+# Prices not read from the DLMMs listener snapshots: pool id -> (price or None, time.monotonic() it was fetched)
+polled_prices = {}
+
+async def fetch_pool_prices(pools):
+    """
+    Marginal prices of pools in units of reserve b per unit of reserve a, {pool id: price or None}.
+
+    Meteora prices come from the active bin of the dlmms:bins:bin snapshot the DLMMs listener keeps current,
+    read in one mget on every call. The other pools, Raydium vaults and pairs the listener does not track, are
+    polled: only the ones last fetched CYCLE_PRICE_REFRESH_SECONDS ago or more, at most CYCLE_PRICE_REFRESH_BATCH
+    per call, oldest first. Raydium vault balances go out in batches of getMultipleAccounts, untracked pairs
+    to the pair API. A pool whose fetch failed or that was not fetched yet is None.
+    """
+    prices = {}
+    now = time.monotonic()
+    meteora = [pool for pool in pools if pool['dex'] == 'meteora']
+    polled = [pool for pool in pools if pool['dex'] == 'raydium']
+
+    if meteora:
+        snapshots = await asyncio.to_thread(redis_client.mget, [snapshot_key(pool['address']) for pool in meteora])
+        for pool, snapshot in zip(meteora, snapshots):
+            if snapshot:
+                bins, _, _, active_bin, _ = decode_bins_snapshot(snapshot)
+                active_price = bins['price_per_token'][bins['bin_id'] == active_bin]
+                if len(active_price) and active_price[0] > 0:
+                    prices[pool['id']] = float(active_price[0])
+                    continue
+            polled.append(pool)
+
+    # Pools no longer asked for are forgotten
+    for pool_id in polled_prices.keys() - {pool['id'] for pool in polled}:
+        del polled_prices[pool_id]
+
+    def fetched_at(pool):
+        return polled_prices[pool['id']][1] if pool['id'] in polled_prices else float('-inf')
+    due = sorted((pool for pool in polled if now - fetched_at(pool) >= CYCLE_PRICE_REFRESH_SECONDS), key=fetched_at)[:CYCLE_PRICE_REFRESH_BATCH]
+    for pool in due:
+        polled_prices[pool['id']] = (None, now)
+
+    raydium = [pool for pool in due if pool['dex'] == 'raydium']
+    if raydium:
+        try:
+            amounts = await fetch_token_account_amounts([address for pool in raydium for address in (pool['reserve_a_address'], pool['reserve_b_address'])])
+        except Exception as e:
+            logger.error(f"Fetch vault amounts error: {e}")
+            amounts = {}
+        for pool in raydium:
+            amount_a, amount_b = amounts.get(pool['reserve_a_address']), amounts.get(pool['reserve_b_address'])
+            if amount_a and amount_b:
+                polled_prices[pool['id']] = (scale_value(amount_b, int(pool['reserve_b_decimals'])) / scale_value(amount_a, int(pool['reserve_a_decimals'])), now)
+
+    # Not the meteora_pairs cache, the current price changes. The API session caps the connections per host.
+    untracked = [pool for pool in due if pool['dex'] == 'meteora']
+    pairs = await asyncio.gather(*(get_json(METEORA_PAIR_URL + pool['address']) for pool in untracked), return_exceptions=True)
+    for pool, pair in zip(untracked, pairs):
+        if isinstance(pair, dict) and pair.get('current_price'):
+            polled_prices[pool['id']] = (float(pair['current_price']), now)
+
+    for pool in polled:
+        prices[pool['id']] = polled_prices.get(pool['id'], (None, now))[0]
+    return prices
 
 # async def fetch_token_account_balance(client, token_account_address):
 #     try:
@@ -247,24 +287,19 @@ async def fetch_reserves_meteora(dlmm, min_bins, max_bins, cache):
             amountX_scaled = scale_value(hex_to_decimal(bin.x_amount), token_X_decimals)
             amountY_scaled = scale_value(hex_to_decimal(bin.y_amount), token_Y_decimals)
 
-            bins.append({
-                "bin_id": bin.bin_id,
-                "price_per_token": bin_price_per_token,
-                "amountX": amountX_scaled,
-                "amountY": amountY_scaled
-            })
+            bins.append((bin.bin_id, bin_price_per_token, amountX_scaled, amountY_scaled))
 
         # Reorder bins by price
-        bins = sorted(bins, key=lambda x: x['price_per_token'], reverse=True)
+        bins = bins_to_array(sorted(bins, key=lambda x: x[1], reverse=True))
 
         return bins, token_X_decimals, token_Y_decimals, all_bins, all_bins.active_bin
     
     elif cache == 'redis':
-        all_bins = redis_client.get(f"dlmms:bins:{dlmm.pool_address}")
+        all_bins = redis_client.get(snapshot_key(dlmm.pool_address))
 
         if all_bins:
-            all_bins = json.loads(all_bins)
-            return all_bins.get("bins"), all_bins.get("token_X_decimals"), all_bins.get("token_Y_decimals"), None, all_bins.get("active_bin")       
+            bins, token_X_decimals, token_Y_decimals, active_bin, slot = decode_bins_snapshot(all_bins)
+            return bins, token_X_decimals, token_Y_decimals, None, active_bin
          
         else:
             logger.error(f"DLMM bins not found in Redis for {dlmm.pool_address}")
@@ -4,19 +4,29 @@ import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 import json
 import time
-import networkx as nx
 
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
 
-from config import redis_client, MIN_METEORA_FEE, VAULT_PUBLIC_KEY, PAYER_PUBLIC_KEY, OPERATOR_PUBLIC_KEY, TOKEN_PROGRAM, SOLANA_PROGRAM, SYSVARRENT_PROGRAM, RAYDIUM_AMM_PROGRAM, METEORA_DLMM_PROGRAM, SERUM_OPENBOOK_PROGRAM, JITO_TIP_ADDRESS
-from modules.database import get_db_connection, get_pools_by_token, get_tradable_tokens, update_two_arbitrage_route_status
-from modules.reserves import fetch_raydium_reserves_api, fetch_meteora_reserves_api
+from config import redis_client, MIN_METEORA_FEE, VAULT_PUBLIC_KEY, PAYER_PUBLIC_KEY, OPERATOR_PUBLIC_KEY, TOKEN_PROGRAM, SOLANA_PROGRAM, SYSVARRENT_PROGRAM, RAYDIUM_AMM_PROGRAM, METEORA_DLMM_PROGRAM, SERUM_OPENBOOK_PROGRAM, JITO_TIP_ADDRESS, ROUTE_LOOKUP_RETRY_SECONDS, ROUTE_LOOKUP_MAX_RETRY_SECONDS
+from modules.database import get_db_connection, get_tradable_tokens, get_tradable_sol_pools, get_two_arbitrage_route_keys, upsert_two_arbitrage_routes, set_tokens_not_tradable, update_two_arbitrage_route_status, get_tradable_pools, get_three_arbitrage_route_keys, upsert_three_arbitrage_routes
+from modules.reserves import fetch_raydium_reserves_api, fetch_meteora_reserves_api, fetch_pool_prices
+from modules.cycles import CycleEngine, cycle_return
 from modules.ata import create_associated_token_account_async
+from modules.api import raydium_pool_keys, meteora_pairs
 from modules.lut import fetch_raydium_lut_addresses_api, fetch_meteora_lut_addresses_api, create_and_deploy_alt, extend_alt
 
 from solders.pubkey import Pubkey
 
+async def publish_routes_reload(added=(), removed=()):
+    """Signal the listeners to reload only the given route IDs, keeping their connections and objects."""
+    message = {
+        "reload": 1,
+        "added": list(added),
+        "removed": list(removed)
+    }
+    await asyncio.to_thread(redis_client.publish, "meteora:new_pool", json.dumps(message))
+
 async def normalize_route(route):
     """
     Normalize the route so that pool_a and pool_b are always in the same order.
@@ -53,241 +63,266 @@ async def detect_unique_routes(routes):
     
     return result
 
-async def find_and_save_two_arbitrage_routes():
+def find_two_arbitrage_pairs(pools, route_keys):
     """
-    Finds all possible two-pool arbitrage routes between Raydium and Meteora,
-    and saves them to the database.
+    Pair the pools of each token against SOL across DEXs, in both orders.
+    Returns the (pool_a, pool_b) pairs not saved yet and the number of pairs already saved or skipped.
     """
+    pools_by_token = {}
+    for pool in pools:
+        pools_by_token.setdefault(pool['token_address'], []).append(pool)
+
+    new_pairs = []
+    existing = 0
+    for token_pools in pools_by_token.values():
+        for pool_a in token_pools:
+            for pool_b in token_pools:
+                if pool_a['id'] == pool_b['id'] or pool_a['dex'] == pool_b['dex']:
+                    continue
 
-    async with get_db_connection() as conn:
+                reserve_address, status = route_keys.get((pool_a['id'], pool_b['id']), (None, None))
+                if reserve_address or status == 'skip':
+                    existing += 1
+                    continue
+
+                new_pairs.append((pool_a, pool_b))
+
+    return new_pairs, existing
+
+async def fetch_pool_reserves(pool):
+    """
+    Reserve addresses, decimals, mints and fee of a pool from its DEX API.
+    """
+    if pool['dex'] == 'raydium':
+        return await fetch_raydium_reserves_api(pool['address'])
+    return (*await fetch_meteora_reserves_api(pool['address']), pool['fee'])
+
+# Pool id -> (failed lookups in a row, time.monotonic() of the next attempt)
+failed_lookups = {}
+
+async def fetch_pools_reserves(pools):
+    """
+    fetch_pool_reserves of several pools at once, {pool id: reserves}, None for a failed lookup.
+
+    A pool whose lookup failed or fell back to empty addresses is not looked up again before
+    ROUTE_LOOKUP_RETRY_SECONDS, doubled on every failure in a row, so broken pools stop costing API calls.
+    """
+    now = time.monotonic()
+
+    async def fetch(pool):
+        failures, retry_at = failed_lookups.get(pool['id'], (0, 0.0))
+        if now < retry_at:
+            return pool['id'], None
         try:
-            # Store tradable tokens in a set for easy lookup
-            rows = await get_tradable_tokens()
-            tradable_tokens = {row['address'] for row in rows}
-            # logger.info(f"Tradable tokens: {tradable_tokens}")
-
-            # Step 2: Create a graph of tradable tokens
-            G = nx.DiGraph()  # Directed graph for token exchanges
-
-            # Step 3: Fetch all pools for tradable tokens
-            for token in tradable_tokens:
-                raydium_pools = await get_pools_by_token(token, 'raydium')
-                meteora_pools = await get_pools_by_token(token, 'meteora')
-
-                filtered_meteora_pools = []
-                for pool in meteora_pools:
-                    if Decimal(pool['fee']) >= MIN_METEORA_FEE:
-                        filtered_meteora_pools.append(pool)
-                    
-                all_pools = raydium_pools + filtered_meteora_pools
+            reserves = await fetch_pool_reserves(pool)
+        except Exception as e:
+            logger.info(f"Failed to fetch pool reserves: {pool['address']} - {e}")
+            reserves = None
 
-                # Add edges to the graph if tokens are tradable and from different pools and DEXs
-                for pool in all_pools:
-                    if pool['dex'] == 'pumpfun' or pool['dex'] == 'orca':
-                        continue                  
+        if reserves is None or not all(reserves[:2]):
+            failures += 1
+            failed_lookups[pool['id']] = (failures, now + min(ROUTE_LOOKUP_RETRY_SECONDS * 2 ** (failures - 1), ROUTE_LOOKUP_MAX_RETRY_SECONDS))
+            return pool['id'], None
+        failed_lookups.pop(pool['id'], None)
+        return pool['id'], reserves
 
-                    base_token = pool['base_token_address']
-                    quote_token = pool['quote_token_address']
+    return dict(await asyncio.gather(*(fetch(pool) for pool in pools)))
 
-                    if base_token in tradable_tokens or quote_token in tradable_tokens:
-                        # logger.info(f" - Adding edge {pool['id']}: {pool['address']} | {base_token} -> {quote_token} ({pool['dex']})")
-                        
-                        # Add forward edge (with a list of DEXes)
-                        if G.has_edge(base_token, quote_token):
-                            # If the edge exists, append the new pool to the list of pools
-                            G[base_token][quote_token]['pools'].append({'pool_id': pool['id'], 'pool_address': pool['address'], 'dex': pool['dex'], 'fee': pool['fee']})
-                        else:
-                            # Otherwise, create a new edge and add the pool as the first item in the list
-                            G.add_edge(base_token, quote_token, pools=[{'pool_id': pool['id'], 'pool_address': pool['address'], 'dex': pool['dex'], 'fee': pool['fee']}])
-
-                        # Add reverse edge (for easier lookup of both directions)
-                        if G.has_edge(quote_token, base_token):
-                            # If the reverse edge exists, append the new pool to the list of pools
-                            G[quote_token][base_token]['pools'].append({'pool_id': pool['id'], 'pool_address': pool['address'], 'dex': pool['dex'], 'fee': pool['fee']})
-                        else:
-                            # Otherwise, create a new reverse edge and add the pool as the first item in the list
-                            G.add_edge(quote_token, base_token, pools=[{'pool_id': pool['id'], 'pool_address': pool['address'], 'dex': pool['dex'], 'fee': pool['fee']}])
-
-            # Step 4: Find arbitrage routes (cycles of length 2)
-            arbitrage_routes = []
-
-            for start_token in tradable_tokens:
-                for intermediate_token in G.neighbors(start_token):
-                    if intermediate_token == start_token:
-                        continue  # Skip self-loops
-
-                    # Check if there's a path back to the start token
-                    if start_token in G.neighbors(intermediate_token):
-                        # Get the list of pools for each direction
-                        edge1_pools = G[start_token][intermediate_token].get('pools', [])
-                        edge2_pools = G[intermediate_token][start_token].get('pools', [])
-                        
-                        for pool1 in edge1_pools:
-                            for pool2 in edge2_pools:
-                                # Ensure that the edges are from different pools and different DEXs
-                                if pool1['pool_id'] != pool2['pool_id']:  
-                                    if pool1['dex'] != pool2['dex']:  # Ensure they are from different DEXs
-
-                                        # logger.info(f"Found arbitrage route: {start_token} -> {intermediate_token} -> {start_token}")
-                                        # logger.info(f" - Edge 1 (Pool 1): {pool1}")
-                                        # logger.info(f" - Edge 2 (Pool 2): {pool2}")
-
-                                        arbitrage_route = {
-                                            'start_token': start_token,
-                                            'intermediate_token': intermediate_token,
-                                            'end_token': start_token,
-                                            'pool1_id': pool1['pool_id'],
-                                            'pool2_id': pool2['pool_id'],
-                                            'pool1_address': pool1['pool_address'],
-                                            'pool2_address': pool2['pool_address'],
-                                            'pool1_fee': pool1['fee'],
-                                            'pool2_fee': pool2['fee'],
-                                            'dex1': pool1['dex'],
-                                            'dex2': pool2['dex']
-                                        }
-                                        arbitrage_routes.append(arbitrage_route)
-
-            # logger.info(f"Found {len(arbitrage_routes)} two-pool arbitrage routes.")
-            
-            # Step 5: Save the arbitrage routes to the database
-            for route in arbitrage_routes:
-                # print(f"Route: {route['pool1_address']} → {route['pool2_address']}")
-                # logger.info(f"Route: {route['pool1_address']} → {route['pool2_address']}")
-                
-                # Fetch both reserve_a_address_pool_a and status in a single query
-                route_data = await conn.fetchrow('''
-                    SELECT 
-                        reserve_a_address_pool_a, 
-                        status 
-                    FROM two_arbitrage_routes
-                    WHERE pool_a_id = $1 AND pool_b_id = $2
-                ''', route['pool1_id'], route['pool2_id'])
-
-                # Extract the values from the result
-                route_current = route_data['reserve_a_address_pool_a'] if route_data else None
-                route_status = route_data['status'] if route_data else None
-
-                if route_current != None and route_current != '':
-                    # logger.info(f"Route already exists: {route}")
-                    continue
+def prune_failed_lookups(pools):
+    """
+    Forget the failed lookups of pools no longer in `pools`, which must hold every pool either discovery
+    looks up: the tradable pools of the cycle search, a superset of the SOL pools of the two-pool routes.
+    """
+    pool_ids = {pool['id'] for pool in pools}
+    for pool_id in failed_lookups.keys() - pool_ids:
+        del failed_lookups[pool_id]
 
-                if route_status == 'skip':
-                    # Skip the route if the status is 'skip'
-                    continue
-                
-                # Fetch reserves for the route
-                try:
-                    pool_a_id = route['pool1_id']
-                    pool_b_id = route['pool2_id']
-                    pool_a_address = route['pool1_address']
-                    pool_b_address = route['pool2_address']
-                    pool_a_dex = route['dex1']
-                    pool_b_dex = route['dex2']
-
-                    # You would need to retrieve the reserves from your pool data
-                    reserve_a_pool_a = route.get('reserve_a_pool_a', 0.0)  # Placeholder, get actual reserves
-                    reserve_b_pool_a = route.get('reserve_b_pool_a', 0.0)  # Placeholder, get actual reserves
-                    reserve_a_pool_b = route.get('reserve_a_pool_b', 0.0)  # Placeholder, get actual reserves
-                    reserve_b_pool_b = route.get('reserve_b_pool_b', 0.0)  # Placeholder, get actual reserves
-
-                    meteora_fee = None
-                    if pool_a_dex == 'raydium':
-                        meteora_fee = route['pool2_fee']
-                        reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_pool_a_decimals, reserve_b_pool_a_decimals, reserve_a_mint_pool_a, reserve_b_mint_pool_a, pool_a_fee = await fetch_raydium_reserves_api(pool_a_address)
-                    elif pool_a_dex == 'meteora':
-                        meteora_fee = route['pool1_fee']
-                        pool_a_fee = meteora_fee
-                        reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_pool_a_decimals, reserve_b_pool_a_decimals, reserve_a_mint_pool_a, reserve_b_mint_pool_a = await fetch_meteora_reserves_api(pool_a_address)
-                    else:
-                        logger.info(f"Unknown DEX: {pool_a_dex} or {pool_b_dex}")
-                        continue
+def backoff_pools():
+    """Pools whose lookup is currently backed off."""
+    now = time.monotonic()
+    return sum(1 for _, retry_at in failed_lookups.values() if now < retry_at)
 
-                    if pool_b_dex == 'raydium':
-                        meteora_fee = route['pool1_fee']
-                        reserve_a_address_pool_b, reserve_b_address_pool_b, reserve_a_pool_b_decimals, reserve_b_pool_b_decimals, reserve_a_mint_pool_b, reserve_b_mint_pool_b, pool_b_fee = await fetch_raydium_reserves_api(pool_b_address)
-                    elif pool_b_dex == 'meteora':
-                        meteora_fee = route['pool2_fee']
-                        pool_b_fee = meteora_fee
-                        reserve_a_address_pool_b, reserve_b_address_pool_b, reserve_a_pool_b_decimals, reserve_b_pool_b_decimals, reserve_a_mint_pool_b, reserve_b_mint_pool_b = await fetch_meteora_reserves_api(pool_b_address)
-                    else:
-                        logger.info(f"Unknown DEX: {pool_a_dex} or {pool_b_dex}")
-                        continue
-                    
-                    if int(meteora_fee) < 2:
-                        # logger.info(f"Skipping route less than 2%")
-                        # Update status of the route to 'disabled' in case of an error
-                        await conn.execute('''
-                            UPDATE two_arbitrage_routes
-                            SET status = 'skip'
-                            WHERE pool_a_id = $1 AND pool_b_id = $2
-                        ''', route['pool1_id'], route['pool2_id'])
-                        continue
-                        
-                    # Save the route to the database
-                    await conn.execute('''
-                        INSERT INTO two_arbitrage_routes (
-                            pool_a_id, pool_b_id, pool_a_address, pool_b_address, pool_a_dex, pool_b_dex,
-                            reserve_a_pool_a, reserve_b_pool_a, reserve_a_pool_b, reserve_b_pool_b,
-                            reserve_a_pool_a_decimals, reserve_b_pool_a_decimals, 
-                            reserve_a_pool_b_decimals, reserve_b_pool_b_decimals,
-                            reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_address_pool_b, reserve_b_address_pool_b,
-                            pool_a_fee, pool_b_fee,
-                            reserve_a_mint_pool_a, reserve_b_mint_pool_a, reserve_a_mint_pool_b, reserve_b_mint_pool_b,
-                            status
-                        ) VALUES (
-                            $1, $2, $3, $4, 
-                            $5, $6, $7, $8, $9, $10, 
-                            $11, $12, $13, $14, 
-                            $15, $16, $17, $18,
-                            $19, $20,
-                            $21, $22, $23, $24,
-                            'enabled'  -- or 'disabled' based on logic, default 'enabled'
-                        )
-                        ON CONFLICT (pool_a_id, pool_b_id) 
-                        DO UPDATE SET 
-                            pool_a_address = EXCLUDED.pool_a_address,
-                            pool_b_address = EXCLUDED.pool_b_address,
-                            pool_a_dex = EXCLUDED.pool_a_dex,
-                            pool_b_dex = EXCLUDED.pool_b_dex,
-                            pool_a_fee = EXCLUDED.pool_a_fee,
-                            pool_b_fee = EXCLUDED.pool_b_fee,
-                            reserve_a_pool_a = EXCLUDED.reserve_a_pool_a,
-                            reserve_b_pool_a = EXCLUDED.reserve_b_pool_a,
-                            reserve_a_pool_b = EXCLUDED.reserve_a_pool_b,
-                            reserve_b_pool_b = EXCLUDED.reserve_b_pool_b,
-                            reserve_a_pool_a_decimals = EXCLUDED.reserve_a_pool_a_decimals,
-                            reserve_b_pool_a_decimals = EXCLUDED.reserve_b_pool_a_decimals,
-                            reserve_a_pool_b_decimals = EXCLUDED.reserve_a_pool_b_decimals,
-                            reserve_b_pool_b_decimals = EXCLUDED.reserve_b_pool_b_decimals,
-                            reserve_a_address_pool_a = EXCLUDED.reserve_a_address_pool_a,
-                            reserve_b_address_pool_a = EXCLUDED.reserve_b_address_pool_a,
-                            reserve_a_address_pool_b = EXCLUDED.reserve_a_address_pool_b,
-                            reserve_b_address_pool_b = EXCLUDED.reserve_b_address_pool_b,
-                            reserve_a_mint_pool_a = EXCLUDED.reserve_a_mint_pool_a,
-                            reserve_b_mint_pool_a = EXCLUDED.reserve_b_mint_pool_a,
-                            reserve_a_mint_pool_b = EXCLUDED.reserve_a_mint_pool_b,
-                            reserve_b_mint_pool_b = EXCLUDED.reserve_b_mint_pool_b,
-                            lut = EXCLUDED.lut,
-                            status = EXCLUDED.status,
-                            updated_at = CURRENT_TIMESTAMP;
-                    ''', pool_a_id, pool_b_id, pool_a_address, pool_b_address, pool_a_dex, pool_b_dex,
-                        reserve_a_pool_a, reserve_b_pool_a, reserve_a_pool_b, reserve_b_pool_b,
-                        float(reserve_a_pool_a_decimals), float(reserve_b_pool_a_decimals),
-                        float(reserve_a_pool_b_decimals), float(reserve_b_pool_b_decimals),
-                        reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_address_pool_b, reserve_b_address_pool_b,
-                        # str(pool_a_fee), str(pool_b_fee),
-                        pool_a_fee, pool_b_fee,
-                        reserve_a_mint_pool_a, reserve_b_mint_pool_a, reserve_a_mint_pool_b, reserve_b_mint_pool_b,)
-                except Exception as e:
-                    logger.info(f"Failed to save route: {route} - {e}")
-                    # logger.info(f"Failed to save route: {e}")
-                    # Update status of the route to 'disabled' in case of an error
-                    await conn.execute('''
-                        UPDATE two_arbitrage_routes
-                        SET status = 'skip'
-                        WHERE pool_a_id = $1 AND pool_b_id = $2
-                    ''', route['pool1_id'], route['pool2_id'])
+async def discover_two_arbitrage_routes():
+    """
+    Find the new Raydium <-> Meteora routes of tradable tokens against SOL and save them in one batch.
+
+    The pools and the saved route keys are loaded with one query each and paired in memory, each pool
+    of a new route is looked up once through the modules.api caches. Returns the counts of the pass.
+    """
+    start_time = time.perf_counter()
+    pools, route_keys, tradable_tokens = await asyncio.gather(get_tradable_sol_pools(), get_two_arbitrage_route_keys(), get_tradable_tokens())
+    pools = [pool for pool in pools if pool['dex'] == 'raydium' or Decimal(str(pool['fee'])) >= MIN_METEORA_FEE]
+
+    # Tradable tokens without any pool to route through are not tradable
+    tokens_without_pools = {token['address'] for token in tradable_tokens} - {pool['token_address'] for pool in pools} - {SOLANA_PROGRAM}
+    if tokens_without_pools:
+        logger.warning(f"Setting {len(tokens_without_pools)} tokens without pools to non-tradable: {sorted(tokens_without_pools)}")
+        await set_tokens_not_tradable(tokens_without_pools)
+
+    new_pairs, existing = find_two_arbitrage_pairs(pools, route_keys)
+
+    # Looked up together so Raydium ids and mint decimals go out in batches, the metadata stays cached for the LUTs
+    pools_to_fetch = {pool['id']: pool for pair in new_pairs for pool in pair}
+    pool_reserves = await fetch_pools_reserves(pools_to_fetch.values())
+
+    rows = []
+    failed = 0
+    for pool_a, pool_b in new_pairs:
+        reserves_a, reserves_b = pool_reserves[pool_a['id']], pool_reserves[pool_b['id']]
+        # A failed lookup is retried once its backoff expires
+        if reserves_a is None or reserves_b is None:
+            failed += 1
+            continue
+
+        reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_pool_a_decimals, reserve_b_pool_a_decimals, reserve_a_mint_pool_a, reserve_b_mint_pool_a, pool_a_fee = reserves_a
+        reserve_a_address_pool_b, reserve_b_address_pool_b, reserve_a_pool_b_decimals, reserve_b_pool_b_decimals, reserve_a_mint_pool_b, reserve_b_mint_pool_b, pool_b_fee = reserves_b
+        rows.append((
+            pool_a['id'], pool_b['id'], pool_a['address'], pool_b['address'], pool_a['dex'], pool_b['dex'],
+            0.0, 0.0, 0.0, 0.0,
+            float(reserve_a_pool_a_decimals), float(reserve_b_pool_a_decimals),
+            float(reserve_a_pool_b_decimals), float(reserve_b_pool_b_decimals),
+            reserve_a_address_pool_a, reserve_b_address_pool_a, reserve_a_address_pool_b, reserve_b_address_pool_b,
+            pool_a_fee, pool_b_fee,
+            reserve_a_mint_pool_a, reserve_b_mint_pool_a, reserve_a_mint_pool_b, reserve_b_mint_pool_b,
+            'enabled',
+        ))
+
+    await upsert_two_arbitrage_routes(rows)
+
+    stats = {
+        'pools': len(pools),
+        'existing': existing,
+        'new': len(new_pairs),
+        'fetched_pools': len(pools_to_fetch),
+        'saved': len(rows),
+        'failed': failed,
+        'backoff_pools': backoff_pools(),
+        'seconds': round(time.perf_counter() - start_time, 3),
+    }
+    if new_pairs:
+        logger.info(f"🔎 Route discovery: {stats}")
+    else:
+        logger.debug(f"🔎 Route discovery: {stats}")
+    return stats
+
+# Pool graph of the cycle search, kept between passes so each pass only applies the price changes
+cycle_engine = None
+
+def pool_fee_rate(pool):
+    # Raydium fees come from fetch_raydium_reserves_api as a fraction, Meteora base fees are stored in percent
+    return float(pool['fee']) if pool['dex'] == 'raydium' else float(pool['fee']) / 100
+
+async def discover_three_arbitrage_routes():
+    """
+    Search the arbitrage cycles through SOL over the tradable pools and save the new three-pool ones in one batch.
+
+    The first pass builds the pool graph and runs a full search, the next passes add the new pools and only
+    search the cycles through the pools whose price changed (fetch_pool_prices polls the pools without a DLMM
+    bins snapshot on a rolling schedule). Longer cycles (CYCLE_MAX_HOPS > 3) are found and counted but have
+    no routes table to go to yet. Returns the counts of the pass.
+    """
+    global cycle_engine
+    start_time = time.perf_counter()
+    pools, route_keys = await asyncio.gather(get_tradable_pools(), get_three_arbitrage_route_keys())
+    pools = [pool for pool in pools if pool['dex'] == 'raydium' or Decimal(str(pool['fee'])) >= MIN_METEORA_FEE]
+
+    prune_failed_lookups(pools)
+    pool_reserves = await fetch_pools_reserves(pools)
+    graph_pools = {}
+    for pool in pools:
+        reserves = pool_reserves[pool['id']]
+        if reserves is None or not all(reserves[:2]):
+            continue
+        reserve_a_address, reserve_b_address, reserve_a_decimals, reserve_b_decimals, reserve_a_mint, reserve_b_mint, fee = reserves
+        graph_pools[pool['id']] = {
+            **pool,
+            'fee': fee,
+            'reserve_a_address': reserve_a_address,
+            'reserve_b_address': reserve_b_address,
+            'reserve_a_decimals': reserve_a_decimals,
+            'reserve_b_decimals': reserve_b_decimals,
+            'reserve_a_mint': reserve_a_mint,
+            'reserve_b_mint': reserve_b_mint,
+        }
+    # Every graph pool has an entry, None if its price could not be fetched so the search does not cross it
+    prices = await fetch_pool_prices(list(graph_pools.values()))
+    priced = sum(1 for price in prices.values() if price is not None)
+
+    if cycle_engine is None:
+        cycle_engine = CycleEngine()
+        for pool_id, pool in graph_pools.items():
+            cycle_engine.add_pool(pool_id, pool['reserve_a_mint'], pool['reserve_b_mint'], pool_fee_rate(pool), prices.get(pool_id))
+        changed = list(graph_pools)
+        cycles = cycle_engine.search()
+    else:
+        # Pools gone from the graph keep their edges, without a price they are never crossed, like unpriced pools
+        for pool_id in cycle_engine.pools.keys() - graph_pools.keys():
+            prices[pool_id] = None
+        changed = [pool_id for pool_id in prices if pool_id not in cycle_engine.pools or cycle_engine.prices[pool_id] != prices[pool_id]]
+
+        # All prices first so the pruning bounds are rebuilt at most once, then the cycles through each changed pool
+        for pool_id in changed:
+            pool = graph_pools.get(pool_id)
+            if pool is not None:
+                cycle_engine.add_pool(pool_id, pool['reserve_a_mint'], pool['reserve_b_mint'], pool_fee_rate(pool), prices[pool_id])
+            else:
+                cycle_engine.set_price(pool_id, None)
+        cycles = {}
+        for pool_id in changed:
+            cycles.update(cycle_engine.update_pool(pool_id, prices[pool_id]))
+
+    rows = []
+    for edges in cycles:
+        legs = cycle_engine.legs(edges)
+        key = tuple(pool_id for pool_id, _, _ in legs)
+        if len(legs) != 3 or key in route_keys:
+            continue
+        route_pools = [graph_pools[pool_id] for pool_id in key]
+        rows.append((
+            *key,
+            *(pool['address'] for pool in route_pools),
+            *(pool['dex'] for pool in route_pools),
+            *(str(pool['fee']) for pool in route_pools),
+            *(address for pool in route_pools for address in (pool['reserve_a_address'], pool['reserve_b_address'])),
+            *(mint for pool in route_pools for mint in (pool['reserve_a_mint'], pool['reserve_b_mint'])),
+            *(0.0 for _ in range(6)),
+            *(float(decimals) for pool in route_pools for decimals in (pool['reserve_a_decimals'], pool['reserve_b_decimals'])),
+            'enabled',
+        ))
+        route_keys.add(key)
+
+    await upsert_three_arbitrage_routes(rows)
+
+    stats = {
+        'pools': len(pools),
+        'priced': priced,
+        'changed': len(changed),
+        'cycles': len(cycles),
+        'longer_cycles': sum(1 for edges in cycles if len(edges) > 3),
+        'best_return': round(cycle_return(min(cycles.values())), 6) if cycles else None,
+        'saved': len(rows),
+        'bound_rebuilds': cycle_engine.bound_rebuilds,
+        'backoff_pools': backoff_pools(),
+        'seconds': round(time.perf_counter() - start_time, 3),
+    }
+    if rows:
+        logger.info(f"🔺 Cycle search: {stats}")
+    else:
+        logger.debug(f"🔺 Cycle search: {stats}")
+    return stats
 
+async def find_and_save_two_arbitrage_routes():
+    """
+    Finds all possible two-pool arbitrage routes between Raydium and Meteora,
+    saves them to the database and creates the LUTs of the routes missing one.
+    """
+    try:
+        await discover_two_arbitrage_routes()
+    except Exception as e:
+        logger.error(f"Route discovery error: {e}")
+
+    async with get_db_connection() as conn:
+        try:
             # Step 6: Detect unique routes        
             # Fetch routes and join with token info to check if both mints are tradable
             routes = await conn.fetch('''
@@ -305,6 +340,13 @@ async def find_and_save_two_arbitrage_routes():
             tradable_routes = [dict(row) for row in routes if row['tradable_a'] and row['tradable_b']]
 
             unique_routes = await detect_unique_routes(tradable_routes)
+
+            # Pool metadata of the routes missing a LUT in batches, usually already cached by the discovery
+            routes_without_lut = [route for route in unique_routes if not route['lut']]
+            await asyncio.gather(
+                raydium_pool_keys.load_many([route['pool_a_address'] if route['pool_a_dex'] == 'raydium' else route['pool_b_address'] for route in routes_without_lut]),
+                meteora_pairs.load_many([route['pool_b_address'] if route['pool_a_dex'] == 'raydium' else route['pool_a_address'] for route in routes_without_lut]),
+            )
             # logger.info(f"Found {len(unique_routes)} unique two-pool arbitrage routes.")
 
             # unique_routes = routes
@@ -351,6 +393,7 @@ async def find_and_save_two_arbitrage_routes():
                     if raydium_program_id != RAYDIUM_AMM_PROGRAM:
                         logger.info(f" - Raydium pool not matching AMM program")
                         await update_two_arbitrage_route_status(route['id'], 'skip')
+                        await publish_routes_reload(removed=[route['id']])
                         continue
 
                     meteora_lut = await fetch_meteora_lut_addresses_api(meteora_pool)
@@ -358,6 +401,7 @@ async def find_and_save_two_arbitrage_routes():
                     if not meteora_lut:
                         logger.info(f" - Meteora pool not found")
                         await update_two_arbitrage_route_status(route['id'], 'skip')
+                        await publish_routes_reload(removed=[route['id']])
                         continue
 
                     # Create LUT
@@ -428,39 +472,21 @@ async def find_and_save_two_arbitrage_routes():
                     ''', str(alt), route['id'])
                     
                     # Clone LUT address to non-unique routes that have the same pool addresses
-                    await conn.execute('''
+                    cloned_routes = await conn.fetch('''
                         UPDATE two_arbitrage_routes
                         SET lut = $1
-                        WHERE (pool_a_address = $2 AND pool_b_address = $3)
-                        OR (pool_a_address = $3 AND pool_b_address = $2)
+                        WHERE ((pool_a_address = $2 AND pool_b_address = $3)
+                        OR (pool_a_address = $3 AND pool_b_address = $2))
                         AND lut IS NULL
+                        RETURNING id
                     ''', str(alt), raydium_pool, meteora_pool)
 
                     logger.info(f" - LUT created and cloned to other routes with matching pool addresses.")
 
-                    # Publish a signal to Redis
-                    message = {
-                        "reload": 1
-                    }
-                    await asyncio.to_thread(redis_client.publish, "meteora:new_pool", json.dumps(message))
+                    # Publish a signal to Redis with the routes that changed
+                    await publish_routes_reload(added={route['id'], *[row['id'] for row in cloned_routes]})
 
                     time.sleep(0.5)  # Add a delay to avoid rate limiting
 
         except Exception as e:
-            # Find if error matches: "The node {mint} is not in the digraph."
-            str_e = str(e)
-            if str_e.find("The node") != -1 and str_e.find("is not in the digraph") != -1:
-                # Extract the node from the error message
-                node = str_e.split("The node ")[1].split(" is not in the digraph.")[0]
-                if node != SOLANA_PROGRAM:
-                    logger.error(f"Node not in digraph error: {e}")
-                    logger.error(f"Setting token not in the digraph: {node} to non-tradable")
-                    # Update the token to tradable = False
-                    await conn.execute('''
-                        UPDATE tokens
-                        SET tradable = FALSE
-                        WHERE address = $1
-                    ''', node)
-            else:
-                logger.error(f"Route edge error: {e}")
-            # return None
\ No newline at end of file
+            logger.error(f"Route LUT error: {e}")
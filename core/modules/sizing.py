@@ -0,0 +1,71 @@
+import numpy as np
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+# Profit-maximizing trade size for a Raydium -> Meteora cycle: buy tokens with SOL on the Raydium
+# constant product pool, sell them on the Meteora bins for SOL.
+#
+# Raydium cost of t tokens (amm_v4.sol_for_tokens solved for the input):
+#     c(t) = reserve_sol * t / ((reserve_token - t) * (1 - raydium_fee))
+# Meteora revenue walks the bins from the active bin down, each bin pays price * (1 - meteora_fee)
+# per token until its SOL is gone: r(t) is piecewise linear and concave.
+#
+# The profit r(t) - c(t) is concave, so the optimum is where c'(t) equals the marginal price of the
+# current bin. Per bin this has a closed form, one square root per bin instead of a search:
+#     c'(t) = m  <=>  t = reserve_token - sqrt(reserve_sol * reserve_token / (m * (1 - raydium_fee)))
+
+def cpmm_cost_for_tokens(tokens, reserve_sol, reserve_token, swap_fee=0.25):
+    """
+    SOL needed to buy `tokens` on a constant product pool, inverse of amm_v4.sol_for_tokens.
+    """
+    return reserve_sol * tokens / ((reserve_token - tokens) * (1 - swap_fee / 100))
+
+def cpmm_tokens_for_cost(cost, reserve_sol, reserve_token, swap_fee=0.25):
+    """
+    Tokens bought with `cost` SOL, same as amm_v4.sol_for_tokens without rounding.
+    """
+    effective_sol_used = cost * (1 - swap_fee / 100)
+    return reserve_token - reserve_sol * reserve_token / (reserve_sol + effective_sol_used)
+
+def optimal_trade_size(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, raydium_fee=0.25, max_cost=np.inf):
+    """
+    Profit-maximizing number of tokens to buy on Raydium and sell on Meteora, for many routes at once.
+
+    reserve_sol, reserve_token, meteora_fee, max_cost: one value per route (fees in percent)
+    bin_price, bin_y: (routes, bins) SOL per token and SOL liquidity of the bins the sale walks through,
+        best price first. NaN or empty bins are skipped.
+
+    Returns (tokens, cost, revenue), cost and revenue in SOL.
+    """
+    reserve_sol = np.asarray(reserve_sol, dtype=float)
+    reserve_token = np.asarray(reserve_token, dtype=float)
+    keep = 1 - np.asarray(meteora_fee, dtype=float) / 100
+    raydium_keep = 1 - raydium_fee / 100
+
+    # The budget caps the tokens: c(t) <= max_cost
+    max_tokens = cpmm_tokens_for_cost(np.broadcast_to(max_cost, reserve_sol.shape), reserve_sol, reserve_token, raydium_fee)
+
+    tokens = np.zeros_like(reserve_sol)
+    revenue = np.zeros_like(reserve_sol)
+    done = np.zeros(reserve_sol.shape, dtype=bool)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k in range(bin_price.shape[1]):
+            marginal = bin_price[:, k] * keep
+            usable = ~done & (bin_y[:, k] > 0) & (marginal > 0)
+            if not usable.any():
+                continue
+
+            bin_end = tokens + bin_y[:, k] / marginal
+            best = np.minimum(reserve_token - np.sqrt(reserve_sol * reserve_token / (marginal * raydium_keep)), max_tokens)
+
+            # Past the end of the bin the next one is still worth walking into, otherwise stop inside it
+            stop = usable & (best < bin_end)
+            end = np.where(stop, np.clip(best, tokens, bin_end), bin_end)
+            revenue = np.where(usable, revenue + (end - tokens) * marginal, revenue)
+            tokens = np.where(usable, end, tokens)
+            done |= stop
+
+    cost = np.where(tokens > 0, cpmm_cost_for_tokens(tokens, reserve_sol, reserve_token, raydium_fee), 0.0)
+    return tokens, cost, revenue
@@ -1,10 +1,10 @@
 import json
 import base58
+import base64
 import uvloop
 import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-import time
-import pickle
+import struct
 
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
@@ -13,6 +13,10 @@ from config import SOLANA_PROGRAM, TOKEN_PROGRAM, OPERATOR_WSOL_ATA, USE_JITO, r
 # from modules.raydium_py.raydium.amm_v4 import buy_ix
 from modules.raydium_py.raydium.amm_v4 import buy_ix_fixed
 from modules.dlmm.dlmm import DLMM
+from modules.dlmm.dlmm.native import LB_CLMM_PROGRAM_ID, SWAP_DISCRIMINATOR
+from modules.raydium_py.raydium.constants import SOL_DECIMAL
+from modules.blockhash import get_latest_blockhash
+from modules import tracing
 
 from solana.transaction import Transaction
 from solana.rpc.async_api import AsyncClient
@@ -21,10 +25,9 @@ from solana.rpc.types import TxOpts
 from solders.pubkey import Pubkey
 from solders.instruction import Instruction, AccountMeta
 from solders.transaction import VersionedTransaction
-from solders.message import MessageV0
+from solders.message import MessageV0, to_bytes_versioned
+from solders.hash import Hash
 from solders.address_lookup_table_account import AddressLookupTableAccount
-from solders.signature import Signature
-from solders.transaction_status import TransactionConfirmationStatus
 
 from solders.system_program import (
     transfer as native_transfer,
@@ -39,100 +42,28 @@ from spl.token.instructions import (
 # from solana.rpc.api import Client
 # solana_client = Client(RPC_ENDPOINT_LIST[0])
 
+JITO_TIP_LAMPORTS = 10_000_000
+
+# Instruction data layouts patched in route templates
+U64 = struct.Struct("<Q")
+SPL_TRANSFER_TAG = bytes([3])  # spl-token Transfer: tag, u64 amount
+RAYDIUM_SWAP_TAG = bytes([9])  # AMM v4 SwapBaseIn: tag, u64 amount in, u64 minimum amount out
+
 # # Generate a new keypair (or load from file)
 # vault = Keypair.from_base58_string(VAULT_PRIVATE_KEY)
 # payer = Keypair.from_base58_string(PAYER_PRIVATE_KEY)
 # operator = Keypair.from_base58_string(OPERATOR_PRIVATE_KEY)
 
-def deserialize_blockhash_with_pickle(serialized_blockhash):
-    """Deserialize the blockhash object using pickle."""
-    return pickle.loads(serialized_blockhash)
-
-def get_latest_blockhash_from_redis():
-    """Function to retrieve the latest blockhash from Redis."""
-    serialized_blockhash = redis_client.get("latest_blockhash")
-    if serialized_blockhash:
-        # Deserialize the blockhash object using pickle
-        blockhash_data = deserialize_blockhash_with_pickle(serialized_blockhash)
-        # print(f"Latest Blockhash: {blockhash_data.value.blockhash}")
-        # print(type(blockhash_data))
-        return blockhash_data
-    else:
-        logger.warning("🚨 No blockhash found in Redis.")
-        return None
-
 async def simulate_transaction(solana_client, txn):
     sim_resp = await solana_client.simulate_transaction(txn)
     if sim_resp.value.err:
         raise Exception(f"Simulation failed: {sim_resp.value.err}")
     return sim_resp
 
-async def broadcast(self, tx: Transaction) -> list[Signature]:
-    """Broadcast to multiple nodes simultaneously"""
-    tasks = []
-    for endpoint in self.rpc_endpoints:
-        client = AsyncClient(endpoint)
-        tasks.append(client.send_transaction(tx, self.wallet))
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    return [r for r in results if not isinstance(r, Exception)]
-
-async def check_transaction_status(client: AsyncClient, signature_str: str):
-    print("Checking transaction status...")
-    max_attempts = 60  # 60 seconds
-    attempt = 0
-    
-    signature = Signature.from_string(signature_str)
-    
-    while attempt < max_attempts:
-        try:
-            response = await client.get_signature_statuses([signature])
-            
-            if response.value[0] is not None:
-                status = response.value[0]
-                slot = status.slot
-                confirmations = status.confirmations
-                err = status.err
-                confirmation_status = status.confirmation_status
-
-                print(f"Slot: {slot}")
-                print(f"Confirmations: {confirmations}")
-                print(f"Confirmation status: {confirmation_status}")
-                
-                if err:
-                    print(f"Transaction failed with error: {err}")
-                    return False
-                elif confirmation_status == TransactionConfirmationStatus.Finalized:
-                    print("Transaction is finalized.")
-                    return True
-                elif confirmation_status == TransactionConfirmationStatus.Confirmed:
-                    print("Transaction is confirmed but not yet finalized.")
-                elif confirmation_status == TransactionConfirmationStatus.Processed:
-                    print("Transaction is processed but not yet confirmed or finalized.")
-            else:
-                print("Transaction status not available yet.")
-            
-            await asyncio.sleep(1)
-            attempt += 1
-        except Exception as e:
-            print(f"Error checking transaction status: {e}")
-            await asyncio.sleep(1)
-            attempt += 1
-    
-    print(f"Transaction not finalized after {max_attempts} attempts.")
-    return False
-
-async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, meteora_slippage, pool_raydium_address, pool_meteora_address, meteora_in_token, meteora_out_token, lut, lut_addresses, dlmm_object, bin_arrays, solana_client, broadcast_clients, vault, payer, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address):
-    logger.info("Starting swap...")
-
-    start_time = time.time()    
-    lut = Pubkey.from_string(lut)
-    lut_addresses = [Pubkey.from_string(address) for address in lut_addresses]
-
-    luts_time = time.time()
-    logger.info(f"🕒 Execution time for luts: {(luts_time - start_time) * 1000:.3f} ms")
-
-    dlmm = dlmm_object
+def build_swap_instructions(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, pool_raydium_address, meteora_in_token, meteora_out_token, lut_addresses, dlmm, bin_arrays, vault, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address):
+    """
+    Instructions of a Raydium -> Meteora swap, in transaction order.
+    """
     pool_meteora_address = dlmm.pool_address
     dlmm_token_x_decimals = dlmm.token_X.decimal
     dlmm_token_y_decimals = dlmm.token_Y.decimal
@@ -152,13 +83,8 @@ async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow
         )
     )
 
-    borrow_ix_time = time.time()
-    logger.info(f"🕒 Execution time for borrow ix: {(borrow_ix_time - start_time) * 1000:.3f} ms")
-    
-    ata = Pubkey.from_string(ata)
+    ata = Pubkey.from_string(ata) if isinstance(ata, str) else ata
     minimum_amount_out, wsol_token_account_fixed, token_account, amount_out, swap_ix, total_amount_to_repay = buy_ix_fixed(pool_raydium_address, borrow_amount, expected_amount, dlmm_token_x_decimals, dlmm_token_y_decimals, raydium_slippage, lut_addresses, seed, operator_wsol_token_account, ata, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, init_wsol_account_ix, borrow_ix)
-    swap_1_ix_time = time.time()
-    logger.info(f"🕒 Execution time for swap 1 ix: {(swap_1_ix_time - start_time) * 1000:.3f} ms")
 
     pool_meteora_in_token = Pubkey.from_string(meteora_in_token)
     pool_meteora_out_token = Pubkey.from_string(meteora_out_token)
@@ -171,12 +97,7 @@ async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow
     userTokenIn = token_account
     userTokenOut = wsol_token_account_fixed
 
-    bin_arrays_time = time.time()
-    logger.info(f"🕒 Execution time for bin_arrays: {(bin_arrays_time - start_time) * 1000:.3f} ms")
-
-    swap_2_ix = DLMM.swap_ixs(dlmm, pool_meteora_in_token, pool_meteora_out_token, pool_meteora_in_amount, pool_meteora_min_out_amount, pool_meteora_lb_pair, operator.pubkey(), userTokenIn, userTokenOut, bin_arrays)
-    swap_2_ix_time = time.time()
-    logger.info(f"🕒 Execution time for swap 2 ix: {(swap_2_ix_time - start_time) * 1000:.3f} ms")
+    swap_2_ix = dlmm.swap_ixs(pool_meteora_in_token, pool_meteora_out_token, pool_meteora_in_amount, pool_meteora_min_out_amount, pool_meteora_lb_pair, operator.pubkey(), userTokenIn, userTokenOut, bin_arrays)
 
     repay_ix = spl_transfer(SplTransferParams(
         program_id=token_program, 
@@ -191,14 +112,12 @@ async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow
     # Jito tip transfer
     profit = int(profit * 10 ** borrow_decimals)
     jito_tip_amount = int(profit * 0.5)
-    jito_tip_amount = int(1_000_000_0)
+    jito_tip_amount = JITO_TIP_LAMPORTS
 
     # jito_tip_address = jitoSdk.get_random_tip_account()
     logger.info(f"Jito tip account: {str(jito_tip_address)}")
     
     jito_tip_ix = native_transfer(NativeTransferParams(from_pubkey=operator.pubkey(), to_pubkey=jito_tip_address, lamports=jito_tip_amount))
-    jito_tip_ix_time = time.time()
-    logger.info(f"🕒 Execution time for Jito tip ix: {(jito_tip_ix_time - start_time) * 1000:.3f} ms")
 
     # Initialize the transaction
     txn = Transaction()
@@ -237,18 +156,22 @@ async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow
     txn.add(jito_tip_ix)  # Tip
 
     # print("Transaction Instructions:", txn.instructions)
+    return txn.instructions
 
-    # blockhash = solana_client.get_latest_blockhash()
-    blockhash = get_latest_blockhash_from_redis()
+def compile_swap_message(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, pool_raydium_address, meteora_in_token, meteora_out_token, lut, lut_addresses, dlmm_object, bin_arrays, vault, payer, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address, blockhash):
+    """
+    Build and compile the v0 message of a Raydium -> Meteora swap from scratch.
+    """
+    lut = Pubkey.from_string(lut)
+    lut_addresses = [Pubkey.from_string(address) for address in lut_addresses]
 
-    blockhash_time = time.time()
-    logger.info(f"🕒 Execution time for blockhash: {(blockhash_time - start_time) * 1000:.3f} ms")
+    instructions = build_swap_instructions(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, pool_raydium_address, meteora_in_token, meteora_out_token, lut_addresses, dlmm_object, bin_arrays, vault, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address)
 
     # Compile the transaction to v0 message with lookup table
     message_v0 = MessageV0.try_compile(
         payer=payer.pubkey(),
-        recent_blockhash=blockhash.value.blockhash,
-        instructions=txn.instructions,
+        recent_blockhash=blockhash,
+        instructions=instructions,
         address_lookup_table_accounts=[
             AddressLookupTableAccount(
                 key=lut,
@@ -257,42 +180,186 @@ async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow
         ],
     )
 
-    message_v0_time = time.time()
-    logger.info(f"🕒 Execution time for message_v0: {(message_v0_time - start_time) * 1000:.3f} ms")
+    return message_v0
+
+def compile_swap_transaction(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, pool_raydium_address, meteora_in_token, meteora_out_token, lut, lut_addresses, dlmm_object, bin_arrays, vault, payer, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address, blockhash):
+    """
+    Build, compile and sign a Raydium -> Meteora swap from scratch.
+    """
+    message_v0 = compile_swap_message(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, pool_raydium_address, meteora_in_token, meteora_out_token, lut, lut_addresses, dlmm_object, bin_arrays, vault, payer, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address, blockhash)
+    return VersionedTransaction(message_v0, [payer, vault, operator])
+
+def read_shortvec(data, offset):
+    """Decode a compact-u16 length, returns (value, next offset)."""
+    value = 0
+    for shift in range(3):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << (7 * shift)
+        if not byte & 0x80:
+            break
+    return value, offset
+
+def message_offsets(message):
+    """
+    Byte offsets of the recent blockhash and of each instruction data in a serialized versioned message.
+    """
+    offset = 1 + 3  # Version prefix, header
+    account_count, offset = read_shortvec(message, offset)
+    offset += 32 * account_count
+    blockhash_offset = offset
+    offset += 32
+
+    data_offsets = []
+    instruction_count, offset = read_shortvec(message, offset)
+    for _ in range(instruction_count):
+        offset += 1  # Program id index
+        accounts_count, offset = read_shortvec(message, offset)
+        offset += accounts_count
+        data_length, offset = read_shortvec(message, offset)
+        data_offsets.append(offset)
+        offset += data_length
+    return blockhash_offset, data_offsets
+
+def build_route_template(route, lut_addresses, cache):
+    """
+    Compile the swap of a route once with placeholder amounts and record where the amounts and the
+    blockhash live in the message, `build_template_transaction` then only patches bytes and signs.
+
+    Returns None when the instructions do not have the expected layout, the route then uses the full build.
+    """
+    dlmm_pool_address = route['pool_b_address']
+    dlmm = cache['meteora_dlmm_objects'].get(dlmm_pool_address)
+    if dlmm is None or lut_addresses is None:
+        return None
 
-    # Create the VersionedTransaction from the v0 message
-    txn_v0 = VersionedTransaction(message_v0, [payer, vault, operator])
+    lut = Pubkey.from_string(route['lut'])
+    lut_pubkeys = [Pubkey.from_string(address) for address in lut_addresses]
+    instructions = build_swap_instructions(
+        0, 1, 1, 9, 0, route['pool_a_address'], route['reserve_b_mint_pool_b'], route['reserve_a_mint_pool_b'],
+        lut_pubkeys, dlmm, cache['meteora_dlmm_bin_arrays_objects'].get(dlmm_pool_address),
+        cache['vault'], cache['operator'], cache['seed'], lut_pubkeys[21], cache['vault_wsol_token_account'], cache['operator_wsol_token_account'],
+        cache['balance_needed'], cache['compute_unit_limit'], cache['compute_unit_price'],
+        cache['create_wsol_account_instruction'], cache['init_wsol_account_instruction'], cache['close_wsol_account_instruction'],
+        cache['jito_tip_address'],
+    )
+
+    # compute limit, compute price, create WSOL, borrow, Raydium swap, Meteora swap(s), repay, close WSOL, tip
+    borrow_index, raydium_index, repay_index = 3, 4, len(instructions) - 3
+    meteora_index = next((i for i, ix in enumerate(instructions) if ix.program_id == LB_CLMM_PROGRAM_ID), None)
+    if (
+        meteora_index is None
+        or instructions[borrow_index].data[:1] != SPL_TRANSFER_TAG or len(instructions[borrow_index].data) != 9
+        or instructions[repay_index].data[:1] != SPL_TRANSFER_TAG or len(instructions[repay_index].data) != 9
+        or instructions[raydium_index].data[:1] != RAYDIUM_SWAP_TAG or len(instructions[raydium_index].data) != 17
+        or instructions[meteora_index].data[:8] != SWAP_DISCRIMINATOR or len(instructions[meteora_index].data) != 24
+    ):
+        logger.warning(f"🚨 Unexpected swap layout for route {route['id']}, no template")
+        return None
+
+    message = MessageV0.try_compile(
+        payer=cache['payer'].pubkey(),
+        recent_blockhash=Hash.default(),
+        instructions=instructions,
+        address_lookup_table_accounts=[AddressLookupTableAccount(key=lut, addresses=lut_pubkeys)],
+    )
+    signers = {keypair.pubkey(): keypair for keypair in (cache['payer'], cache['vault'], cache['operator'])}
+    blockhash_offset, data_offsets = message_offsets(to_bytes_versioned(message))
+
+    return {
+        'message': bytearray(to_bytes_versioned(message)),
+        'blockhash_offset': blockhash_offset,
+        'borrow_offsets': (data_offsets[borrow_index] + 1, data_offsets[meteora_index] + 16, data_offsets[repay_index] + 1),
+        'amount_in_offset': data_offsets[raydium_index] + 1,
+        'amount_out_offsets': (data_offsets[raydium_index] + 9, data_offsets[meteora_index] + 8),
+        'signers': [signers[key] for key in message.account_keys[:message.header.num_required_signatures]],
+        'token_x_decimals': dlmm.token_X.decimal,
+    }
+
+def build_route_templates(cache, routes):
+    """
+    Templates of the Raydium -> Meteora routes by route id.
+    """
+    templates = {}
+    for route in routes:
+        if route['pool_a_dex'] != 'raydium' or route['pool_b_dex'] != 'meteora' or route['lut'] is None:
+            continue
+        try:
+            template = build_route_template(route, cache['lut_mapping'].get(route['lut']), cache)
+        except Exception as e:
+            logger.warning(f"🚨 Template build failed for route {route['id']}: {e}")
+            continue
+        if template is not None:
+            templates[route['id']] = template
+    return templates
+
+def patch_template_message(template, borrow_amount, expected_amount, blockhash, borrow_decimals=9):
+    """
+    Message bytes of a route template with the given amounts and blockhash.
+    """
+    borrow_amount_lamports = int(borrow_amount * 10 ** borrow_decimals)
+    amount_in = int(borrow_amount * SOL_DECIMAL)
+    minimum_amount_out = int(expected_amount * 10 ** template['token_x_decimals'])
+
+    message = bytearray(template['message'])
+    message[template['blockhash_offset']:template['blockhash_offset'] + 32] = bytes(blockhash)
+    for offset in template['borrow_offsets']:
+        U64.pack_into(message, offset, borrow_amount_lamports)
+    U64.pack_into(message, template['amount_in_offset'], amount_in)
+    for offset in template['amount_out_offsets']:
+        U64.pack_into(message, offset, minimum_amount_out)
+    return bytes(message)
+
+def sign_template_message(template, message):
+    """
+    Serialized transaction of a patched template message, signed by the template signers.
+    """
+    signatures = b"".join(bytes(keypair.sign_message(message)) for keypair in template['signers'])
+    return bytes([len(template['signers'])]) + signatures + message
+
+def build_template_transaction(template, borrow_amount, expected_amount, blockhash, borrow_decimals=9):
+    """
+    Serialized signed transaction of a route template for the given amounts and blockhash.
+    """
+    return sign_template_message(template, patch_template_message(template, borrow_amount, expected_amount, blockhash, borrow_decimals))
+
+async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, meteora_slippage, pool_raydium_address, pool_meteora_address, meteora_in_token, meteora_out_token, lut, lut_addresses, dlmm_object, bin_arrays, solana_client, broadcaster, vault, payer, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address, template=None, jito_submitter=None, route_id=None):
+    logger.info("Starting swap...")
 
-    txn_v0_time = time.time()
-    logger.info(f"🕒 Execution time for txn_v0: {(txn_v0_time - start_time) * 1000:.3f} ms")
+    start_ns = tracing.now()
+
+    # blockhash = solana_client.get_latest_blockhash()
+    blockhash = get_latest_blockhash()
+    if blockhash is None:
+        return None
 
-    swap_ixs_time = time.time()
-    print(f"🕒 Execution time for swap ixs: {(swap_ixs_time - start_time) * 1000:.3f} ms")
-    logger.info(f"🕒 Execution time for swap ixs: {(swap_ixs_time - start_time) * 1000:.3f} ms")
+    if template is not None:
+        # Precompiled route: only the amounts, the blockhash and the signatures change
+        message = patch_template_message(template, borrow_amount, expected_amount, blockhash.blockhash)
+        build_ns = tracing.mark('build', start_ns, route_id)
+        transaction = sign_template_message(template, message)
+    else:
+        message_v0 = compile_swap_message(profit, borrow_amount, expected_amount, borrow_decimals, raydium_slippage, pool_raydium_address, meteora_in_token, meteora_out_token, lut, lut_addresses, dlmm_object, bin_arrays, vault, payer, operator, seed, ata, vault_wsol_token_account, operator_wsol_token_account, balance_needed, compute_unit_limit_ix, compute_unit_price_ix, create_wsol_account_ix, init_wsol_account_ix, close_wsol_account_ix, jito_tip_address, blockhash.blockhash)
+        build_ns = tracing.mark('build', start_ns, route_id)
+        transaction = bytes(VersionedTransaction(message_v0, [payer, vault, operator]))
+    sign_ns = tracing.mark('sign', build_ns, route_id)
 
     signature = None
 
     if USE_JITO:
-        serialized_transaction = base58.b58encode(bytes(txn_v0)).decode('ascii')
-        
-        # print(f"Serialized transaction: {serialized_transaction}")
-        
-        response = jitoSdk.send_txn(params=serialized_transaction, bundleOnly=False)
+        if jito_submitter is not None:
+            # Multi-region fan-out, first accepted region wins
+            submitted = await jito_submitter.submit(transaction)
+            response = {'success': True, 'data': {'result': submitted['signature']}} if submitted['success'] else {'success': False, 'error': submitted['error']}
+        else:
+            serialized_transaction = base64.b64encode(transaction).decode('ascii')
+            response = await asyncio.to_thread(jitoSdk.send_txn, params=serialized_transaction, bundleOnly=False)
 
         if response['success']:
             # print(f"Full Jito SDK response: {response}")
             signature_str = response['data']['result']
             # print(f"Transaction signature: {signature_str}")
 
-            # finalized = await check_transaction_status(solana_client, signature_str)
-            
-            # if finalized:
-            #     print(f"🚀 Transaction Signature: https://solana.fm/tx/{send_resp.value}")
-            #     logger.info(f"🚀 Transaction Signature: https://solana.fm/tx/{send_resp.value}")
-            # else:
-            #     print("Transaction was not finalized within the expected time.")
-            #     logger.error("Transaction was not finalized within the expected time.")
-
             signature = signature_str
             print(f"🚀 Transaction Signature: https://solana.fm/tx/{signature}")
             logger.info(f"🚀 Transaction Signature: https://solana.fm/tx/{signature}")
@@ -302,43 +369,15 @@ async def swap_raydium_to_meteora(profit, borrow_amount, expected_amount, borrow
             return 'Error sending transaction'
 
     else:
-        # # Optionally, send the transaction
-        send_resp = solana_client.send_transaction(
-            txn_v0, opts=TxOpts(skip_preflight=False, preflight_commitment=RPC_STATUS)
-        )
-
-        # if send_resp.value.err:
-        #     logger.error(f"❌ Transaction failed: {send_resp}")
-        # else:
-        #     print("🚀 Transaction Signature:", send_resp.value)
-        #     logger.info(f"🚀 Transaction Signature: {send_resp.value}")
-
-        signature = send_resp.value
+        # Hedged broadcast to every RPC endpoint, rebroadcast until it lands or the blockhash expires
+        signature = await broadcaster.send(transaction, blockhash.last_valid_block_height)
         print(f"🚀 Transaction Signature: https://solana.fm/tx/{signature}")
         logger.info(f"🚀 Transaction Signature: https://solana.fm/tx/{signature}")
-    
-    # tasks = []
-    # for broadcast_client in broadcast_clients:
-    #     tasks.append(
-    #         broadcast_client.send_transaction,
-    #         txn_v0,
-    #         opts=TxOpts(skip_preflight=False)
-    #     )
-    
-    # results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    # for result in results:
-    #     if isinstance(result, Exception):
-    #         logger.error(f"❌ Transaction failed: {result}")
-    #     else:
-    #         print("🚀 Transaction Signature:", result.value)
-    #         logger.info(f"🚀 Transaction Signature: {result.value}")
-
-    swap_time = time.time()
-    print(f"🕒 Execution time for swap: {(swap_time - start_time) * 1000:.3f} ms")
-    logger.info(f"🕒 Execution time for swap: {(swap_time - start_time) * 1000:.3f} ms")
+
+    tracing.mark('submit', sign_ns, route_id)
     return signature
 
+
 async def swap_meteora_to_raydium(borrow_amount, borrow_decimals, raydium_slippage, meteora_slippage, pool_raydium_address, pool_meteora_address, meteora_in_token, meteora_out_token, lut, lut_addresses, rpc_client):
     ## TODO: Implement this function
     pass
@@ -0,0 +1,112 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from config import METEORA_BINS_LEFT, METEORA_BINS_RIGHT
+from modules import opportunities
+from modules.dlmm_bins import bins_to_array
+from modules.evaluator import RouteEvaluator
+
+ACTIVE_BIN = 100
+
+def make_route(seed):
+    """A Raydium -> Meteora route with fixed reserves and bins, Raydium a few percent cheaper than Meteora."""
+    rng = random.Random(seed)
+    active_price = rng.uniform(0.0001, 0.01)
+    bin_step = rng.choice([0.0025, 0.01, 0.02])
+    reserve_token = rng.uniform(50_000, 5_000_000)
+    reserve_sol = reserve_token * active_price * (1 - rng.uniform(0.03, 0.15))
+    bins = [
+        (ACTIVE_BIN + j, active_price * (1 + bin_step) ** j, 0.0 if j < 0 else rng.uniform(0, 5) / active_price, 0.0 if j > 0 else rng.uniform(0.05, 3))
+        for j in range(-METEORA_BINS_LEFT - 1, METEORA_BINS_RIGHT + 2)
+    ]
+    route = {
+        'id': seed,
+        'pool_a_dex': 'raydium',
+        'pool_b_dex': 'meteora',
+        'pool_a_address': f"raydium{seed}",
+        'pool_b_address': f"meteora{seed}",
+        'pool_a_fee': '0.0025',
+        'pool_b_fee': str(rng.choice([0.25, 1, 2])),
+        'reserve_a_address_pool_a': f"sol{seed}",
+        'reserve_b_address_pool_a': f"token{seed}",
+        'reserve_a_address_pool_b': f"token_bins{seed}",
+        'reserve_b_address_pool_b': f"sol_bins{seed}",
+        'reserve_a_pool_a_decimals': 9,
+        'reserve_b_pool_a_decimals': 6,
+        'reserve_a_mint_pool_b': f"mint{seed}",
+        'reserve_b_mint_pool_b': opportunities.WSOL_MINT,
+        'lut': None,
+        'status': 'enabled',
+    }
+    meteora_pool = (bins_to_array(sorted(bins, key=lambda b: b[1], reverse=True)), 6, 9, None, ACTIVE_BIN)
+    return route, {'reserve_a': reserve_sol, 'reserve_b': reserve_token}, meteora_pool
+
+@pytest.fixture
+def fixed_reserves(monkeypatch):
+    """process_route and the batch evaluator read the reserves and bins registered here, swaps are recorded, not sent."""
+    pools = {}
+    swaps = {}
+
+    def fetch_reserves_raydium(client, addresses, decimals, reserve_amounts):
+        return pools[addresses[0]][0]
+
+    async def fetch_reserves_meteora(dlmm, min_bins, max_bins, cache):
+        return dlmm
+
+    async def execute_swap(route, cache, lut, profit, cost, total_x_needed):
+        swaps[route['id']] = {'profit': profit, 'cost': cost, 'total_x_needed': total_x_needed}
+
+    monkeypatch.setattr(opportunities, 'fetch_reserves_raydium', fetch_reserves_raydium)
+    monkeypatch.setattr(opportunities, 'fetch_reserves_meteora', fetch_reserves_meteora)
+    monkeypatch.setattr(opportunities, 'execute_swap', execute_swap)
+    monkeypatch.setattr(opportunities, 'RESERVES_MAX_SLOT_AGE', None)
+    return pools, swaps
+
+def run_both(routes, pools, swaps):
+    """Evaluate the routes with process_route one by one and with the 'bins' batch evaluator."""
+    evaluator = RouteEvaluator(4)
+    cache = {'meteora_dlmm_client_objects': {}, 'solana_client': None}
+    rows = []
+    for route, raydium, meteora_pool in routes:
+        pools[route['reserve_a_address_pool_a']] = (raydium, meteora_pool)
+        cache['meteora_dlmm_client_objects'][route['pool_b_address']] = meteora_pool
+        asyncio.run(opportunities.process_route(route, cache, None, {}))
+
+        row = evaluator.row(route)
+        evaluator.update_raydium(row, raydium['reserve_a'], raydium['reserve_b'])
+        evaluator.update_meteora(row, meteora_pool[0], meteora_pool[4])
+        rows.append(row)
+    return {candidate['route']['id']: candidate for candidate in evaluator.evaluate(rows, sizing='bins')}
+
+def test_batch_evaluator_sizes_like_process_route(fixed_reserves):
+    pools, swaps = fixed_reserves
+    candidates = run_both([make_route(seed) for seed in range(20)], pools, swaps)
+
+    assert swaps, "no profitable route in the fixture"
+    assert candidates.keys() == swaps.keys()
+    for route_id, swap in swaps.items():
+        candidate = candidates[route_id]
+        assert candidate['total_x_needed'] == pytest.approx(swap['total_x_needed'], rel=1e-9)
+        assert candidate['cost'] == pytest.approx(swap['cost'], rel=1e-9)
+        assert candidate['profit'] == pytest.approx(swap['profit'], rel=1e-9, abs=1e-12)
+
+def test_batch_evaluator_skips_what_process_route_skips(fixed_reserves):
+    pools, swaps = fixed_reserves
+    routes = []
+    for seed in range(100, 106):
+        route, raydium, meteora_pool = make_route(seed)
+        if seed % 2:
+            # Raydium dearer than Meteora: b_to_a, never traded
+            raydium = {'reserve_a': raydium['reserve_a'] * 1.5, 'reserve_b': raydium['reserve_b']}
+        else:
+            # Less Y in the bins than MIN_TRADE_SIZE
+            bins = meteora_pool[0].copy()
+            bins['amountY'] = np.where(bins['amountY'] > 0, 1e-6, 0.0)
+            meteora_pool = (bins, *meteora_pool[1:])
+        routes.append((route, raydium, meteora_pool))
+
+    assert run_both(routes, pools, swaps) == {}
+    assert swaps == {}
@@ -0,0 +1,111 @@
+import random
+
+import numpy as np
+import pytest
+
+from modules.sizing import cpmm_cost_for_tokens, cpmm_tokens_for_cost, optimal_trade_size
+
+def make_market(rng, bins=6, discount=(-0.02, 0.15)):
+    """Raydium reserves and a Meteora bin ladder, best price first, Raydium cheaper by a `discount` fraction."""
+    active_price = rng.uniform(0.0001, 0.01)
+    bin_step = rng.choice([0.0025, 0.01, 0.02])
+    reserve_token = rng.uniform(50_000, 5_000_000)
+    reserve_sol = reserve_token * active_price * (1 - rng.uniform(*discount))
+    bin_price = [active_price * (1 + bin_step) ** -k for k in range(bins)]
+    bin_y = [rng.uniform(0.01, 3) for _ in range(bins)]
+    return reserve_sol, reserve_token, bin_price, bin_y
+
+def revenue_for_tokens(tokens, bin_price, bin_y, meteora_fee):
+    """SOL from selling `tokens` down the bins, each paying price * (1 - fee) per token until its SOL is gone."""
+    keep = 1 - meteora_fee / 100
+    revenue, left = 0.0, tokens
+    for price, liquidity in zip(bin_price, bin_y):
+        if left <= 0 or not liquidity > 0 or not price * keep > 0:
+            continue
+        sold = min(left, liquidity / (price * keep))
+        revenue += sold * price * keep
+        left -= sold
+    return revenue
+
+def brute_force(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, raydium_fee, max_cost, points=2_001, rounds=4):
+    """
+    Best profit over grids of token amounts, up to the bins' capacity and the budget.
+    Each round searches a finer grid around the best point of the previous one.
+    """
+    keep = 1 - meteora_fee / 100
+    capacity = sum(liquidity / (price * keep) for price, liquidity in zip(bin_price, bin_y) if liquidity > 0 and price * keep > 0)
+    limit = min(capacity, cpmm_tokens_for_cost(max_cost, reserve_sol, reserve_token, raydium_fee))
+    low, high = 0.0, limit
+    best_tokens, best = 0.0, 0.0
+    for _ in range(rounds):
+        grid = np.linspace(low, high, points)
+        for tokens in grid:
+            profit = revenue_for_tokens(tokens, bin_price, bin_y, meteora_fee) - cpmm_cost_for_tokens(tokens, reserve_sol, reserve_token, raydium_fee)
+            if profit > best:
+                best_tokens, best = tokens, profit
+        step = grid[1] - grid[0]
+        low, high = max(best_tokens - step, 0.0), min(best_tokens + step, limit)
+    return best
+
+def optimum(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, raydium_fee=0.25, max_cost=np.inf):
+    tokens, cost, revenue = optimal_trade_size(
+        np.array([reserve_sol]), np.array([reserve_token]), np.array([bin_price], dtype=float), np.array([bin_y], dtype=float),
+        np.array([meteora_fee]), raydium_fee, np.array([max_cost]),
+    )
+    return tokens[0], cost[0], revenue[0]
+
+def check_optimum(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, raydium_fee=0.25, max_cost=np.inf):
+    tokens, cost, revenue = optimum(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, raydium_fee, max_cost)
+
+    # The reported trade is the one its token amount gives
+    assert cost == pytest.approx(cpmm_cost_for_tokens(tokens, reserve_sol, reserve_token, raydium_fee) if tokens > 0 else 0.0, rel=1e-9)
+    assert revenue == pytest.approx(revenue_for_tokens(tokens, bin_price, bin_y, meteora_fee), rel=1e-9, abs=1e-12)
+    assert cost <= max_cost * (1 + 1e-9)
+
+    # No token amount on the grid does better, and the grid gets close to it
+    best = brute_force(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, raydium_fee, max_cost)
+    scale = max(abs(best), 1e-9)
+    assert revenue - cost >= best - 1e-9 * scale
+    assert revenue - cost <= best + 1e-6 * scale + 1e-12
+    return tokens, cost, revenue
+
+@pytest.mark.parametrize('seed', range(25))
+def test_optimum_matches_brute_force(seed):
+    rng = random.Random(seed)
+    reserve_sol, reserve_token, bin_price, bin_y = make_market(rng)
+    check_optimum(reserve_sol, reserve_token, bin_price, bin_y, rng.choice([0.25, 1, 2]))
+
+@pytest.mark.parametrize('seed', range(10))
+def test_max_cost_caps_the_trade(seed):
+    rng = random.Random(seed)
+    reserve_sol, reserve_token, bin_price, bin_y = make_market(rng, discount=(0.05, 0.15))
+    meteora_fee = rng.choice([0.25, 1])
+    _, uncapped_cost, _ = optimum(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee)
+    assert uncapped_cost > 0
+
+    max_cost = uncapped_cost / 2
+    _, cost, _ = check_optimum(reserve_sol, reserve_token, bin_price, bin_y, meteora_fee, max_cost=max_cost)
+    # Profit is concave, so under a binding budget the whole budget is spent
+    assert cost == pytest.approx(max_cost, rel=1e-9)
+
+def test_zero_fees():
+    reserve_sol, reserve_token, bin_price, bin_y = make_market(random.Random(1))
+    check_optimum(reserve_sol, reserve_token, bin_price, bin_y, 0.0, raydium_fee=0.0)
+
+def test_fees_that_close_the_gap_give_no_trade():
+    reserve_sol, reserve_token = 1_000.0, 1_000_000.0
+    # Raydium at 0.001 SOL per token, the bins pay 2% more before a 2% Meteora fee and the Raydium fee
+    bin_price = [0.00102, 0.00101, 0.001]
+    tokens, cost, revenue = check_optimum(reserve_sol, reserve_token, bin_price, [1.0, 1.0, 1.0], 2.0)
+    assert (tokens, cost, revenue) == (0.0, 0.0, 0.0)
+
+def test_full_meteora_fee_gives_no_trade():
+    reserve_sol, reserve_token, bin_price, bin_y = make_market(random.Random(2))
+    assert optimum(reserve_sol, reserve_token, bin_price, bin_y, 100.0) == (0.0, 0.0, 0.0)
+
+def test_empty_and_nan_bins_are_skipped():
+    reserve_sol, reserve_token, bin_price, bin_y = make_market(random.Random(3))
+    with_gaps = optimum(reserve_sol, reserve_token, [bin_price[0], np.nan, bin_price[1], bin_price[2]], [bin_y[0], 5.0, 0.0, bin_y[2]], 1.0)
+    without = optimum(reserve_sol, reserve_token, [bin_price[0], bin_price[2]], [bin_y[0], bin_y[2]], 1.0)
+    assert with_gaps == pytest.approx(without, rel=1e-12)
+    assert optimum(reserve_sol, reserve_token, [np.nan] * 3, [np.nan] * 3, 1.0) == (0.0, 0.0, 0.0)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from config import redis_client, TRACE_ROUTES, TRACE_REPORT_INTERVAL, TRACE_PROMETHEUS_FILE
+
+# Hot path stages, in the order an update goes through them
+STAGES = ('decode', 'queue_wait', 'route_lookup', 'evaluate', 'build', 'sign', 'submit', 'tick_to_decision')
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Log-linear buckets like HdrHistogram: 2**SUB_BUCKET_BITS buckets per power of two, about 1.6% error
+SUB_BUCKET_BITS = 5
+
+now = time.perf_counter_ns
+
+class Histogram:
+    """
+    Latency histogram in nanoseconds with log-linear buckets, sparse so per-route histograms stay small.
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = max(int(value), 0)
+        shift = max(value.bit_length() - SUB_BUCKET_BITS - 1, 0)
+        bucket = (shift << (SUB_BUCKET_BITS + 1)) | (value >> shift)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Value at quantile `q` (0-1), the middle of its bucket."""
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.999999))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                shift = bucket >> (SUB_BUCKET_BITS + 1)
+                mantissa = bucket & ((1 << (SUB_BUCKET_BITS + 1)) - 1)
+                return min((mantissa << shift) + ((1 << shift) >> 1), self.max)
+        return self.max
+
+stage_histograms = {}
+route_histograms = {}
+
+def record(stage, elapsed_ns, route_id=None):
+    """Add a latency sample in nanoseconds for a stage, and for the route when given."""
+    histogram = stage_histograms.get(stage)
+    if histogram is None:
+        histogram = stage_histograms[stage] = Histogram()
+    histogram.record(elapsed_ns)
+
+    if route_id is not None and TRACE_ROUTES:
+        key = (stage, route_id)
+        histogram = route_histograms.get(key)
+        if histogram is None:
+            histogram = route_histograms[key] = Histogram()
+        histogram.record(elapsed_ns)
+
+def mark(stage, start_ns, route_id=None):
+    """Record the time since `start_ns` and return the current time, to chain consecutive stages."""
+    end_ns = now()
+    record(stage, end_ns - start_ns, route_id)
+    return end_ns
+
+@contextmanager
+def span(stage, route_id=None):
+    start_ns = now()
+    try:
+        yield
+    finally:
+        record(stage, now() - start_ns, route_id)
+
+def stage_summary(histogram):
+    return {
+        'count': histogram.count,
+        'avg_us': round(histogram.total / histogram.count / 1000, 3) if histogram.count else 0.0,
+        **{f"p{int(q * 100)}_us": round(histogram.percentile(q) / 1000, 3) for q in QUANTILES},
+        'max_us': round(histogram.max / 1000, 3),
+    }
+
+def summary():
+    """Percentiles per stage in microseconds, stages in hot path order."""
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    return {
+        stage: stage_summary(histogram)
+        for stage, histogram in sorted(stage_histograms.items(), key=lambda item: order.get(item[0], len(STAGES)))
+    }
+
+def route_summary(route_id):
+    return {stage: stage_summary(histogram) for (stage, route), histogram in route_histograms.items() if route == route_id}
+
+def prometheus_lines(name, help_text, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for labels, histogram in histograms:
+        label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+        for q in QUANTILES:
+            lines.append(f'{name}{{{label_text},quantile="{q}"}} {histogram.percentile(q) / 1e9:.9f}')
+        lines.append(f"{name}_sum{{{label_text}}} {histogram.total / 1e9:.9f}")
+        lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+    return lines
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = prometheus_lines(
+        "arbitrage_stage_latency_seconds", "Hot path latency per stage.",
+        [({'stage': stage}, histogram) for stage, histogram in stage_histograms.items()],
+    )
+    if route_histograms:
+        lines += prometheus_lines(
+            "arbitrage_route_stage_latency_seconds", "Hot path latency per stage and route.",
+            [({'stage': stage, 'route': route}, histogram) for (stage, route), histogram in route_histograms.items()],
+        )
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_file(path, text):
+    # Written next to the target and renamed, so a textfile collector never reads half a file
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        f.write(text)
+    os.replace(temporary_path, path)
+
+async def report_traces(interval=TRACE_REPORT_INTERVAL):
+    """Periodically log the stage percentiles and publish the Prometheus dump."""
+    while True:
+        await asyncio.sleep(interval)
+        if not stage_histograms:
+            continue
+        logger.info(f"⏱️ Hot path latency: {summary()}")
+        text = prometheus_text()
+        try:
+            await asyncio.to_thread(redis_client.set, "metrics:hotpath", text)
+            if TRACE_PROMETHEUS_FILE:
+                await asyncio.to_thread(write_prometheus_file, TRACE_PROMETHEUS_FILE, text)
+        except Exception as e:
+            logger.warning(f"Trace publish error: {e}")
@@ -1,3 +1,4 @@
+import math
 import time
 import uvloop
 import asyncio
@@ -5,6 +6,7 @@ import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 import websockets
 import json
+import base64
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
@@ -13,10 +15,17 @@ logger = logging.getLogger(__name__)
 
 import sys
 sys.path.append('./')
-from config import redis_client, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, RESERVES_METEORA
-from modules.cache import setup_dlmm_cache
+from config import redis_client, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, RESERVES_METEORA, DLMM_BINS_MODE, RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, WS_RPC_STATUS, WS_SUBSCRIBE_BATCH_SIZE, WS_SUBSCRIBE_PACING, DLMM_BINS_JSON, DLMM_NATIVE_CHECK
+from modules.database import run_with_db_pool
+from modules.cache import setup_dlmm_cache, apply_routes_diff
 from modules.reserves import fetch_reserves_meteora
-from modules.dlmm.dlmm.types import BinLiquidty, GetBins
+from modules.dlmm.dlmm import NativeDLMM
+from modules.dlmm_bins import encode_bins_snapshot, bins_to_dicts, snapshot_key
+from modules.recording import start_recording, record_bins
+
+from solders.pubkey import Pubkey
+
+RPC_ENDPOINT = RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID].replace('https://', 'wss://').replace('http://', 'ws://')
 
 executor = ThreadPoolExecutor(max_workers=10)
 
@@ -30,20 +39,35 @@ def publish_to_redis_channel(subscription_address, account_data):
 
 reload = False
 
+# Diff reloads are handed from the Redis thread to the event loop through this queue
+reload_queue = None
+main_loop = None
+
 async def listen():
     global reload
     global ws
+    global reload_queue
+    global main_loop
     
     reset_counter = 0
 
+    main_loop = asyncio.get_running_loop()
+    reload_queue = asyncio.Queue()
+
+    # Check for new pool signals in a separate thread
+    threading.Thread(target=redis_reload_subscriber, daemon=True).start()
+
+    # Published bin snapshots are recorded for replay when RECORD_DIR is set
+    start_recording('dlmms')
+
     while True:
         try:
-            # Check for new pool signals in a separate thread
-            threading.Thread(target=redis_reload_subscriber, daemon=True).start()
-
             cache = await setup_dlmm_cache()
 
-            await redis_dlmm_bins_subscriber(cache, 2000)
+            if DLMM_BINS_MODE == 'subscribe':
+                await redis_dlmm_bins_account_subscriber(cache, 2000)
+            else:
+                await redis_dlmm_bins_subscriber(cache, 2000)
 
         except Exception as e:
             logger.error(f"DLMMs listen error: {e}")
@@ -60,11 +84,16 @@ def redis_reload_subscriber():
 
             message_data = json.loads(message['data'])  # Decode the message into a Python dict
             if message_data.get('reload') == 1:
-                print("🔄 Reload triggered! Restarting DLMMs listener...")
-                logger.info("🔄 Reload triggered! Restarting DLMMs listener...")
+                if ('added' in message_data or 'removed' in message_data) and main_loop and reload_queue:
+                    # Diff reload: patch the cache and subscriptions in place
+                    logger.info(f"🔄 Routes reload: added {message_data.get('added', [])}, removed {message_data.get('removed', [])}")
+                    main_loop.call_soon_threadsafe(reload_queue.put_nowait, message_data)
+                else:
+                    print("🔄 Reload triggered! Restarting DLMMs listener...")
+                    logger.info("🔄 Reload triggered! Restarting DLMMs listener...")
 
-                global reload
-                reload = True
+                    global reload
+                    reload = True
 
                 # Publish a signal to Redis
                 message = {
@@ -76,44 +105,54 @@ async def process_dlmm(dlmm_pool_address):
     """Process a DLMM pool and fetch reserves."""
     bins, token_X_decimals, token_Y_decimals, all_bins, active_bin = await fetch_reserves_meteora(dlmm_pool_address, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, 'rpc')
 
-    # Convert GetBins objects to dictionaries using the `to_dict` method
-    if isinstance(bins, GetBins):
-        bins = bins.to_dict()  # Convert to dict if it's a GetBins object
-    # if isinstance(all_bins, GetBins):
-    #     all_bins = all_bins.to_dict()  # Convert to dict if it's a GetBins object
-
-    # If bins or all_bins are lists of BinLiquidty, convert each item to a dictionary
-    # Otherwise, assume they are already dictionaries or JSON serializable
-    if isinstance(bins, list):
-        bins = [bin_item.to_dict() if isinstance(bin_item, BinLiquidty) else bin_item for bin_item in bins]
-    
-    # if isinstance(all_bins, list):
-    #     all_bins = [bin_item.to_dict() if isinstance(bin_item, BinLiquidty) else bin_item for bin_item in all_bins]
-
     # Store the bins in a dictionary to be used later in redis
     dlmm_data = {
         "bins": bins,
         "token_X_decimals": token_X_decimals,
         "token_Y_decimals": token_Y_decimals,
-        # "all_bins": all_bins,
         "active_bin": active_bin
     }
 
     return dlmm_data
 
-async def send_bins(response_data, cache_ttl_ms):
-    """Send response data over Redis."""
+async def send_bins(cache, response_data, cache_ttl_ms):
+    """Store the bins of a pool in Redis: the binary snapshot for Python readers, the JSON form for rust-core."""
     try:
-        # redis_client.publish(f"dlmms:bins:{response_data.get("pool_address")}", json.dumps(response_data))
-        # redis_client.psetex(f"dlmms:bins:{response_data.get("pool_address")}", cache_ttl_ms, json.dumps(response_data))
-
-        # redis_client.set(f"dlmms:bins:{response_data.get("pool_address")}", json.dumps(response_data))
-        redis_client.setex(f"dlmms:bins:{response_data.get("pool_address")}", cache_ttl_ms, json.dumps(response_data))
+        pool_address = response_data.get('pool_address')
+        snapshot = encode_bins_snapshot(
+            response_data['bins'],
+            response_data['active_bin'],
+            response_data['token_X_decimals'],
+            response_data['token_Y_decimals'],
+            response_data.get('slot', 0),
+        )
+        pipe = redis_client.pipeline()
+        pipe.setex(snapshot_key(pool_address), cache_ttl_ms, snapshot)
+        if DLMM_BINS_JSON:
+            # rust-core prices Meteora routes from the bins, the pool bin arrays and the LUTs of the pool routes in this key
+            pipe.setex(f"dlmms:bins:{pool_address}", cache_ttl_ms, json.dumps({
+                'bins': bins_to_dicts(response_data['bins']),
+                'token_X_decimals': response_data['token_X_decimals'],
+                'token_Y_decimals': response_data['token_Y_decimals'],
+                'active_bin': response_data['active_bin'],
+                'pool_address': pool_address,
+                'bin_arrays': cache['meteora_dlmm_bin_arrays_objects'].get(pool_address, []),
+                'luts': cache['luts_by_pool'].get(pool_address, {}),
+            }))
+        pipe.execute()
+        record_bins(pool_address, snapshot)
         
         # print(f"Response sent: {response_data.get("pool_address")} {response_data.get("bins")}")
     except Exception as e:
         print(f"Error sending response: {e}")
 
+async def apply_dlmm_reload(cache, message_data):
+    """Apply a diff reload to the DLMM cache and drop the published bins of removed pools."""
+    added_pools, removed_pools = await apply_routes_diff(cache, message_data.get('added', []), message_data.get('removed', []), 3)
+    for pool_address in removed_pools:
+        await asyncio.to_thread(redis_client.delete, snapshot_key(pool_address), f"dlmms:bins:{pool_address}")
+    return added_pools, removed_pools
+
 async def redis_dlmm_bins_subscriber(cache, cache_ttl_ms):
     """Redis subscriber that listens for 'meteora:bins' and fetches data."""
     global reload
@@ -122,23 +161,22 @@ async def redis_dlmm_bins_subscriber(cache, cache_ttl_ms):
             reload = False
             break
 
-        for meteora_dlmm_client_object in cache['meteora_dlmm_client_objects']:
-            dlmm_client_object = cache['meteora_dlmm_client_objects'][meteora_dlmm_client_object]
+        while not reload_queue.empty():
+            try:
+                await apply_dlmm_reload(cache, reload_queue.get_nowait())
+            except Exception as e:
+                logger.error(f"Routes reload error: {e}")
+
+        for meteora_dlmm_client_object, dlmm_client_object in list(cache['meteora_dlmm_client_objects'].items()):
             try:
                 dlmm_data = await process_dlmm(dlmm_client_object)
                 dlmm_data['pool_address'] = meteora_dlmm_client_object
-                dlmm_data['bin_arrays'] = cache['meteora_dlmm_bin_arrays_objects'].get(meteora_dlmm_client_object, [])
-                dlmm_data['luts'] = cache['lut_mapping']
-                
-                # if dlmm_data['bin_arrays'] == []:
-                #     print(f"Empty bin arrays: {dlmm_data['bin_arrays']}")
-                #     continue
 
                 # print(f"DLMM data: {dlmm_data}")
                 print(f"DLMM data updated for pool: {meteora_dlmm_client_object}")
 
                 # Store the bins in Redis
-                await send_bins(dlmm_data, cache_ttl_ms)
+                await send_bins(cache, dlmm_data, cache_ttl_ms)
 
                 # await asyncio.sleep(0.025)
                 await asyncio.sleep(0.125) # Because of lag
@@ -148,5 +186,229 @@ async def redis_dlmm_bins_subscriber(cache, cache_ttl_ms):
 
         # print(f"All DLMM bins: {dlmm_bins}")
 
+async def subscribe_accounts(ws, addresses):
+    """Send base64 accountSubscribe requests in bursts, the request id is the account address."""
+    for i in range(0, len(addresses), WS_SUBSCRIBE_BATCH_SIZE):
+        for address in addresses[i:i + WS_SUBSCRIBE_BATCH_SIZE]:
+            payload = {
+                "jsonrpc": "2.0",
+                "id": address,
+                "method": "accountSubscribe",
+                "params": [address, {"encoding": "base64", "commitment": WS_RPC_STATUS}]
+            }
+            await ws.send(json.dumps(payload))
+        await asyncio.sleep(WS_SUBSCRIBE_PACING)
+
+async def unsubscribe_accounts(ws, subscription_ids):
+    """Send accountUnsubscribe requests for subscriptions that are no longer needed."""
+    for subscription_id in subscription_ids:
+        payload = {
+            "jsonrpc": "2.0",
+            "id": f"unsubscribe:{subscription_id}",
+            "method": "accountUnsubscribe",
+            "params": [subscription_id]
+        }
+        await ws.send(json.dumps(payload))
+
+def bin_array_window(dlmm):
+    """Bin arrays holding the bins published for a pool, keyed by address."""
+    return {
+        str(dlmm.get_bin_array_key(index)): index
+        for index in dlmm.get_bin_array_indexes_around_active_bin(METEORA_BINS_LEFT, METEORA_BINS_RIGHT)
+    }
+
+async def keep_bins_alive(pool_addresses, cache_ttl_ms):
+    """Refresh the TTL of published bins, pools that do not trade are only written once."""
+    while True:
+        await asyncio.sleep(cache_ttl_ms / 2)
+        pipe = redis_client.pipeline()
+        for pool_address in list(pool_addresses):
+            pipe.expire(snapshot_key(pool_address), cache_ttl_ms)
+            if DLMM_BINS_JSON:
+                pipe.expire(f"dlmms:bins:{pool_address}", cache_ttl_ms)
+        try:
+            await asyncio.to_thread(pipe.execute)
+        except Exception as e:
+            logger.warning(f"DLMM bins keepalive error: {e}")
+
+async def publish_dlmm_bins(cache, pool_address, dlmm, published_bins, cache_ttl_ms, slot=0):
+    """Publish the bins of a pool from its decoded accounts, skipping unchanged bins."""
+    dlmm_data = await process_dlmm(dlmm)
+    bins_key = (dlmm_data['active_bin'], dlmm_data['bins'].tobytes())
+    if published_bins.get(pool_address) == bins_key:
+        return False
+    published_bins[pool_address] = bins_key
+
+    await send_bins(cache, {**dlmm_data, 'pool_address': pool_address, 'slot': slot}, cache_ttl_ms)
+    return True
+
+def active_bin_mismatch(native, sidecar):
+    """Compare the active bin decoded in-process with the DLMM API's, returns the first field that differs or None."""
+    expected = sidecar.get_active_bin()
+    actual = native.get_active_bin()
+    if actual.bin_id != expected.bin_id:
+        return f"bin_id {actual.bin_id} != {expected.bin_id}"
+    for field in ('x_amount', 'y_amount'):
+        if int(getattr(actual, field), 16) != int(getattr(expected, field), 16):
+            return f"{field} {getattr(actual, field)} != {getattr(expected, field)}"
+    if not math.isclose(actual.price, expected.price, rel_tol=1e-9):
+        return f"price {actual.price} != {expected.price}"
+    return None
+
+async def setup_native_dlmm(dlmm):
+    """Decode a pool in-process and load the bin arrays around its active bin, returns the pool and its window."""
+    sidecar = None if isinstance(dlmm, NativeDLMM) else dlmm
+    for _ in range(2):
+        native = dlmm if sidecar is None else await asyncio.to_thread(NativeDLMM, sidecar.pool_address, sidecar.rpc)
+        native.auto_refresh = False
+        window = bin_array_window(native)
+        await asyncio.to_thread(native.load_bin_arrays, list(window.values()))
+        if sidecar is None or not DLMM_NATIVE_CHECK:
+            return native, window
+
+        # No recorded parity fixture covers the account layout yet, the DLMM API is the reference until then.
+        # A second attempt rules out a swap landing between the two reads.
+        mismatch = await asyncio.to_thread(active_bin_mismatch, native, sidecar)
+        if mismatch is None:
+            return native, window
+    raise ValueError(f"native decoding differs from the DLMM API ({mismatch}), pool not subscribed")
+
+async def redis_dlmm_bins_account_subscriber(cache, cache_ttl_ms):
+    """Keep the bins in Redis fresh from LbPair and BinArray account subscriptions instead of polling every pool."""
+    global reload
+
+    # Decode pool accounts in-process, the bins are then computed without any request
+    dlmms = {}
+    windows = {}
+    for pool_address, dlmm in cache['meteora_dlmm_client_objects'].items():
+        try:
+            dlmms[pool_address], windows[pool_address] = await setup_native_dlmm(dlmm)
+        except Exception as e:
+            logger.error(f"DLMM subscription setup error for {pool_address}: {e}")
+
+    # Account address -> pool address for every subscribed LbPair and BinArray
+    account_pools = {pool_address: pool_address for pool_address in dlmms}
+    for pool_address, window in windows.items():
+        account_pools.update({address: pool_address for address in window})
+
+    published_bins = {}
+    account_data_cache = {}
+    subscription_map = {}
+    account_subscriptions = {}
+    notifications = 0
+    updates = 0
+
+    async with websockets.connect(RPC_ENDPOINT) as ws:
+        await subscribe_accounts(ws, list(account_pools))
+        logger.info(f"Subscribed to {len(dlmms)} DLMM pools, {len(account_pools)} accounts.")
+
+        for pool_address, dlmm in dlmms.items():
+            await publish_dlmm_bins(cache, pool_address, dlmm, published_bins, cache_ttl_ms)
+
+        async def apply_reloads():
+            # Route changes only touch their own pools, the socket and the other subscriptions stay as they are
+            while True:
+                message_data = await reload_queue.get()
+                try:
+                    added_pools, removed_pools = await apply_dlmm_reload(cache, message_data)
+                except Exception as e:
+                    logger.error(f"Routes reload error: {e}")
+                    continue
+
+                subscription_ids = []
+                for pool_address in removed_pools:
+                    dlmms.pop(pool_address, None)
+                    published_bins.pop(pool_address, None)
+                    for address in [pool_address, *windows.pop(pool_address, {})]:
+                        account_pools.pop(address, None)
+                        account_data_cache.pop(address, None)
+                        if address in account_subscriptions:
+                            subscription_ids.append(account_subscriptions.pop(address))
+                            subscription_map.pop(subscription_ids[-1], None)
+                await unsubscribe_accounts(ws, subscription_ids)
+
+                for pool_address in added_pools:
+                    try:
+                        dlmm, window = await setup_native_dlmm(cache['meteora_dlmm_client_objects'][pool_address])
+                    except Exception as e:
+                        logger.error(f"DLMM subscription setup error for {pool_address}: {e}")
+                        continue
+                    dlmms[pool_address] = dlmm
+                    windows[pool_address] = window
+                    account_pools.update({address: pool_address for address in [pool_address, *window]})
+                    await subscribe_accounts(ws, [pool_address, *window])
+                    await publish_dlmm_bins(cache, pool_address, dlmm, published_bins, cache_ttl_ms)
+
+                logger.info(f"DLMM subscriptions reloaded: +{len(added_pools)} -{len(removed_pools)} pools, {len(account_pools)} accounts.")
+
+        keepalive_task = asyncio.create_task(keep_bins_alive(dlmms, cache_ttl_ms))
+        reload_task = asyncio.create_task(apply_reloads())
+
+        try:
+            while True:
+                if reload:
+                    reload = False
+                    break
+
+                data = json.loads(await ws.recv())
+
+                if "result" in data and "id" in data:
+                    # Subscription confirmation, unsubscribe confirmations have boolean results
+                    if isinstance(data['result'], int) and not isinstance(data['result'], bool) and data['id'] in account_pools:
+                        subscription_map[data['result']] = data['id']
+                        account_subscriptions[data['id']] = data['result']
+                    continue
+
+                if data.get('method') != 'accountNotification':
+                    continue
+
+                notifications += 1
+                address = subscription_map.get(data['params']['subscription'])
+                pool_address = account_pools.get(address)
+                value = data['params']['result']['value']
+                if pool_address is None or value is None:
+                    continue
+
+                # Publish only when the account content actually changed
+                account_data = base64.b64decode(value['data'][0])
+                if account_data_cache.get(address) == account_data:
+                    continue
+                account_data_cache[address] = account_data
+
+                dlmm = dlmms[pool_address]
+                try:
+                    dlmm.update_account(Pubkey.from_string(address), account_data)
+                except ValueError as e:
+                    logger.warning(f"DLMM account decode error for {address}: {e}")
+                    continue
+
+                if address == pool_address:
+                    # Follow the active bin: subscribe to bin arrays entering the window, drop the ones leaving it
+                    window = bin_array_window(dlmm)
+                    added = {key: index for key, index in window.items() if key not in windows[pool_address]}
+                    removed = {key: index for key, index in windows[pool_address].items() if key not in window}
+                    windows[pool_address] = window
+
+                    if added:
+                        await asyncio.to_thread(dlmm.load_bin_arrays, list(added.values()))
+                        account_pools.update({key: pool_address for key in added})
+                        await subscribe_accounts(ws, list(added))
+                    if removed:
+                        for key, index in removed.items():
+                            account_pools.pop(key, None)
+                            account_data_cache.pop(key, None)
+                            dlmm.bin_arrays.pop(index, None)
+                        subscription_ids = [account_subscriptions.pop(key) for key in removed if key in account_subscriptions]
+                        for subscription_id in subscription_ids:
+                            subscription_map.pop(subscription_id, None)
+                        await unsubscribe_accounts(ws, subscription_ids)
+
+                if await publish_dlmm_bins(cache, pool_address, dlmm, published_bins, cache_ttl_ms, data['params']['result']['context']['slot']):
+                    updates += 1
+                    print(f"DLMM bins updated for pool: {pool_address} ({updates} updates from {notifications} notifications)")
+        finally:
+            keepalive_task.cancel()
+            reload_task.cancel()
+
 if __name__ == '__main__':
-    asyncio.run(listen())
+    asyncio.run(run_with_db_pool(listen()))
@@ -1,7 +1,6 @@
 import uvloop
 import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-import websockets
 import json
 import time
 import threading
@@ -10,12 +9,14 @@ from concurrent.futures import ThreadPoolExecutor
 import logging  # Import logging module
 logger = logging.getLogger(__name__)
 
-from config import redis_client, WS_MAX_SECONDS, RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, WS_RPC_STATUS
-from modules.database import get_tradable_two_arbitrage_routes
-from modules.cache import setup_cache
+from config import redis_client, WS_MAX_SECONDS, RPC_ENDPOINT_LIST, RPC_ENDPOINT_LIST_ID, WS_RPC_STATUS, WS_SUBSCRIBE_BATCH_SIZE, WS_SUBSCRIBE_PACING, WS_QUEUE_MAX_SIZE, RESERVES_COOLDOWN_SECONDS, WS_METRICS_INTERVAL, WS_RESERVES_ENCODING, WS_RESERVES_CONNECTIONS, WS_RESERVES_REDUNDANT_ENDPOINT_ID, WS_RECONNECT_SECONDS, RESERVES_MAX_SLOT_AGE, RESERVES_MAX_SILENCE_SECONDS
+from modules.database import get_tradable_two_arbitrage_routes, run_with_db_pool
+from modules.cache import setup_cache, apply_routes_diff, get_watched_reserve_addresses, build_reserve_metadata
 from modules.opportunities import find_arbitrage_opportunities
-
-RPC_ENDPOINT = RPC_ENDPOINT_LIST[RPC_ENDPOINT_LIST_ID].replace('https://', 'wss://').replace('http://', 'ws://')
+from modules import tracing
+from modules.recording import start_recording, record_frame, record_routes, stop_recording
+from modules.wss.messages import ReserveUpdate, is_notification, is_slot_notification, decode_account_notification, decode_slot_notification, decode_confirmation
+from modules.wss.subscriptions import SubscriptionManager, arrivals
 
 executor = ThreadPoolExecutor(max_workers=10)
 
@@ -40,134 +41,348 @@ async def extract_reserve_addresses(data):
     ))
     return reserve_addresses
 
-reload = False
 reserve_amounts = {}
+# Reserve address -> (mint, decimals, dex) from the route cache, updates only carry the amount
+reserve_metadata = {}
+
+# Listener metrics: counters, stage latencies live in modules.tracing histograms
+LATENCY_STAGES = ('decode', 'queue_wait', 'evaluate', 'tick_to_decision')
+listener_metrics = {
+    'received': 0,
+    'enqueued': 0,
+    'coalesced': 0,
+    'dropped': 0,
+    'deferred': 0,
+    'evaluated': 0,
+    'decoded': 0,
+    'duplicates': 0,
+}
+update_queue = None
+
+# Reserve subscriptions sharded across connections and endpoints, modules.wss.subscriptions.arrivals keeps the
+# first arrival of each (account, slot), drops regressions and tracks which connections stalled
+subscription_manager = None
+arrivals.max_silence = RESERVES_MAX_SILENCE_SECONDS
+
+# Diff reloads are handed from the Redis thread to the event loop through this queue, full reloads set the event
+reload_queue = None
+reload_event = None
+main_loop = None
+
+def reserve_endpoints():
+    """(RPC_ENDPOINT_LIST index, endpoint) of the reserve subscriptions: the main endpoint, then the redundant one."""
+    endpoint_ids = [RPC_ENDPOINT_LIST_ID]
+    if WS_RESERVES_REDUNDANT_ENDPOINT_ID is not None and WS_RESERVES_REDUNDANT_ENDPOINT_ID != RPC_ENDPOINT_LIST_ID:
+        endpoint_ids.append(WS_RESERVES_REDUNDANT_ENDPOINT_ID)
+    return [(endpoint_id, RPC_ENDPOINT_LIST[endpoint_id]) for endpoint_id in endpoint_ids]
+
+def record_latency(stage, seconds):
+    """Add a latency sample for a listener stage."""
+    tracing.record(stage, seconds * 1e9)
+
+def refresh_reserve_metadata(arbitrage_routes):
+    """Rebuild the static reserve metadata in place after the routes changed."""
+    reserve_metadata.clear()
+    reserve_metadata.update(build_reserve_metadata(arbitrage_routes))
+
+def get_listener_metrics():
+    """Return a snapshot of the listener metrics with the current queue depth and latencies in ms."""
+    now = time.perf_counter()
+    return {
+        'encoding': WS_RESERVES_ENCODING,
+        'queue_depth': update_queue.qsize() if update_queue else 0,
+        **listener_metrics,
+        'tip_slot': arrivals.tip_slot,
+        'stale_accounts': 0 if RESERVES_MAX_SLOT_AGE is None else sum(1 for address in arrivals.latest if arrivals.age_in_slots(address, now) > RESERVES_MAX_SLOT_AGE),
+        'endpoints': arrivals.summary(now),
+        'connections': subscription_manager.status() if subscription_manager else [],
+        'latency_ms': {
+            stage: {
+                'count': histogram.count,
+                'avg': round(histogram.total / histogram.count / 1e6, 3) if histogram.count else 0.0,
+                'p99': round(histogram.percentile(0.99) / 1e6, 3),
+                'max': round(histogram.max / 1e6, 3),
+            }
+            for stage, histogram in ((stage, tracing.stage_histograms.get(stage, tracing.Histogram())) for stage in LATENCY_STAGES)
+        },
+    }
+
+async def report_listener_metrics():
+    """Periodically log the listener metrics and publish them to Redis for other processes."""
+    last_decoded, last_time = listener_metrics['decoded'], time.perf_counter()
+    while True:
+        await asyncio.sleep(WS_METRICS_INTERVAL)
+        metrics = get_listener_metrics()
+        now = time.perf_counter()
+        metrics['decoded_per_second'] = round((metrics['decoded'] - last_decoded) / (now - last_time), 1)
+        last_decoded, last_time = metrics['decoded'], now
+        logger.info(f"📊 Reserves listener metrics: {metrics}")
+        try:
+            await asyncio.to_thread(redis_client.set, "metrics:reserves", json.dumps(metrics))
+        except Exception as e:
+            logger.warning(f"Metrics publish error: {e}")
+
+async def subscribe_reserves(ws, addresses):
+    """Send accountSubscribe requests as pipelined bursts, yielding to the event loop between bursts."""
+    for i in range(0, len(addresses), WS_SUBSCRIBE_BATCH_SIZE):
+        for pool in addresses[i:i + WS_SUBSCRIBE_BATCH_SIZE]:
+            payload = {
+                "jsonrpc": "2.0",
+                "id": pool,
+                "method": "accountSubscribe",
+                "params": [pool, {"encoding": WS_RESERVES_ENCODING, "commitment": WS_RPC_STATUS}]
+            }
+            await ws.send(json.dumps(payload))
+        await asyncio.sleep(WS_SUBSCRIBE_PACING)
+
+async def subscribe_slots(ws):
+    """Follow the processed slots on a reserve connection: the tip, and a frame every slot while it is alive."""
+    await ws.send(json.dumps({"jsonrpc": "2.0", "id": "slots", "method": "slotSubscribe"}))
+
+async def unsubscribe_reserves(ws, subscription_ids):
+    """Send accountUnsubscribe requests for reserve accounts no route watches anymore."""
+    for subscription_id in subscription_ids:
+        payload = {
+            "jsonrpc": "2.0",
+            "id": f"unsubscribe:{subscription_id}",
+            "method": "accountUnsubscribe",
+            "params": [subscription_id]
+        }
+        await ws.send(json.dumps(payload))
+
+async def apply_route_reloads(cache, manager):
+    """Apply diff reloads on the live sockets: subscribe new reserve accounts and unsubscribe stale ones."""
+    while True:
+        message_data = await reload_queue.get()
+        try:
+            watched_before = get_watched_reserve_addresses(cache['arbitrage_routes'])
+            await apply_routes_diff(cache, message_data.get('added', []), message_data.get('removed', []))
+            record_routes(cache['arbitrage_routes'], cache['lut_mapping'])
+            refresh_reserve_metadata(cache['arbitrage_routes'])
+            watched_after = get_watched_reserve_addresses(cache['arbitrage_routes'])
+
+            added = sorted(watched_after - watched_before)
+            removed = watched_before - watched_after
+
+            for address in removed:
+                reserve_amounts.pop(address, None)
+            arrivals.forget(removed)
+
+            await manager.add(added)
+            await manager.remove(removed)
+            logger.info(f"🔄 Reserve subscriptions updated in place: +{len(added)} -{len(removed)} accounts.")
+        except Exception as e:
+            logger.error(f"Routes reload error: {e}")
+
+def enqueue_update(queue, pending, update, received_at):
+    """Queue a reserve update for evaluation, coalescing updates for accounts already pending."""
+    if update.address in pending:
+        # The newest amount is already in reserve_amounts, the queued entry will pick it up
+        listener_metrics['coalesced'] += 1
+        return
+
+    if queue.full():
+        # Drop the oldest update to keep the evaluator on fresh data
+        dropped, _ = queue.get_nowait()
+        queue.task_done()
+        pending.discard(dropped.address)
+        listener_metrics['dropped'] += 1
+
+    queue.put_nowait((update, received_at))
+    pending.add(update.address)
+    listener_metrics['enqueued'] += 1
+
+async def evaluate_updates(cache, queue, pending, cooldown=RESERVES_COOLDOWN_SECONDS):
+    """Drain the update queue and look for arbitrage opportunities, with a per-address cooldown."""
+    loop = asyncio.get_running_loop()
+    last_evaluated = {}
+    deferred = set()
+
+    def requeue(update, received_at):
+        deferred.discard(update.address)
+        enqueue_update(queue, pending, update, received_at)
+
+    while True:
+        update, received_at = await queue.get()
+        subscription_address = update.address
+        try:
+            pending.discard(subscription_address)
+
+            dequeued_at = time.perf_counter()
+            record_latency('queue_wait', dequeued_at - received_at)
+
+            # Defer updates still in cooldown instead of sleeping, so the latest reserves are evaluated later
+            cooldown_left = last_evaluated.get(subscription_address, 0) + cooldown - dequeued_at
+            if cooldown_left > 0:
+                if subscription_address not in deferred:
+                    deferred.add(subscription_address)
+                    listener_metrics['deferred'] += 1
+                    loop.call_later(cooldown_left, requeue, update, received_at)
+                continue
+            last_evaluated[subscription_address] = dequeued_at
+
+            try:
+                await find_arbitrage_opportunities(cache, subscription_address, reserve_amounts)
+            except Exception as e:
+                logger.error(f"Evaluate update error for {subscription_address}: {e}")
+
+            evaluated_at = time.perf_counter()
+            record_latency('evaluate', evaluated_at - dequeued_at)
+            record_latency('tick_to_decision', evaluated_at - received_at)
+            listener_metrics['evaluated'] += 1
+        finally:
+            # Lets a replay wait for the queue to drain
+            queue.task_done()
+
+def handle_frame(response, subscription_map, queue, pending, received_at, receive_seconds=0.0, source=None, stream=None):
+    """
+    Handle one reserves websocket frame: map subscription confirmations, decode account notifications
+    into reserve_amounts and queue them for evaluation. `subscription_map` belongs to the connection the
+    frame came from, `source` names its endpoint and `stream` the connection for the first arrival check.
+    Slot notifications and confirmations only keep the connection live in `arrivals`.
+
+    Returns (is_notification, subscription_address).
+    """
+    if not is_notification(response):
+        if stream is None:
+            stream = source
+        if is_slot_notification(response):
+            arrivals.stream_frame(source, stream, received_at, decode_slot_notification(response))
+            return False, None
+        arrivals.stream_frame(source, stream, received_at)
+        request_id, result = decode_confirmation(response)
+        # Unsubscribe confirmations answer True/False, errors None
+        if request_id is not None and type(result) is int:
+            logger.info(f"✅ Subscription confirmed for {request_id}: {result}")
+            subscription_map[result] = request_id
+        return False, None
+
+    listener_metrics['received'] += 1
+
+    subscription_id, slot, amount = decode_account_notification(response)
+    subscription_address = subscription_map.get(subscription_id, None)
+
+    if receive_seconds >= WS_MAX_SECONDS / 100:
+        # logger.warning(f"🚨 Slow response: {receive_seconds:.6f} seconds")
+        return True, subscription_address
+
+    if subscription_address:
+        if not arrivals.first_arrival(source, subscription_address, slot, received_at, stream=stream):
+            # Another endpoint delivered this slot first, or an older slot arrived after a newer one
+            listener_metrics['duplicates'] += 1
+            return True, subscription_address
+
+        reserve_amounts[subscription_address] = amount
+        listener_metrics['decoded'] += 1
+
+        if amount == 0:
+            mint = reserve_metadata.get(subscription_address, (None,))[0]
+            logger.warning(f"❗ Reserve amount is 0 for {subscription_address} ({mint}).")
+            return True, subscription_address
+
+        record_latency('decode', time.perf_counter() - received_at)
+        enqueue_update(queue, pending, ReserveUpdate(subscription_address, slot, amount), received_at)
+
+        # # Store it in Redis with a 500ms expiration
+        # redis_client.psetex("reserves", cache_ttl_ms, json.dumps(message_data))
+        # executor.submit(publish_to_redis_channel, subscription_address, account_data)
+
+    else:
+        logger.error(f"❗ Subscription ID {subscription_id} not found in the map.")
+
+    return True, subscription_address
 
 async def listen():
-    global reload
-    global ws
+    global subscription_manager
     global reserve_amounts
-    
+    global update_queue
+    global reload_queue
+    global reload_event
+    global main_loop
+
     reset_counter = 0
 
     cache_ttl_ms = 5
-    
+
+    tasks = []
+    cache = None
+
     try:
+        main_loop = asyncio.get_running_loop()
+        reload_queue = asyncio.Queue()
+        reload_event = asyncio.Event()
+
         # Check for new pool signals in a separate thread
         threading.Thread(target=redis_subscriber, daemon=True).start()
 
         cache = await setup_cache()
-                                 
+        refresh_reserve_metadata(cache['arbitrage_routes'])
+
+        # Raw frames, routes and blockhashes are recorded for replay when RECORD_DIR is set
+        start_recording('reserves')
+        record_routes(cache['arbitrage_routes'], cache['lut_mapping'])
+
+        # Updates are received here and evaluated by a separate task
+        update_queue = asyncio.Queue(maxsize=WS_QUEUE_MAX_SIZE)
+        pending = set()
+        tasks.append(asyncio.create_task(evaluate_updates(cache, update_queue, pending)))
+        tasks.append(asyncio.create_task(report_listener_metrics()))
+        tasks.append(asyncio.create_task(tracing.report_traces()))
+        tasks.append(asyncio.create_task(cache['signature_tracker'].run()))
+
+        endpoints = reserve_endpoints()
+
         while True:
             counter = 0
             start_time = time.time()
 
-            async with websockets.connect(RPC_ENDPOINT) as ws:
-                # Fetch tradable pools
-                # routes = await get_tradable_two_arbitrage_routes()
-                # LIQUIDITY_POOLS = await extract_reserve_addresses(routes)
-                LIQUIDITY_POOLS = await extract_reserve_addresses(cache['arbitrage_routes'])
-                logger.info(f"Listening to {int(len(LIQUIDITY_POOLS) / 4)} liquidity pools, {len(LIQUIDITY_POOLS)} reserve addresses.")
-
-                # Subscribe to all liquidity pools
-                for pool in LIQUIDITY_POOLS:
-                    payload = {
-                        "jsonrpc": "2.0",
-                        "id": pool,
-                        "method": "accountSubscribe",
-                        "params": [pool, {"encoding": "jsonParsed", "commitment": WS_RPC_STATUS}]
-                    }
-                    await ws.send(json.dumps(payload))
-                    time.sleep(0.15)
-
-                # Initialize an empty dictionary to map subscription IDs to addresses
-                subscription_map = {}
-
-                while True:
-                    if reload:
-                        reset_counter += 1
-                        reload = False
-                        break
-
-                    subscription_addresses_last_time = {}
-
-                    before = time.time()
-                    response = await ws.recv()
-                    after = time.time()
-                    # print(f"WebSocket delay: {(after - before):.6f} seconds")
-                    
-                    data = json.loads(response)
-
-                    if "result" in data and "id" in data:
-                        logger.info(f"✅ Subscription confirmed for {data['id']}: {data['result']}")
-                        subscription_map[data['result']] = data['id']
-                        continue
-
-                    if "params" in data:
-                        counter += 1
-
-                        subscription_id = data['params']['subscription']
-                        subscription_address = subscription_map.get(subscription_id, None)
-                        
-                        if subscription_addresses_last_time.get(subscription_address, 0) > time.time() - 0.5:
-                            logger.warning(f"🚨 Duplicate update for {subscription_address}")
-                            continue
-
-                        print(f"🔄 Received {counter} updates in {-(start_time - time.time()):.0f} seconds, reloaded {reset_counter} times | {subscription_address}")
-
-                        if after - before >= WS_MAX_SECONDS / 100:
-                            # logger.warning(f"🚨 Slow response: {after - before:.6f} seconds")
-                            continue
-
-                        if subscription_address:
-                            mint = data['params']['result']['value']['data']['parsed']['info']['mint']
-                            dex = data['params']['result']['value']['data']['parsed']['info']['owner']
-                            uiAmount = data['params']['result']['value']['data']['parsed']['info']['tokenAmount']['uiAmount']
-                            amount = data['params']['result']['value']['data']['parsed']['info']['tokenAmount']['amount']
-                            decimals = data['params']['result']['value']['data']['parsed']['info']['tokenAmount']['decimals']
-
-                            reserve_amounts[subscription_address] = amount
-
-                            account_data = {
-                                'mint': mint,
-                                'dex': dex,
-                                'uiAmount': uiAmount,
-                                'amount': amount,
-                                'decimals': decimals,
-                                'timestamp': int(time.time())
-                            }
-
-                            if amount == 0:
-                                logger.warning(f"❗ Reserve amount is 0 for {subscription_address}.")
-                                continue
-
-                            message_data = {
-                                'subscription_address': subscription_address,
-                                'account_data': account_data
-                            }
-                            
-                            status = await find_arbitrage_opportunities(cache, message_data, reserve_amounts)
-                            # threading.Thread(target=find_arbitrage_opportunities, args=(arbitrage_routes, meteora_dlmm_client_objects, meteora_dlmm_objects, meteora_dlmm_bin_arrays_objects, lut_addresses, message_data, solana_client, broadcast_clients, vault, payer, operator, seed, wsol_token_account, balance_needed, compute_unit_limit, compute_unit_price, init_wsol_account_instruction, reserve_amounts), daemon=True).start()
-
-                            # # Store it in Redis with a 500ms expiration
-                            # redis_client.psetex("reserves", cache_ttl_ms, json.dumps(message_data))
-                            # executor.submit(publish_to_redis_channel, subscription_address, account_data)
-
-                            subscription_addresses_last_time[subscription_address] = time.time()
-
-                            time.sleep(2)
-
-                        else:
-                            logger.error(f"❗ Subscription ID {subscription_id} not found in the map.")
-
-                # Disconnect from the WebSocket
-                await ws.close()
+            # Fetch tradable pools
+            # routes = await get_tradable_two_arbitrage_routes()
+            # LIQUIDITY_POOLS = await extract_reserve_addresses(routes)
+            LIQUIDITY_POOLS = await extract_reserve_addresses(cache['arbitrage_routes'])
+            logger.info(f"Listening to {int(len(LIQUIDITY_POOLS) / 4)} liquidity pools, {len(LIQUIDITY_POOLS)} reserve addresses on {len(endpoints)} endpoint(s), {WS_RESERVES_CONNECTIONS} connection(s) each.")
+
+            def on_frame(shard, response, receive_seconds):
+                nonlocal counter
+                after = time.time()
+                received_at = time.perf_counter()
+                # print(f"WebSocket delay: {receive_seconds:.6f} seconds")
+                record_frame(response, after, shard.index)
+
+                notification, subscription_address = handle_frame(response, shard.subscription_map, update_queue, pending, received_at, receive_seconds, shard.label, shard.index)
+                if notification:
+                    counter += 1
+                    print(f"🔄 Received {counter} updates in {-(start_time - time.time()):.0f} seconds, reloaded {reset_counter} times | {subscription_address}")
+
+            # Subscribe to all liquidity pools, each connection reconnects on its own
+            subscription_manager = SubscriptionManager(endpoints, WS_RESERVES_CONNECTIONS, subscribe_reserves, unsubscribe_reserves, on_frame, WS_RECONNECT_SECONDS, subscribe_slots)
+            await subscription_manager.start(LIQUIDITY_POOLS)
+
+            # Route diffs are applied on these sockets without reconnecting
+            reload_task = asyncio.create_task(apply_route_reloads(cache, subscription_manager))
+            tasks.append(reload_task)
+
+            await reload_event.wait()
+            reload_event.clear()
+            reset_counter += 1
+
+            # Disconnect from the WebSockets
+            reload_task.cancel()
+            tasks.remove(reload_task)
+            await subscription_manager.close()
 
     except Exception as e:
         logger.error(f"Pools listen error: {e}")
         logger.error("Restarting the listener...")
-        # Disconnect from the WebSocket
-        await ws.close()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if subscription_manager is not None:
+            await subscription_manager.close()
+        if cache is not None:
+            await cache['jito_submitter'].close()
+            await cache['broadcaster'].close()
+        stop_recording()
 
 def redis_subscriber():
     """Redis subscriber that listens for 'meteora:new_pool' and triggers a reload."""
@@ -180,14 +395,16 @@ def redis_subscriber():
 
             message_data = json.loads(message['data'])  # Decode the message into a Python dict
             if message_data.get('reload') == 1:
-                print("🔄 Reload triggered! Restarting WebSocket listener...")
-                logger.info("🔄 Reload triggered! Restarting WebSocket listener...")
-
-                global reload
-                reload = True
+                if ('added' in message_data or 'removed' in message_data) and main_loop and reload_queue:
+                    # Diff reload: patch the cache and subscriptions in place
+                    logger.info(f"🔄 Routes reload: added {message_data.get('added', [])}, removed {message_data.get('removed', [])}")
+                    main_loop.call_soon_threadsafe(reload_queue.put_nowait, message_data)
+                else:
+                    print("🔄 Reload triggered! Restarting WebSocket listener...")
+                    logger.info("🔄 Reload triggered! Restarting WebSocket listener...")
 
-                # global ws
-                # ws.close()
+                    if main_loop and reload_event:
+                        main_loop.call_soon_threadsafe(reload_event.set)
 
                 # Publish a signal to Redis
                 message = {
@@ -196,4 +413,4 @@ def redis_subscriber():
                 redis_client.publish("meteora:new_pool", json.dumps(message))
 
 if __name__ == '__main__':
-    asyncio.run(listen())
+    asyncio.run(run_with_db_pool(listen()))
@@ -0,0 +1,73 @@
+import base64
+from dataclasses import dataclass
+
+import orjson
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+# Reserve websocket frames, the only fields read from each:
+#
+# accountNotification:          {"method": "accountNotification", "params": {"subscription": int,
+#                                "result": {"context": {"slot": int}, "value": {"data": ...}}}}
+#   base64 data:                [account data, "base64"], amount as u64 LE at offset 64
+#   jsonParsed data:            {"parsed": {"info": {"tokenAmount": {"amount": str}}}}
+# slotNotification:             {"method": "slotNotification", "params": {"subscription": int,
+#                                "result": {"slot": int, "parent": int, "root": int}}}
+# subscription confirmation:    {"result": int (subscription id), "id": reserve address | "slots"}
+# unsubscribe confirmation:     {"result": bool, "id": "unsubscribe:<subscription id>"}
+# error:                        {"error": {...}, "id": ...}
+NOTIFICATION_MARKER = '"accountNotification"'
+NOTIFICATION_MARKER_BYTES = NOTIFICATION_MARKER.encode()
+SLOT_MARKER = '"slotNotification"'
+SLOT_MARKER_BYTES = SLOT_MARKER.encode()
+
+# SPL token account: mint (32), owner (32), amount (u64 LE) at offset 64. Base64 packs 3 bytes in 4 characters,
+# characters 84-95 hold bytes 63-71 so the amount is bytes 1-8 of their decoding.
+AMOUNT_BASE64_START = 84
+AMOUNT_BASE64_END = 96
+
+@dataclass(slots=True)
+class ReserveUpdate:
+    address: str
+    slot: int
+    amount: int
+
+def decode_token_amount(data):
+    """Amount of a base64 encoded SPL token account, decoding only the characters around the amount."""
+    return int.from_bytes(base64.b64decode(data[AMOUNT_BASE64_START:AMOUNT_BASE64_END])[1:9], 'little')
+
+def is_notification(frame):
+    """True for accountNotification frames, checked on the raw text so confirmations never reach the notification decoder."""
+    return (NOTIFICATION_MARKER if isinstance(frame, str) else NOTIFICATION_MARKER_BYTES) in frame
+
+def is_slot_notification(frame):
+    """True for slotNotification frames, the processed slots followed by every reserve connection."""
+    return (SLOT_MARKER if isinstance(frame, str) else SLOT_MARKER_BYTES) in frame
+
+def decode_slot_notification(frame):
+    """Slot of a slotNotification frame."""
+    return orjson.loads(frame)['params']['result']['slot']
+
+def decode_account_notification(frame):
+    """
+    Returns (subscription id, slot, amount) of an accountNotification frame, subscribed as base64 or jsonParsed.
+    """
+    params = orjson.loads(frame)['params']
+    result = params['result']
+    data = result['value']['data']
+    if isinstance(data, list):
+        amount = decode_token_amount(data[0])
+    else:
+        amount = int(data['parsed']['info']['tokenAmount']['amount'])
+    return params['subscription'], result['context']['slot'], amount
+
+def decode_confirmation(frame):
+    """
+    Returns (request id, result) of a response frame: a subscription id, True/False for an unsubscribe, None for an error.
+    """
+    message = orjson.loads(frame)
+    if 'error' in message:
+        logger.warning(f"❗ Websocket request {message.get('id')} failed: {message['error']}")
+        return message.get('id'), None
+    return message.get('id'), message.get('result')
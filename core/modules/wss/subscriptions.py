@@ -0,0 +1,284 @@
+import asyncio
+import math
+import zlib
+from urllib.parse import urlparse
+
+import websockets
+
+import logging  # Import logging module
+logger = logging.getLogger(__name__)
+
+from modules.tracing import Histogram
+
+def websocket_url(endpoint):
+    return endpoint.replace('https://', 'wss://').replace('http://', 'ws://')
+
+def endpoint_label(index, endpoint):
+    """Name of an RPC endpoint in logs and metrics: its list index and host, never the API key in the path or query."""
+    return f"{index}:{urlparse(websocket_url(endpoint)).hostname}"
+
+def shard_of(address, shards):
+    """Stable shard of an account, the same in every process and after every restart."""
+    return zlib.crc32(address.encode()) % shards
+
+class ArrivalTracker:
+    """
+    Per-account high-water mark of the reserve updates across redundant streams, and how fresh each account is.
+
+    A `source` is an endpoint, the lead/lag statistics are kept per source. A `stream` is one connection of
+    it, a shard: the connections of one endpoint stall and reconnect independently, so freshness is per stream.
+
+    Updates are ordered by (slot, write_version). Geyser account updates carry a write version, RPC websocket
+    notifications do not: without one, a later update of the same slot from the stream that delivered the mark
+    is a new write, one account can be written several times in a slot. An update at the mark from another
+    stream is a duplicate, its delay behind the first arrival goes to its source's lag histogram, and an
+    update below the mark is a regression, dropped so a late copy never overwrites newer reserves.
+
+    Every stream also follows the processed slots, so it delivers a frame every slot even when none of its
+    accounts change. A stream silent for more than `max_silence` seconds is stalled. The tip is the newest
+    slot of any stream. A live stream that is caught up would have delivered any change of an account it
+    carries, so an account is as fresh as the best live stream that delivered it: `age_in_slots` is the tip
+    minus that stream's newest slot, infinite when all of its streams stalled.
+    """
+
+    def __init__(self, max_silence=None):
+        # Account -> (slot, write_version, stream, received_at) of its high-water mark, and the streams that delivered it
+        self.latest = {}
+        self.account_streams = {}
+        # Stream -> newest slot it delivered, its last frame, its source, and the newest slot of any stream
+        self.stream_slots = {}
+        self.stream_frames = {}
+        self.stream_sources = {}
+        self.tip_slot = 0
+        self.max_silence = max_silence
+        self.stats = {}
+
+    def source_stats(self, source):
+        stats = self.stats.get(source)
+        if stats is None:
+            stats = self.stats[source] = {'first': 0, 'duplicate': 0, 'late': 0, 'lag': Histogram()}
+        return stats
+
+    def stream_frame(self, source, stream, received_at, slot=0):
+        """A frame of a stream: keeps it live, and a slot notification or account update moves its slot."""
+        self.stream_frames[stream] = received_at
+        self.stream_sources[stream] = source
+        if slot > self.stream_slots.get(stream, 0):
+            self.stream_slots[stream] = slot
+            if slot > self.tip_slot:
+                self.tip_slot = slot
+
+    def first_arrival(self, source, address, slot, received_at, write_version=None, stream=None):
+        """
+        True if this update is new, False for a duplicate or a regression below the account's high-water mark.
+        `stream` defaults to the source, for sources with a single connection.
+        """
+        if stream is None:
+            stream = source
+        self.stream_frame(source, stream, received_at, slot)
+        streams = self.account_streams.get(address)
+        if streams is None:
+            self.account_streams[address] = {stream}
+        elif stream not in streams:
+            streams.add(stream)
+
+        latest = self.latest.get(address)
+        if latest is None or slot > latest[0]:
+            order = 1
+        elif slot < latest[0]:
+            order = -1
+        elif write_version is not None and latest[1] is not None:
+            order = (write_version > latest[1]) - (write_version < latest[1])
+        else:
+            order = 1 if stream == latest[2] else 0
+
+        stats = self.source_stats(source)
+        if order > 0:
+            self.latest[address] = (slot, write_version, stream, received_at)
+            stats['first'] += 1
+            return True
+        if order == 0:
+            stats['duplicate'] += 1
+            stats['lag'].record((received_at - latest[3]) * 1e9)
+        else:
+            stats['late'] += 1
+        return False
+
+    def is_live(self, stream, now=None):
+        """False once a stream went `max_silence` seconds without a frame, as of `now` on the received_at clock."""
+        if self.max_silence is None or now is None:
+            return True
+        return now - self.stream_frames.get(stream, float('-inf')) <= self.max_silence
+
+    def age_in_slots(self, address, now=None):
+        """Slots between the tip and the freshest live stream of an account, infinite if all stalled, None before its first update."""
+        streams = self.account_streams.get(address)
+        if not streams:
+            return None
+        ages = [self.tip_slot - self.stream_slots.get(stream, 0) for stream in streams if self.is_live(stream, now)]
+        return min(ages) if ages else math.inf
+
+    def forget(self, addresses):
+        for address in addresses:
+            self.latest.pop(address, None)
+            self.account_streams.pop(address, None)
+
+    def clear(self):
+        self.latest.clear()
+        self.account_streams.clear()
+        self.stream_slots.clear()
+        self.stream_frames.clear()
+        self.stream_sources.clear()
+        self.tip_slot = 0
+        self.stats.clear()
+
+    def summary(self, now=None):
+        """
+        Per source: first arrivals, their share of the updates it delivered, duplicates, regressions, lag in ms,
+        how many slots its slowest stream is behind the tip and how many of its streams stalled.
+        """
+        # Newest slot of the slowest stream of each source, and its stalled streams
+        slowest = {}
+        stalled = {}
+        for stream, source in self.stream_sources.items():
+            slot = self.stream_slots.get(stream, 0)
+            slowest[source] = min(slot, slowest.get(source, slot))
+            stalled[source] = stalled.get(source, 0) + (not self.is_live(stream, now))
+
+        summary = {}
+        for source, stats in self.stats.items():
+            delivered = stats['first'] + stats['duplicate'] + stats['late']
+            lag = stats['lag']
+            summary[str(source)] = {
+                'first': stats['first'],
+                'duplicate': stats['duplicate'],
+                'late': stats['late'],
+                'lead_share': round(stats['first'] / delivered, 3) if delivered else 0.0,
+                'slots_behind': self.tip_slot - slowest.get(source, 0),
+                'stalled_streams': stalled.get(source, 0),
+                'lag_ms': {
+                    'p50': round(lag.percentile(0.5) / 1e6, 3),
+                    'p99': round(lag.percentile(0.99) / 1e6, 3),
+                    'max': round(lag.max / 1e6, 3),
+                },
+            }
+        return summary
+
+# One tracker per process: the reserves listener feeds it, the route evaluation reads the account ages
+arrivals = ArrivalTracker()
+
+class Shard:
+    """
+    One websocket connection carrying a share of the reserve accounts, reconnected and resubscribed on its own.
+    """
+
+    def __init__(self, index, endpoint_index, endpoint, subscribe, unsubscribe, on_frame, reconnect_seconds, on_connect=None):
+        self.index = index
+        self.label = endpoint_label(endpoint_index, endpoint)
+        self.url = websocket_url(endpoint)
+        self.subscribe = subscribe
+        self.unsubscribe = unsubscribe
+        self.on_frame = on_frame
+        self.reconnect_seconds = reconnect_seconds
+        self.on_connect = on_connect
+
+        self.addresses = set()
+        # Subscription ids are per connection, reset on every reconnect
+        self.subscription_map = {}
+        self.ws = None
+        self.connects = 0
+
+    async def run(self):
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self.subscription_map.clear()
+                    self.ws = ws
+                    self.connects += 1
+                    if self.on_connect is not None:
+                        await self.on_connect(ws)
+                    # Addresses added from here on are subscribed by add()
+                    await self.subscribe(ws, sorted(self.addresses))
+                    logger.info(f"🔌 Shard {self.index} connected to {self.label}: {len(self.addresses)} reserve accounts.")
+
+                    loop = asyncio.get_running_loop()
+                    while True:
+                        before = loop.time()
+                        frame = await ws.recv()
+                        self.on_frame(self, frame, loop.time() - before)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❗ Shard {self.index} on {self.label} disconnected: {e}")
+            finally:
+                self.ws = None
+            await asyncio.sleep(self.reconnect_seconds)
+
+    async def add(self, addresses):
+        self.addresses.update(addresses)
+        if self.ws is not None:
+            await self.subscribe(self.ws, addresses)
+
+    async def remove(self, addresses):
+        self.addresses.difference_update(addresses)
+        subscription_ids = [subscription_id for subscription_id, address in self.subscription_map.items() if address in addresses]
+        for subscription_id in subscription_ids:
+            del self.subscription_map[subscription_id]
+        if self.ws is not None:
+            await self.unsubscribe(self.ws, subscription_ids)
+
+    def status(self):
+        return {'endpoint': self.label, 'accounts': len(self.addresses), 'subscribed': len(self.subscription_map), 'connected': self.ws is not None, 'connects': self.connects}
+
+class SubscriptionManager:
+    """
+    Reserve account subscriptions sharded across `connections` websockets per endpoint.
+
+    Each account goes to the same shard index on every endpoint, so with a redundant endpoint it is
+    subscribed twice, on two providers. A dropped connection only stalls its own shard while it reconnects.
+    `on_frame(shard, frame, receive_seconds)` is called for every frame of every shard, `on_connect(ws)` on
+    every (re)connect before the accounts are subscribed.
+    """
+
+    def __init__(self, endpoints, connections, subscribe, unsubscribe, on_frame, reconnect_seconds, on_connect=None):
+        """`endpoints` is a list of (RPC_ENDPOINT_LIST index, endpoint URL)."""
+        self.connections = max(connections, 1)
+        self.shards = [
+            Shard(i * self.connections + k, endpoint_index, endpoint, subscribe, unsubscribe, on_frame, reconnect_seconds, on_connect)
+            for i, (endpoint_index, endpoint) in enumerate(endpoints)
+            for k in range(self.connections)
+        ]
+        self.tasks = []
+
+    def shards_of(self, address):
+        """Shards of one account, one per endpoint."""
+        return self.shards[shard_of(address, self.connections)::self.connections]
+
+    def split(self, addresses):
+        per_shard = {}
+        for address in addresses:
+            for shard in self.shards_of(address):
+                per_shard.setdefault(shard, []).append(address)
+        return per_shard
+
+    async def start(self, addresses):
+        for shard, shard_addresses in self.split(addresses).items():
+            shard.addresses.update(shard_addresses)
+        self.tasks = [asyncio.create_task(shard.run()) for shard in self.shards]
+
+    async def add(self, addresses):
+        for shard, shard_addresses in self.split(addresses).items():
+            await shard.add(shard_addresses)
+
+    async def remove(self, addresses):
+        for shard, shard_addresses in self.split(addresses).items():
+            await shard.remove(set(shard_addresses))
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def status(self):
+        return [shard.status() for shard in self.shards]
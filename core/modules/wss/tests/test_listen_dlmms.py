@@ -0,0 +1,20 @@
+from types import SimpleNamespace
+
+from modules.dlmm.dlmm.types import ActiveBin
+from modules.wss.listen_dlmms import active_bin_mismatch
+
+def client(bin_id=5, x_amount='0x64', y_amount='0xc8', price=1.0025):
+    active_bin = ActiveBin({
+        'binId': bin_id, 'xAmount': x_amount, 'yAmount': y_amount, 'supply': '0x0',
+        'price': repr(price), 'version': 1, 'pricePerToken': repr(price * 1000),
+    })
+    return SimpleNamespace(get_active_bin=lambda: active_bin)
+
+def test_matching_active_bins():
+    # Same amounts, written with and without leading zeros
+    assert active_bin_mismatch(client(x_amount='0064'), client()) is None
+
+def test_mismatched_active_bins():
+    assert active_bin_mismatch(client(bin_id=6), client()).startswith('bin_id')
+    assert active_bin_mismatch(client(y_amount='0xc9'), client()).startswith('y_amount')
+    assert active_bin_mismatch(client(price=1.0026), client()).startswith('price')
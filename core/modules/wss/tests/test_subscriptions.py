@@ -0,0 +1,84 @@
+import math
+
+from modules.wss.subscriptions import ArrivalTracker, shard_of
+
+LABEL = '0:rpc.example.com'
+
+def test_quiet_shard_stays_fresh():
+    tracker = ArrivalTracker(max_silence=2.0)
+    accounts = {shard: f"account{shard}" for shard in range(4)}
+    for shard, address in accounts.items():
+        assert tracker.first_arrival(LABEL, address, 100, 0.0, stream=shard)
+
+    # Shards 0-2 deliver account updates, the accounts of shard 3 do not change but its slot feed goes on
+    for slot in range(101, 140):
+        now = (slot - 100) * 0.4
+        for shard in range(3):
+            tracker.first_arrival(LABEL, f"busy{shard}", slot, now, stream=shard)
+        tracker.stream_frame(LABEL, 3, now, slot)
+
+    assert tracker.age_in_slots(accounts[3], now) == 0
+    assert tracker.age_in_slots(accounts[0], now) == 0
+    assert tracker.summary(now)[LABEL]['stalled_streams'] == 0
+
+def test_stalled_shard_ages_its_accounts():
+    tracker = ArrivalTracker(max_silence=2.0)
+    accounts = {shard: f"account{shard}" for shard in range(4)}
+    for shard, address in accounts.items():
+        assert tracker.first_arrival(LABEL, address, 100, 0.0, stream=shard)
+
+    # Shard 3 delivers nothing after slot 100, not even slot notifications
+    for slot in range(101, 140):
+        now = (slot - 100) * 0.4
+        for shard in range(3):
+            tracker.stream_frame(LABEL, shard, now, slot)
+
+    assert tracker.age_in_slots(accounts[3], now) == math.inf
+    assert tracker.age_in_slots(accounts[0], now) == 0
+    summary = tracker.summary(now)[LABEL]
+    assert (summary['stalled_streams'], summary['slots_behind']) == (1, 39)
+
+def test_single_connection_stall_is_detected_without_a_second_stream():
+    tracker = ArrivalTracker(max_silence=2.0)
+    assert tracker.first_arrival(LABEL, 'vault', 300, 10.0)
+    tracker.stream_frame(LABEL, LABEL, 10.4, 301)
+
+    # The connection is its own tip, only its silence shows the stall
+    assert tracker.age_in_slots('vault', 12.0) == 0
+    assert tracker.age_in_slots('vault', 12.5) == math.inf
+    assert tracker.age_in_slots('unknown', 12.5) is None
+
+def test_redundant_stream_keeps_accounts_fresh():
+    tracker = ArrivalTracker(max_silence=2.0)
+    assert tracker.first_arrival('0:a', 'x', 100, 0.0, stream=0)
+    assert not tracker.first_arrival('1:b', 'x', 100, 0.1, stream=4)
+
+    # Endpoint a stalls, endpoint b keeps following the slots a few slots behind its own tip
+    for slot in range(101, 120):
+        tracker.stream_frame('1:b', 4, (slot - 100) * 0.4, slot)
+    tracker.stream_frame('2:c', 8, 7.6, 123)
+
+    assert tracker.age_in_slots('x', 7.6) == 4
+    assert tracker.summary(7.6)['0:a']['stalled_streams'] == 1
+
+def test_redundant_endpoint_duplicates_and_regressions():
+    tracker = ArrivalTracker()
+    assert tracker.first_arrival('0:a', 'x', 10, 0.0, stream=0)
+    assert tracker.first_arrival('0:a', 'x', 10, 0.1, stream=0)
+    assert not tracker.first_arrival('1:b', 'x', 10, 0.2, stream=4)
+    assert not tracker.first_arrival('1:b', 'x', 9, 0.3, stream=4)
+    assert tracker.first_arrival('1:b', 'x', 11, 0.4, stream=4)
+
+    summary = tracker.summary()
+    assert (summary['0:a']['first'], summary['1:b']['first'], summary['1:b']['duplicate'], summary['1:b']['late']) == (2, 1, 1, 1)
+
+def test_write_version_orders_updates_of_one_slot():
+    tracker = ArrivalTracker()
+    assert tracker.first_arrival('0:a', 'y', 5, 0.0, write_version=3)
+    assert not tracker.first_arrival('0:a', 'y', 5, 0.0, write_version=2)
+    assert not tracker.first_arrival('1:b', 'y', 5, 0.0, write_version=3)
+    assert tracker.first_arrival('1:b', 'y', 5, 0.0, write_version=4)
+
+def test_shard_of_is_stable():
+    assert shard_of('So11111111111111111111111111111111111111112', 4) == shard_of('So11111111111111111111111111111111111111112', 4)
+    assert {shard_of(f"account{i}", 4) for i in range(100)} == {0, 1, 2, 3}
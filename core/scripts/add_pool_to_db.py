@@ -1,32 +1,13 @@
 import uvloop
 import asyncio
-import asyncpg
-from contextlib import asynccontextmanager
 
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 import sys
 sys.path.append('./')
-from config import DB_CONFIG, SOLANA_PROGRAM
-from modules.database import add_token, add_pool
+from config import SOLANA_PROGRAM
+from modules.database import get_db_connection, run_with_db_pool, add_token, add_pool
 
-# Asynchronous context manager for handling database connections
-@asynccontextmanager
-async def get_db_connection():
-    conn = None
-    try:
-        # Attempt to connect to the database
-        conn = await asyncpg.connect(**DB_CONFIG)
-        yield conn
-    except Exception as e:
-        if f'{e}' == 'syntax error at or near ")"':
-            pass
-        else:
-            print(f"DB Connection error: {e}")
-    finally:
-        if conn:
-            await conn.close()
-    
 async def set_tradable_token(name, tradable=True):
 	async with get_db_connection() as conn:
 		await conn.execute('''
@@ -55,4 +36,4 @@ async def main():
 	await add_pool(mint, SOLANA_PROGRAM, pool_address, dex, float(fee), None, None, None)
 	print(f"Added pool {name} with mint {mint} and pool address {pool_address} to database.")
 
-asyncio.run(main())
\ No newline at end of file
+asyncio.run(run_with_db_pool(main()))
\ No newline at end of file
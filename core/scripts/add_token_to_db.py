@@ -4,9 +4,9 @@ asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 import sys
 sys.path.append('./')
-from modules.database import add_token
+from modules.database import add_token, run_with_db_pool
 
 async def main():
 	await add_token('Bibidi', 'BCQRnuZEYw6z4AedaJRpDnQzpmqUgK8PPeLnqaNcpump')
 
-asyncio.run(main())
\ No newline at end of file
+asyncio.run(run_with_db_pool(main()))
\ No newline at end of file
@@ -0,0 +1,82 @@
+'''
+Cycle search on a synthetic pool graph: full search against incremental updates of one pool.
+
+The graph has SOL pools for every token and token/token pools between random tokens, priced from a
+hidden value per token with random mispricings, so a few cycles clear the fees. Each update moves the
+price of one random pool, `update_pool` is checked against a full search on the last update.
+
+- build:        add_pool of every pool
+- bounds:       rebuild_bounds, the vectorized pass run before the first search
+- full_search:  search of every cycle through SOL
+- update_small: update_pool with a move inside CYCLE_BOUNDS_SLACK
+- update_large: update_pool with a move past it, bounds lowered from the moved edge
+
+Usage (from core/):
+    python scripts/benchmarks/cycles.py [pools] [max_hops] [updates]
+'''
+import random
+import sys
+import time
+
+sys.path.append('./')
+from modules.cycles import CycleEngine
+
+SOL = 'So11111111111111111111111111111111111111112'
+
+def make_pools(count, seed=7):
+    rng = random.Random(seed)
+    tokens = [f"token{i}" for i in range(count // 4)]
+    values = {SOL: 1.0, **{token: rng.uniform(0.000001, 0.1) for token in tokens}}
+
+    pools = []
+    for i in range(count):
+        # Half the pools quote a token against SOL, the other half two tokens
+        a = rng.choice(tokens)
+        b = SOL if i % 2 == 0 else rng.choice(tokens)
+        if a == b:
+            b = SOL
+        if rng.random() < 0.5:
+            a, b = b, a
+        fee_rate = rng.choice([0.0025, 0.01, 0.02])
+        mispricing = rng.uniform(0.97, 1.03)
+        pools.append((i, a, b, fee_rate, values[a] / values[b] * mispricing))
+    return pools
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+def timed(call):
+    start = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - start) * 1000
+
+def main(count=10_000, max_hops=3, updates=2000):
+    pools = make_pools(count)
+    engine = CycleEngine(SOL, max_hops=max_hops)
+
+    _, build_ms = timed(lambda: [engine.add_pool(*pool) for pool in pools])
+    _, bounds_ms = timed(engine.rebuild_bounds)
+    cycles, search_ms = timed(engine.search)
+    print(f"{count} pools, {len(engine.mints)} tokens, {max_hops} hops max: {len(cycles)} cycles")
+    print(f"{'build':<14}{build_ms:>10.2f} ms")
+    print(f"{'bounds':<14}{bounds_ms:>10.2f} ms")
+    print(f"{'full_search':<14}{search_ms:>10.2f} ms")
+
+    rng = random.Random(11)
+    for name, move in (('update_small', engine.slack / 4), ('update_large', engine.slack * 4)):
+        samples = []
+        repairs = engine.bound_repairs
+        for _ in range(updates):
+            pool_id = rng.randrange(count)
+            price = engine.prices[pool_id] * (1 + rng.uniform(-move, move))
+            _, elapsed = timed(lambda: engine.update_pool(pool_id, price))
+            samples.append(elapsed * 1000)
+        print(f"{name:<14}{sum(samples) / len(samples):>10.2f} us mean, p50 {percentile(samples, 0.5):.2f} us, p99 {percentile(samples, 0.99):.2f} us, {engine.bound_repairs - repairs} bound repairs")
+
+    incremental = dict(engine.cycles)
+    assert set(engine.search()) == set(incremental), "incremental cycles differ from a full search"
+    print(f"incremental state matches a full search: {len(incremental)} cycles")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:4]])
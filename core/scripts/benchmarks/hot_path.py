@@ -0,0 +1,289 @@
+'''
+Offline micro-benchmarks of the hot path, from the websocket frame to the signed transaction:
+
+- ws_notification_json:     json.loads of a jsonParsed reserve accountNotification
+- ws_handle_frame:          listen_reserves.handle_frame of it (decode, reserve_amounts, queue)
+- ws_notification_json_b64: json.loads of the same notification with base64 encoding
+- ws_handle_frame_b64:      listen_reserves.handle_frame of it, amount at offset 64, metadata from the routes
+- fetch_reserves_raydium:   RESERVES_RAYDIUM = 'cache' lookup and scaling
+- fetch_reserves_meteora:   RESERVES_METEORA = 'redis' bins snapshot decode, from an in-memory store
+- raydium_quote_x_for_y:    constant product quote
+- raydium_quote_smart:      slippage search of process_route
+- process_route:            one route with synthetic reserves and bins, execute_swap stubbed
+- swap_full_build:          swap_raydium_to_meteora without template, sidecar DLMM and Jito stubbed
+- swap_template_build:      swap_raydium_to_meteora with the per-route template
+
+Fixtures come from swap_build.py and trade_sizing.py, nothing touches the network, Redis or the database.
+Console output of the measured functions is silenced. Results go to a JSON file, by default
+scripts/benchmarks/results/<commit>.json, which `compare` diffs against another run.
+
+Usage (from core/):
+    python scripts/benchmarks/hot_path.py [iterations] [output.json]
+    python scripts/benchmarks/hot_path.py compare <before.json> <after.json> [threshold_percent]
+'''
+import asyncio
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.append('./')
+sys.path.append('./scripts/benchmarks')
+from modules import opportunities, reserves, swap
+from modules.blockhash import LatestBlockhash
+from modules.dlmm_bins import encode_bins_snapshot, snapshot_key
+from modules.replay import ReplayStore
+from modules.swap import build_route_template
+from modules.wss import listen_reserves
+from swap_build import make_cache, make_route
+from trade_sizing import make_routes, run_sync
+
+from solders.hash import Hash
+
+RESULTS_DIR = 'scripts/benchmarks/results'
+QUANTILES = (0.5, 0.9, 0.99)
+
+def quiet(*args, **kwargs):
+    pass
+
+def bench(iterations, call, warmup=50):
+    for i in range(min(warmup, iterations)):
+        call(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        call(i)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'mean_us': round(sum(samples) / len(samples) / 1000, 3),
+        **{f"p{int(q * 100)}_us": round(samples[min(int(len(samples) * q), len(samples) - 1)] / 1000, 3) for q in QUANTILES},
+    }
+
+def notification(subscription, amount, decimals):
+    return json.dumps({
+        'jsonrpc': '2.0',
+        'method': 'accountNotification',
+        'params': {
+            'subscription': subscription,
+            'result': {
+                'context': {'slot': 300000000},
+                'value': {
+                    'lamports': 2039280,
+                    'owner': 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',
+                    'executable': False,
+                    'rentEpoch': 18446744073709551615,
+                    'space': 165,
+                    'data': {
+                        'program': 'spl-token',
+                        'space': 165,
+                        'parsed': {
+                            'type': 'account',
+                            'info': {
+                                'isNative': False,
+                                'mint': 'So11111111111111111111111111111111111111112',
+                                'owner': '5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1',
+                                'state': 'initialized',
+                                'tokenAmount': {'amount': str(amount), 'decimals': decimals, 'uiAmount': amount / 10 ** decimals, 'uiAmountString': str(amount / 10 ** decimals)},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    })
+
+def notification_base64(subscription, amount):
+    """The same notification subscribed with base64 encoding: a 165-byte SPL token account."""
+    data = bytes(range(64)) + amount.to_bytes(8, 'little') + bytes(93)
+    return json.dumps({
+        'jsonrpc': '2.0',
+        'method': 'accountNotification',
+        'params': {
+            'subscription': subscription,
+            'result': {
+                'context': {'slot': 300000000},
+                'value': {
+                    'lamports': 2039280,
+                    'owner': 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',
+                    'executable': False,
+                    'rentEpoch': 18446744073709551615,
+                    'space': 165,
+                    'data': [base64.b64encode(data).decode(), 'base64'],
+                },
+            },
+        },
+    })
+
+def make_process_route_fixture(cache, dlmm):
+    """One profitable Raydium -> Meteora route with its reserves in reserve_amounts and its bins in the store."""
+    synthetic = make_routes(1)[0]
+    store = ReplayStore()
+    store.set(snapshot_key(dlmm.pool_address), encode_bins_snapshot(synthetic['bins'], synthetic['active_bin'], dlmm.token_X.decimal, dlmm.token_Y.decimal))
+
+    route = {
+        'id': 1,
+        'pool_a_dex': 'raydium',
+        'pool_b_dex': 'meteora',
+        'pool_a_address': 'pool_a',
+        'pool_b_address': str(dlmm.pool_address),
+        'pool_a_fee': '0.0025',
+        'pool_b_fee': synthetic['pool_b_fee'],
+        'reserve_a_address_pool_a': 'reserve_a_pool_a',
+        'reserve_b_address_pool_a': 'reserve_b_pool_a',
+        'reserve_a_address_pool_b': 'reserve_a_pool_b',
+        'reserve_b_address_pool_b': 'reserve_b_pool_b',
+        'reserve_a_pool_a_decimals': 9,
+        'reserve_b_pool_a_decimals': 6,
+        'reserve_a_pool_b_decimals': dlmm.token_X.decimal,
+        'reserve_b_pool_b_decimals': dlmm.token_Y.decimal,
+        'reserve_a_mint_pool_a': opportunities.WSOL_MINT,
+        'reserve_b_mint_pool_a': 'token',
+        'reserve_a_mint_pool_b': 'token',
+        'reserve_b_mint_pool_b': opportunities.WSOL_MINT,
+        'lut': None,
+        'status': 'enabled',
+    }
+    reserve_amounts = {
+        'reserve_a_pool_a': int(synthetic['reserve_sol'] * 10 ** 9),
+        'reserve_b_pool_a': int(synthetic['reserve_token'] * 10 ** 6),
+    }
+    cache = {**cache, 'meteora_dlmm_client_objects': {str(dlmm.pool_address): dlmm}, 'solana_client': None}
+    return route, cache, reserve_amounts, store
+
+class StubSubmitter:
+    async def submit(self, transaction):
+        return {'success': True, 'signature': 'stub', 'region': 'stub', 'error': None}
+
+def run(iterations=2000):
+    cache = make_cache()
+    dlmm = next(iter(cache['meteora_dlmm_objects'].values()))
+    swap_route, lut_addresses = make_route(dlmm)
+    route, route_cache, reserve_amounts, store = make_process_route_fixture(cache, dlmm)
+
+    # The measured functions read these module globals, point them at the fixtures
+    reserves.redis_client = store
+    reserves.RESERVES_RAYDIUM = 'cache'
+    latest = LatestBlockhash(Hash.new_unique(), 300000150, 300000000, 0)
+    swap.get_latest_blockhash = lambda: latest
+    swap.USE_JITO = True
+    for module in (opportunities, swap, listen_reserves):
+        module.print = quiet
+
+    async def execute_swap_stub(*args, **kwargs):
+        return None
+    opportunities.execute_swap = execute_swap_stub
+
+    frame = notification(7, reserve_amounts['reserve_a_pool_a'], 9)
+    frame_base64 = notification_base64(7, reserve_amounts['reserve_a_pool_a'])
+    subscription_map = {7: 'reserve_a_pool_a'}
+    queue = asyncio.Queue(maxsize=1)
+    pending = set()
+    listen_reserves.refresh_reserve_metadata([route])
+
+    def handle_frame(frame):
+        def call(i):
+            pending.clear()
+            listen_reserves.handle_frame(frame, subscription_map, queue, pending, time.perf_counter())
+        return call
+
+    reserve_sol = reserve_amounts['reserve_a_pool_a'] / 10 ** 9
+    reserve_token = reserve_amounts['reserve_b_pool_a'] / 10 ** 6
+    addresses = [route['reserve_a_address_pool_a'], route['reserve_b_address_pool_a']]
+    submitter = StubSubmitter()
+    template = build_route_template(swap_route, lut_addresses, cache)
+
+    def swap_call(i, template=None):
+        return run_sync(swap.swap_raydium_to_meteora(
+            0, 0.1 + i % 7 * 0.01, 100.0 + i % 13, 9, 0, 1, swap_route['pool_a_address'], swap_route['pool_b_address'],
+            swap_route['reserve_b_mint_pool_b'], swap_route['reserve_a_mint_pool_b'], swap_route['lut'], lut_addresses,
+            dlmm, cache['meteora_dlmm_bin_arrays_objects'][swap_route['pool_b_address']], None, None,
+            cache['vault'], cache['payer'], cache['operator'], cache['seed'], lut_addresses[21], cache['vault_wsol_token_account'], cache['operator_wsol_token_account'],
+            cache['balance_needed'], cache['compute_unit_limit'], cache['compute_unit_price'],
+            cache['create_wsol_account_instruction'], cache['init_wsol_account_instruction'], cache['close_wsol_account_instruction'],
+            cache['jito_tip_address'], template=template, jito_submitter=submitter, route_id=swap_route['id'],
+        ))
+
+    assert swap_call(0) == 'stub' and swap_call(0, template) == 'stub', "swap did not reach the submitter"
+
+    cases = {
+        'ws_notification_json': lambda i: json.loads(frame),
+        'ws_handle_frame': handle_frame(frame),
+        'ws_notification_json_b64': lambda i: json.loads(frame_base64),
+        'ws_handle_frame_b64': handle_frame(frame_base64),
+        'fetch_reserves_raydium': lambda i: reserves.fetch_reserves_raydium(None, addresses, [9, 6], reserve_amounts),
+        'fetch_reserves_meteora': lambda i: run_sync(reserves.fetch_reserves_meteora(dlmm, 0, 0, 'redis')),
+        'raydium_quote_x_for_y': lambda i: run_sync(opportunities.raydium_quote_x_for_y(0.5 + i % 7 * 0.1, reserve_sol, reserve_token)),
+        'raydium_quote_smart': lambda i: run_sync(opportunities.raydium_quote_smart(1000.0 + i % 13, reserve_sol, reserve_token)),
+        'process_route': lambda i: run_sync(opportunities.process_route(route, route_cache, None, reserve_amounts)),
+        'swap_full_build': lambda i: swap_call(i),
+        'swap_template_build': lambda i: swap_call(i, template),
+    }
+    return {name: bench(iterations // 10 if name == 'swap_full_build' else iterations, call) for name, call in cases.items()}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def main(iterations=2000, output=None):
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'iterations': iterations,
+        'benchmarks': run(iterations),
+    }
+
+    print(f"{'benchmark':<26}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for name, result in results['benchmarks'].items():
+        print(f"{name:<26}{result['mean_us']:>10.2f}{result['p50_us']:>10.2f}{result['p99_us']:>10.2f}")
+    for name in ('ws_handle_frame', 'ws_handle_frame_b64'):
+        print(f"{name}: {1e6 / results['benchmarks'][name]['mean_us']:,.0f} parsed updates/s")
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{commit}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+def compare(before_path, after_path, threshold=10.0):
+    """Print the p50 change per benchmark, exit 1 if one got slower by more than `threshold` percent."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"{before['commit']} -> {after['commit']}")
+    print(f"{'benchmark':<26}{'before us':>11}{'after us':>11}{'change':>9}")
+    regressions = []
+    for name, result in after['benchmarks'].items():
+        previous = before['benchmarks'].get(name)
+        if previous is None:
+            print(f"{name:<26}{'-':>11}{result['p50_us']:>11.2f}{'new':>9}")
+            continue
+        change = (result['p50_us'] - previous['p50_us']) / previous['p50_us'] * 100 if previous['p50_us'] else 0.0
+        flag = ' 🚨' if change > threshold else ''
+        print(f"{name:<26}{previous['p50_us']:>11.2f}{result['p50_us']:>11.2f}{change:>+8.1f}%{flag}")
+        if change > threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"Slower by more than {threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.INFO)  # The swap and the DLMM decode log every call
+    if sys.argv[1:2] == ['compare']:
+        compare(sys.argv[2], sys.argv[3], *[float(arg) for arg in sys.argv[4:5]])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:2]], *sys.argv[2:3])
@@ -0,0 +1,128 @@
+'''
+Build latency of a Raydium -> Meteora swap transaction: full build (parse LUT addresses, pool keys,
+instructions, MessageV0.try_compile, sign) against the per-route template (patch amounts and blockhash, sign).
+
+Uses the keys from config.py and synthetic pool accounts, nothing is sent. Both paths must produce the same
+bytes for the same amounts and blockhash, the script checks that first.
+
+Usage (from core/):
+    python scripts/benchmarks/swap_build.py [iterations]
+'''
+import struct
+import sys
+import time
+
+sys.path.append('./')
+from config import SOLANA_PROGRAM, JITO_TIP_ADDRESS, OPERATOR_WSOL_ATA, VAULT_WSOL_ATA, VAULT_PRIVATE_KEY, PAYER_PRIVATE_KEY, OPERATOR_PRIVATE_KEY, UNIT_BUDGET, UNIT_PRICE
+from modules.dlmm.dlmm.native import LB_CLMM_PROGRAM_ID, SWAP_DISCRIMINATOR
+from modules.raydium_py.raydium.constants import TOKEN_PROGRAM_ID, WSOL
+from modules.swap import build_route_template, build_template_transaction, compile_swap_transaction
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from spl.token.instructions import create_associated_token_account, initialize_account, close_account, InitializeAccountParams, CloseAccountParams
+
+class SyntheticToken:
+    def __init__(self, decimal):
+        self.decimal = decimal
+
+class SyntheticDLMM:
+    '''Answers swap_ixs like the DLMM API does, the instruction JSON is what the swap path consumes.'''
+
+    def __init__(self):
+        self.pool_address = Pubkey.new_unique()
+        self.token_X = SyntheticToken(6)
+        self.token_Y = SyntheticToken(9)
+        self.keys = [str(Pubkey.new_unique()) for _ in range(15)]
+
+    def swap_ixs(self, in_token, out_token, in_amount, min_out_amount, lb_pair, user, user_token_in, user_token_out, bin_arrays):
+        keys = [str(lb_pair), *self.keys[:9], str(user), *self.keys[9:], *bin_arrays]
+        return [{
+            "programId": str(LB_CLMM_PROGRAM_ID),
+            "keys": [{"pubkey": key, "isSigner": key == str(user), "isWritable": True} for key in keys],
+            "data": list(SWAP_DISCRIMINATOR + struct.pack("<QQ", in_amount, min_out_amount)),
+        }]
+
+def make_cache():
+    vault = Keypair.from_base58_string(VAULT_PRIVATE_KEY)
+    payer = Keypair.from_base58_string(PAYER_PRIVATE_KEY)
+    operator = Keypair.from_base58_string(OPERATOR_PRIVATE_KEY)
+    operator_wsol_token_account = Pubkey.from_string(OPERATOR_WSOL_ATA)
+    dlmm = SyntheticDLMM()
+    return {
+        'meteora_dlmm_objects': {str(dlmm.pool_address): dlmm},
+        'meteora_dlmm_bin_arrays_objects': {str(dlmm.pool_address): [str(Pubkey.new_unique()) for _ in range(3)]},
+        'vault': vault,
+        'payer': payer,
+        'operator': operator,
+        'seed': '',
+        'vault_wsol_token_account': Pubkey.from_string(VAULT_WSOL_ATA),
+        'operator_wsol_token_account': operator_wsol_token_account,
+        'balance_needed': 2039280,
+        'compute_unit_limit': set_compute_unit_limit(UNIT_BUDGET),
+        'compute_unit_price': set_compute_unit_price(UNIT_PRICE),
+        'create_wsol_account_instruction': create_associated_token_account(vault.pubkey(), operator.pubkey(), Pubkey.from_string(SOLANA_PROGRAM)),
+        'init_wsol_account_instruction': initialize_account(InitializeAccountParams(program_id=TOKEN_PROGRAM_ID, account=operator_wsol_token_account, mint=WSOL, owner=operator.pubkey())),
+        'close_wsol_account_instruction': close_account(CloseAccountParams(program_id=TOKEN_PROGRAM_ID, account=operator_wsol_token_account, dest=operator.pubkey(), owner=operator.pubkey())),
+        'jito_tip_address': Pubkey.from_string(JITO_TIP_ADDRESS),
+    }
+
+def make_route(dlmm):
+    lut_addresses = [str(Pubkey.new_unique()) for _ in range(26)]
+    route = {
+        'id': 1,
+        'pool_a_address': str(Pubkey.new_unique()),
+        'pool_b_address': str(dlmm.pool_address),
+        'reserve_b_mint_pool_b': SOLANA_PROGRAM,
+        'reserve_a_mint_pool_b': lut_addresses[22],
+        'lut': str(Pubkey.new_unique()),
+    }
+    return route, lut_addresses
+
+def full_build(route, lut_addresses, cache, borrow_amount, expected_amount, blockhash):
+    dlmm_pool_address = route['pool_b_address']
+    return bytes(compile_swap_transaction(
+        0, borrow_amount, expected_amount, 9, 0, route['pool_a_address'], route['reserve_b_mint_pool_b'], route['reserve_a_mint_pool_b'],
+        route['lut'], lut_addresses, cache['meteora_dlmm_objects'][dlmm_pool_address], cache['meteora_dlmm_bin_arrays_objects'][dlmm_pool_address],
+        cache['vault'], cache['payer'], cache['operator'], cache['seed'], lut_addresses[21], cache['vault_wsol_token_account'], cache['operator_wsol_token_account'],
+        cache['balance_needed'], cache['compute_unit_limit'], cache['compute_unit_price'],
+        cache['create_wsol_account_instruction'], cache['init_wsol_account_instruction'], cache['close_wsol_account_instruction'],
+        cache['jito_tip_address'], blockhash,
+    ))
+
+def bench(iterations, build):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        build(i)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return samples[len(samples) // 2] / 1000, samples[int(len(samples) * 0.99)] / 1000
+
+def main(iterations=2000):
+    cache = make_cache()
+    route, lut_addresses = make_route(next(iter(cache['meteora_dlmm_objects'].values())))
+
+    template_start = time.perf_counter()
+    template = build_route_template(route, lut_addresses, cache)
+    template_ms = (time.perf_counter() - template_start) * 1000
+
+    blockhash = Hash.new_unique()
+    assert full_build(route, lut_addresses, cache, 0.25, 1234.5, blockhash) == build_template_transaction(template, 0.25, 1234.5, blockhash), "template and full build differ"
+
+    blockhashes = [Hash.new_unique() for _ in range(16)]
+    amount = lambda i: (0.1 + i % 7 * 0.01, 100.0 + i % 13)
+    before = bench(iterations, lambda i: full_build(route, lut_addresses, cache, *amount(i), blockhashes[i % 16]))
+    after = bench(iterations, lambda i: build_template_transaction(template, *amount(i), blockhashes[i % 16]))
+
+    print(f"template compile (once per route): {template_ms:.3f} ms")
+    print(f"{'path':<10}{'p50 us':>10}{'p99 us':>10}")
+    print(f"{'full':<10}{before[0]:>10.1f}{before[1]:>10.1f}")
+    print(f"{'template':<10}{after[0]:>10.1f}{after[1]:>10.1f}")
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.INFO)  # The full build logs every step
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,120 @@
+'''
+Compare trade sizing paths on synthetic Raydium -> Meteora routes: CPU time per tick and realized profit.
+
+- serial:  process_route sizing, raydium_quote_smart per route
+- bins:    RouteEvaluator with the same sizing, vectorized
+- optimal: RouteEvaluator with modules.sizing (CPMM curve + bin ladder)
+
+Realized profit re-prices the chosen token amount on the exact curves: Raydium cost from the constant
+product formula and Meteora revenue from walking the bins down from the active bin.
+
+Usage (from core/):
+    python scripts/benchmarks/trade_sizing.py [routes] [ticks]
+'''
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.append('./')
+from config import VAULT_BALANCE, METEORA_BINS_LEFT, METEORA_BINS_RIGHT, METEORA_BINS_TO_TRADE
+from modules.dlmm_bins import bins_to_array
+from modules.evaluator import RouteEvaluator, RAYDIUM_SWAP_FEE
+from modules.opportunities import raydium_quote_smart
+from modules.sizing import cpmm_cost_for_tokens
+
+def make_routes(count, seed=7):
+    rng = random.Random(seed)
+    routes = []
+    for i in range(count):
+        active_price = rng.uniform(0.0001, 0.01)
+        bin_step = rng.choice([0.0025, 0.01, 0.02])
+        reserve_token = rng.uniform(50_000, 5_000_000)
+        # Raydium cheaper than Meteora by a few percent, enough to clear the fees
+        reserve_sol = reserve_token * active_price * (1 - rng.uniform(0.03, 0.15))
+        bins = [
+            (100 + j, active_price * (1 + bin_step) ** j, 0.0 if j < 0 else rng.uniform(0, 5) / active_price, 0.0 if j > 0 else rng.uniform(0.05, 3))
+            for j in range(-METEORA_BINS_LEFT - 1, METEORA_BINS_RIGHT + 2)
+        ]
+        routes.append({
+            'id': i,
+            'pool_b_fee': str(rng.choice([0.25, 1, 2])),
+            'reserve_sol': reserve_sol,
+            'reserve_token': reserve_token,
+            'bins': bins_to_array(sorted(bins, key=lambda b: b[1], reverse=True)),
+            'active_bin': 100,
+        })
+    return routes
+
+def realized_profit(route, tokens):
+    """Exact profit of buying `tokens` on Raydium and selling them down the Meteora bins."""
+    if tokens <= 0 or tokens >= route['reserve_token']:
+        return 0.0
+    cost = cpmm_cost_for_tokens(tokens, route['reserve_sol'], route['reserve_token'], RAYDIUM_SWAP_FEE)
+    keep = 1 - float(route['pool_b_fee']) / 100
+
+    revenue, left = 0.0, tokens
+    active_price = route['bins']['price_per_token'][route['bins']['bin_id'] == route['active_bin']][0]
+    for bin in route['bins']:
+        if bin['price_per_token'] > active_price or bin['amountY'] <= 0 or left <= 0:
+            continue
+        sold = min(left, bin['amountY'] / (bin['price_per_token'] * keep))
+        revenue += sold * bin['price_per_token'] * keep
+        left -= sold
+    # Tokens left over when the window runs out of liquidity are not sold at all
+    return revenue - cost
+
+def run_sync(coroutine):
+    """Run a coroutine that never awaits, without the event loop overhead."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+def serial_sizing(route):
+    """process_route sizing for one route, returns the tokens bought."""
+    keep = 1 - float(route['pool_b_fee']) / 100
+    bins = [bin for bin in np.flip(route['bins']) if bin['amountY'] > 0][:METEORA_BINS_TO_TRADE]
+    total_price = sum(bin['price_per_token'] for bin in bins)
+    trade_size = min(sum(bin['amountY'] for bin in bins), VAULT_BALANCE)
+    quote = run_sync(raydium_quote_smart(trade_size / total_price / keep, route['reserve_sol'], route['reserve_token']))
+    return quote['best_y_amount'] if quote['exact_x_needed'] < trade_size else 0.0
+
+def bench(name, ticks, tick):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tokens = tick()
+    return name, (time.perf_counter() - start) / ticks * 1e6, tokens
+
+def main(count=500, ticks=50):
+    routes = make_routes(count)
+    evaluator = RouteEvaluator(count)
+    rows = []
+    for route in routes:
+        row = evaluator.row({'id': route['id'], 'pool_b_fee': route['pool_b_fee']})
+        evaluator.update_raydium(row, route['reserve_sol'], route['reserve_token'])
+        evaluator.update_meteora(row, route['bins'], route['active_bin'])
+        rows.append(row)
+
+    def batch(sizing):
+        def tick():
+            tokens = {candidate['route']['id']: candidate['total_x_needed'] for candidate in evaluator.evaluate(rows, sizing)}
+            return [tokens.get(route['id'], 0.0) for route in routes]
+        return tick
+
+    results = [
+        bench('serial', max(ticks // 10, 1), lambda: [serial_sizing(route) for route in routes]),
+        bench('bins', ticks, batch('bins')),
+        bench('optimal', ticks, batch('optimal')),
+    ]
+
+    print(f"{count} routes")
+    print(f"{'path':<10}{'us/tick':>12}{'trades':>8}{'realized profit':>18}")
+    for name, tick_us, tokens in results:
+        profits = [realized_profit(route, amount) for route, amount in zip(routes, tokens)]
+        # A path would only send the trades it thinks are profitable
+        profit = sum(p for p, amount in zip(profits, tokens) if amount > 0)
+        print(f"{name:<10}{tick_us:>12.1f}{sum(1 for amount in tokens if amount > 0):>8}{profit:>18.6f}")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
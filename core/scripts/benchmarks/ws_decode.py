@@ -0,0 +1,118 @@
+'''
+Reserve websocket decoding throughput on recorded frames, in frames per second:
+
+- json_dicts:    json.loads into nested dicts, the fields copied into an account_data dict per update, as before messages.py
+- typed:         modules.wss.messages: raw-text notification check, orjson, (subscription, slot, amount) into a ReserveUpdate
+- handle_frame:  listen_reserves.handle_frame, typed decoding plus reserve_amounts and the update queue
+
+Frames come from the KIND_FRAME entries of the given recordings (RECORD_DIR of the reserves listener). Without
+recordings a synthetic one is written first: subscription confirmations, then base64 and jsonParsed notifications.
+
+Usage (from core/):
+    python scripts/benchmarks/ws_decode.py [rounds] [recording ...]
+'''
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append('./')
+sys.path.append('./scripts/benchmarks')
+from modules.recording import Recorder, read_recording, KIND_FRAME
+from modules.wss import listen_reserves
+from modules.wss.messages import ReserveUpdate, is_notification, decode_account_notification, decode_confirmation
+from hot_path import notification, notification_base64
+
+def write_synthetic_recording(path, accounts=200, notifications=20_000, seed=7):
+    rng = random.Random(seed)
+    recorder = Recorder(path)
+    for subscription in range(accounts):
+        recorder.write(KIND_FRAME, json.dumps({'jsonrpc': '2.0', 'result': subscription, 'id': f"reserve{subscription}"}).encode())
+    for i in range(notifications):
+        subscription = rng.randrange(accounts)
+        amount = rng.randrange(1, 10 ** 15)
+        frame = notification_base64(subscription, amount) if i % 2 else notification(subscription, amount, 9)
+        recorder.write(KIND_FRAME, frame.encode())
+    recorder.close()
+
+def json_dicts(frame, subscription_map):
+    """The generic decoding: every frame into nested dicts, then two more dicts per update."""
+    data = json.loads(frame)
+    if 'result' in data and 'id' in data:
+        if not isinstance(data['result'], bool):
+            subscription_map[data['result']] = data['id']
+        return None
+    if 'params' not in data:
+        return None
+    value = data['params']['result']['value']
+    if isinstance(value['data'], list):
+        account = base64.b64decode(value['data'][0])
+        amount = int.from_bytes(account[64:72], 'little')
+        account_data = {'amount': amount, 'timestamp': int(time.time())}
+    else:
+        info = value['data']['parsed']['info']
+        account_data = {
+            'mint': info['mint'],
+            'dex': info['owner'],
+            'uiAmount': info['tokenAmount']['uiAmount'],
+            'amount': info['tokenAmount']['amount'],
+            'decimals': info['tokenAmount']['decimals'],
+            'timestamp': int(time.time()),
+        }
+    return {'subscription_address': subscription_map.get(data['params']['subscription']), 'account_data': account_data}
+
+def typed(frame, subscription_map):
+    if not is_notification(frame):
+        request_id, result = decode_confirmation(frame)
+        if type(result) is int:
+            subscription_map[result] = request_id
+        return None
+    subscription_id, slot, amount = decode_account_notification(frame)
+    return ReserveUpdate(subscription_map.get(subscription_id), slot, amount)
+
+def run(frames, rounds):
+    queue = asyncio.Queue(maxsize=1)
+    pending = set()
+
+    def handle_frame(frame, subscription_map):
+        pending.clear()
+        listen_reserves.handle_frame(frame, subscription_map, queue, pending, time.perf_counter())
+
+    results = {}
+    for name, decode in (('json_dicts', json_dicts), ('typed', typed), ('handle_frame', handle_frame)):
+        best = None
+        for _ in range(rounds):
+            subscription_map = {}
+            start = time.perf_counter()
+            for frame in frames:
+                decode(frame, subscription_map)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = len(frames) / best
+    return results
+
+def main(rounds=5, *paths):
+    import logging
+    logging.disable(logging.WARNING)  # Confirmations are logged one by one
+
+    if not paths:
+        path = os.path.join(tempfile.mkdtemp(), 'reserves-synthetic.rec')
+        write_synthetic_recording(path)
+        paths = (path,)
+
+    # Live frames are text, recordings keep their bytes
+    frames = [payload.decode() for path in paths for kind, _, payload in read_recording(path) if kind == KIND_FRAME]
+    notifications = sum(1 for frame in frames if is_notification(frame))
+    print(f"{len(frames)} frames ({notifications} notifications) from {', '.join(paths)}")
+
+    results = run(frames, rounds)
+    baseline = results['json_dicts']
+    for name, frames_per_second in results.items():
+        print(f"{name:<14}{frames_per_second:>14,.0f} frames/s{frames_per_second / baseline:>8.2f}x")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]], *sys.argv[2:])
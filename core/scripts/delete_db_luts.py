@@ -2,14 +2,13 @@ import uvloop
 import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 import time
-import asyncpg
-from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
 executor = ThreadPoolExecutor(max_workers=10)
 
 import sys
 sys.path.append('./')
-from config import DB_CONFIG, RPC_ENDPOINT_LIST, PAYER_PRIVATE_KEY
+from config import RPC_ENDPOINT_LIST, PAYER_PRIVATE_KEY
+from modules.database import get_db_connection, run_with_db_pool
 
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.api import Client
@@ -21,20 +20,6 @@ from solana.rpc.types import TxOpts
 
 client = Client(RPC_ENDPOINT_LIST[0])
 
-# Asynchronous context manager for handling database connections
-@asynccontextmanager
-async def get_db_connection():
-    conn = None
-    try:
-        # Attempt to connect to the database
-        conn = await asyncpg.connect(**DB_CONFIG)
-        yield conn
-    except Exception as e:
-        print(f"DB Connection error: {e}")
-    finally:
-        if conn:
-            await conn.close()
-
 async def get_all_luts():
     """
     Fetches all LUT addresses that are associated with non-tradable tokens.
@@ -167,4 +152,4 @@ async def main():
     print("Unused LUTs deactivated and closed.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(run_with_db_pool(main()))
\ No newline at end of file
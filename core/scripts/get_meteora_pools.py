@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.append('./')
 from config import SOLANA_PROGRAM, redis_client  # Assuming you already have Redis client in config
-from modules.database import add_pool, add_token, count_meteora_pools
+from modules.database import add_pool, add_token, count_meteora_pools, run_with_db_pool
 from modules.pools import fetch_pools_for_token
 
 API_URL = "https://dlmm-api.meteora.ag/pair/all_by_groups"
@@ -75,4 +75,4 @@ async def add_filtered_meteora_pools():
         # await fetch_pools_for_token({"name": pool['name'].split('-')[0], "address": pool['mint_x']})
         
 if __name__ == "__main__":
-    asyncio.run(add_filtered_meteora_pools())
\ No newline at end of file
+    asyncio.run(run_with_db_pool(add_filtered_meteora_pools()))
\ No newline at end of file
@@ -0,0 +1,43 @@
+'''
+Replay recorded reserve update streams through the live hot path, without sending anything.
+
+Record with RECORD_DIR set in config.py: the reserves listener writes the routes and the raw websocket frames,
+the DLMMs listener the bins snapshots, the blockhash provider the blockhashes. Pass the recordings of one session,
+they are merged by receive time.
+
+Prints throughput, tick-to-decision percentiles and the opportunities found, the full report goes to
+replay-<timestamp>.json. Two max speed replays of the same recordings find the same opportunities.
+
+Usage (from core/):
+    python scripts/replay.py <speed|max> <recording> [recording ...]
+
+    speed 1 replays in recorded time, 10 ten times faster, max as fast as the evaluation allows
+'''
+import asyncio
+import json
+import sys
+import time
+
+sys.path.append('./')
+from modules.replay import replay
+
+def main(speed, *paths):
+    report = asyncio.run(replay(paths, None if speed == 'max' else float(speed)))
+
+    tick_to_decision = report['tick_to_decision'] or {}
+    print(f"{report['notifications']} notifications, {report['evaluated']} evaluations in {report['seconds']}s ({report['notifications_per_second']}/s)")
+    print(f"tick to decision: p50 {tick_to_decision.get('p50_us')} us, p99 {tick_to_decision.get('p99_us')} us")
+    print(f"{len(report['opportunities'])} opportunities")
+    for opportunity in report['opportunities']:
+        print(f"  +{opportunity['offset']:.3f}s route {opportunity['route_id']}: profit {opportunity['profit']:.9f} SOL, borrow {opportunity['borrow_amount']:.9f} SOL")
+
+    path = f"replay-{int(time.time())}.json"
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Report written to {path}")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    main(*sys.argv[1:])
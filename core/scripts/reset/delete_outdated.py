@@ -1,32 +1,16 @@
 import uvloop
 import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-import asyncpg
-from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
 executor = ThreadPoolExecutor(max_workers=10)
 
 import sys
 sys.path.append('./')
-from config import DB_CONFIG
+from modules.database import get_db_connection, run_with_db_pool
 from scripts.reset.delete_all_atas import close_and_delete_all_atas
 from scripts.reset.delete_all_luts import close_and_delete_all_luts
 from scripts.get_meteora_pools import add_filtered_meteora_pools
 
-# Asynchronous context manager for handling database connections
-@asynccontextmanager
-async def get_db_connection():
-    conn = None
-    try:
-        # Attempt to connect to the database
-        conn = await asyncpg.connect(**DB_CONFIG)
-        yield conn
-    except Exception as e:
-        print(f"DB Connection error: {e}")
-    finally:
-        if conn:
-            await conn.close()
-
 async def reset_db_tables():
     async with get_db_connection() as conn:
         # # Remove all routes from database
@@ -58,4 +42,4 @@ async def reset():
     print("Database tables reset successfully.")
 
 if __name__ == "__main__":
-    asyncio.run(reset())
\ No newline at end of file
+    asyncio.run(run_with_db_pool(reset()))
\ No newline at end of file
@@ -1,28 +1,12 @@
 import uvloop
 import asyncio
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-import asyncpg
-from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
 executor = ThreadPoolExecutor(max_workers=10)
 
 import sys
 sys.path.append('./')
-from config import DB_CONFIG
-
-# Asynchronous context manager for handling database connections
-@asynccontextmanager
-async def get_db_connection():
-    conn = None
-    try:
-        # Attempt to connect to the database
-        conn = await asyncpg.connect(**DB_CONFIG)
-        yield conn
-    except Exception as e:
-        print(f"DB Connection error: {e}")
-    finally:
-        if conn:
-            await conn.close()
+from modules.database import get_db_connection, run_with_db_pool
 
 async def main():
     async with get_db_connection() as conn:
@@ -30,4 +14,4 @@ async def main():
         await conn.execute('''UPDATE tokens SET tradable = FALSE WHERE name != 'SOL''')
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(run_with_db_pool(main()))
\ No newline at end of file